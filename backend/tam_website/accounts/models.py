@@ -6,6 +6,8 @@ from .utils import permission_detector
 from django_jalali.db.models import datetime
 from django.utils import timezone
 from django.contrib.auth.base_user import BaseUserManager
+from django.contrib.postgres.indexes import GinIndex, OpClass
+from django.db.models.functions import Upper
 
 
 
@@ -118,6 +120,10 @@ class User(AbstractBaseUser, PermissionsMixin):
     # manager
     objects = UserManager()
 
+    class Meta:
+        # Trigram index for the upper cased search of the admin panel
+        indexes = [GinIndex(OpClass(Upper('phone_number'), name='gin_trgm_ops'), name='accounts_user_phone_trgm')]
+
     def __str__(self):
         return self.phone_number
 
@@ -143,6 +149,13 @@ class Profile(models.Model):
     first_name = models.CharField(_("first name"), max_length=255, null=True, blank=True)
     last_name = models.CharField(_("last name"), max_length=255, null=True, blank=True)
 
+    class Meta:
+        # Trigram indexes for the upper cased search of the admin panel
+        indexes = [
+            GinIndex(OpClass(Upper('first_name'), name='gin_trgm_ops'), name='accounts_profile_first_trgm'),
+            GinIndex(OpClass(Upper('last_name'), name='gin_trgm_ops'), name='accounts_profile_last_trgm'),
+        ]
+
     @property
     def full_name(self):
         return f"{self.first_name} {self.last_name}" if self.first_name and self.last_name else 'Unknown'
@@ -4,3 +4,10 @@ from django.apps import AppConfig
 class AdminPanelConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'adminpanel'
+
+    def ready(self):
+        from django.db.models import CharField
+        from django.db.models.functions import Upper
+
+        # name__upper__contains compiles to the expression of the trigram indexes
+        CharField.register_lookup(Upper)
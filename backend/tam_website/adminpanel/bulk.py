@@ -0,0 +1,323 @@
+"""
+Bulk article import, used by the ``articles/bulk/`` admin endpoint and the
+``import_articles`` management command.
+
+Rows are validated one by one and rejected with their own errors, the valid ones are
+written together: ``bulk_create`` for the images, the articles, their translations and
+the ordered image links, and one ``bulk_update`` for the search vectors. The
+image files are stored concurrently (each with the retries of blog.uploads) before the
+database writes.
+"""
+import json
+import os
+from concurrent.futures import ThreadPoolExecutor
+from uuid import uuid4
+from django.conf import settings
+from django.core.files import File
+from django.db import transaction
+from django.utils import timezone
+from django.utils.html import strip_tags
+from django.utils.text import slugify
+from rest_framework import serializers
+from rest_framework.parsers import BaseParser
+from blog.cache import bump_content_version
+from blog.images import queue_variants
+from blog.models.article import Article, ArticleImage, Image, Team
+from blog.uploads import save_file
+from blog.utils.blog_utils import make_excerpt
+from blog.utils.normalization import unique_key
+from blog.utils.search import prepare_search_texts, search_vector_expression
+from .serializers.article import TITLE_EXISTS_ERRORS
+
+
+LANGUAGES = ('fa', 'en')
+
+
+class NDJSONParser(BaseParser):
+    """Newline delimited JSON request bodies, parsed into their lines (see parse_ndjson)"""
+    media_type = 'application/x-ndjson'
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        return stream.read().splitlines() if stream else []
+
+
+def parse_ndjson(lines):
+    """
+    Parse NDJSON lines into (row number, data, error) tuples, blank lines are skipped.
+    A line that is not a JSON object is reported as the error of its row.
+    """
+    rows = []
+    for number, line in enumerate(lines, start=1):
+        if isinstance(line, bytes):
+            line = line.decode('utf-8')
+        if not line.strip():
+            continue
+        try:
+            data = json.loads(line)
+        except ValueError as error:
+            rows.append((number, None, {'non_field_errors': [f"Invalid JSON: {error}"]}))
+            continue
+        if not isinstance(data, dict):
+            rows.append((number, None, {'non_field_errors': ["Each line must be a JSON object."]}))
+            continue
+        rows.append((number, data, None))
+    return rows
+
+
+class UploadedImages:
+    """Images sent as files of a multipart batch, referenced by their field name"""
+    # Whether the stored files were created by the import and can be deleted on failure
+    owns_files = True
+
+    def __init__(self, files):
+        self.files = files
+
+    def store(self, ref, field):
+        if ref not in self.files:
+            raise serializers.ValidationError(f"Image file '{ref}' is missing from the request.")
+        return save_file(field, self.files[ref])
+
+
+class LocalImages:
+    """Images read from a local directory, referenced by their path relative to it"""
+    owns_files = True
+
+    def __init__(self, directory):
+        self.directory = directory
+
+    def store(self, ref, field):
+        path = os.path.join(self.directory, ref)
+        if not os.path.isfile(path):
+            raise serializers.ValidationError(f"Image file '{ref}' does not exist.")
+        with open(path, 'rb') as image_file:
+            return save_file(field, File(image_file))
+
+
+class StoredImages:
+    """Images already in the media storage (e.g. a migrated archive), referenced by their name"""
+    owns_files = False
+
+    def store(self, ref, field):
+        if not field.storage.exists(ref):
+            raise serializers.ValidationError(f"Image '{ref}' does not exist in the storage.")
+        return ref
+
+
+class BulkArticleRowSerializer(serializers.Serializer):
+    """
+    One article of a bulk import. ``images`` are references resolved by the image source
+    of the import, the first one is the main image.
+    """
+    title_fa = serializers.CharField(max_length=250)
+    title_en = serializers.CharField(max_length=250)
+    body_fa = serializers.CharField()
+    body_en = serializers.CharField()
+    team = serializers.IntegerField()
+    status = serializers.ChoiceField(choices=Article.Status.choices, default=Article.Status.DRAFT)
+    type = serializers.ChoiceField(choices=Article.Type.choices, default=Article.Type.TEXT)
+    video_url = serializers.URLField(required=False, allow_blank=True, default='')
+    scheduled_publish_at = serializers.DateTimeField(required=False, allow_null=True, default=None)
+    images = serializers.ListField(child=serializers.CharField(), allow_empty=False)
+
+    def validate_team(self, value):
+        # Team ids are loaded once for the whole batch
+        if value not in self.context['team_ids']:
+            raise serializers.ValidationError("تیم انتخاب شده وجود ندارد.")
+        return value
+
+    def validate(self, data):
+        if not strip_tags(data['body_fa']).strip():
+            raise serializers.ValidationError({"body_fa": "متن مقاله فارسی نمی‌تواند خالی باشد."})
+        if not strip_tags(data['body_en']).strip():
+            raise serializers.ValidationError({"body_en": "متن مقاله انگلیسی نمی‌تواند خالی باشد."})
+        if data['type'] == Article.Type.SLIDE_SHOW and len(data['images']) < 2:
+            raise serializers.ValidationError({"slideshow_images": "لطفا حداقل یک تصویر برای اسلایدشو انتخاب کنید."})
+        if data['scheduled_publish_at'] and data['status'] == Article.Status.DRAFT:
+            if data['scheduled_publish_at'] <= timezone.now():
+                raise serializers.ValidationError({"scheduled_publish_at": "زمان انتشار باید در آینده باشد."})
+        return data
+
+
+class BulkArticleImporter:
+    """
+    Create the articles of ``rows`` (parse_ndjson() tuples) for ``author`` (a Profile).
+    :meth:`run` returns ``{'created': [...], 'errors': [...]}``, a row with errors never
+    prevents the others from being created.
+    """
+
+    def __init__(self, author, images, max_workers=None):
+        self.author = author
+        self.images = images
+        self.max_workers = max_workers or settings.ARTICLE_BULK_UPLOAD_WORKERS
+        self.image_field = Image._meta.get_field('image')
+        self.errors = {}
+
+    def run(self, rows):
+        valid = self.validate(rows)
+        valid = self.check_uniqueness(valid)
+        valid = self.store_images(valid)
+        created = self.create(valid) if valid else []
+        return {
+            'created': created,
+            'errors': [{'row': number, 'errors': errors} for number, errors in sorted(self.errors.items())],
+        }
+
+    def validate(self, rows):
+        team_ids = set(Team.objects.values_list('id', flat=True))
+        valid = []
+        for number, data, error in rows:
+            if error:
+                self.errors[number] = error
+                continue
+            serializer = BulkArticleRowSerializer(data=data, context={'team_ids': team_ids})
+            if serializer.is_valid():
+                valid.append((number, serializer.validated_data))
+            else:
+                self.errors[number] = serializer.errors
+        return valid
+
+    def check_uniqueness(self, rows):
+        """Reject titles and slugs already used, in the database or by an earlier row"""
+        ArticleTranslation = Article._parler_meta.root_model
+        keys = {(code, unique_key(data[f'title_{code}'])) for _, data in rows for code in LANGUAGES}
+        taken_titles = set(ArticleTranslation.objects.filter(
+            normalized_title__in={key for _, key in keys},
+        ).values_list('language_code', 'normalized_title'))
+
+        for _, data in rows:
+            data['slug'] = slugify(data['title_en']) or str(uuid4())
+        taken_slugs = set(Article.objects.filter(slug__in={data['slug'] for _, data in rows}).values_list('slug', flat=True))
+
+        unique = []
+        for number, data in rows:
+            errors = {}
+            for code in LANGUAGES:
+                key = (code, unique_key(data[f'title_{code}']))
+                if key in taken_titles:
+                    errors[f'title_{code}'] = TITLE_EXISTS_ERRORS[code]
+            if data['slug'] in taken_slugs and 'title_en' not in errors:
+                errors['title_en'] = "نامک این عنوان انگلیسی قبلا استفاده شده است."
+            if errors:
+                self.errors[number] = errors
+                continue
+            taken_titles.update((code, unique_key(data[f'title_{code}'])) for code in LANGUAGES)
+            taken_slugs.add(data['slug'])
+            unique.append((number, data))
+        return unique
+
+    def store_images(self, rows):
+        """Store the images of every row concurrently, rows with a missing image are rejected"""
+        # A file can only be stored for one image, later rows using it again are rejected
+        used, unique = set(), []
+        for number, data in rows:
+            reused = [ref for ref in data['images'] if ref in used]
+            if reused or len(set(data['images'])) < len(data['images']):
+                self.errors[number] = {'images': ["Each image can only be used once in a batch."]}
+                continue
+            used.update(data['images'])
+            unique.append((number, data))
+        rows = unique
+        jobs = [(number, index, ref) for number, data in rows for index, ref in enumerate(data['images'])]
+
+        def store(job):
+            number, index, ref = job
+            try:
+                return number, index, self.images.store(ref, self.image_field), None
+            except serializers.ValidationError as error:
+                return number, index, None, error.detail
+            except OSError as error:
+                return number, index, None, [f"Image '{ref}' could not be stored: {error}"]
+
+        stored = {number: {} for number, _ in rows}
+        failed = {}
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            for number, index, name, error in executor.map(store, jobs):
+                if error:
+                    failed.setdefault(number, []).extend(error)
+                else:
+                    stored[number][index] = name
+
+        valid = []
+        for number, data in rows:
+            if number in failed:
+                self.errors[number] = {'images': failed[number]}
+                self.delete_images(stored[number].values())
+                continue
+            data['image_names'] = [stored[number][index] for index in range(len(data['images']))]
+            valid.append((number, data))
+        return valid
+
+    def delete_images(self, names):
+        for name in names:
+            if self.images.owns_files:
+                self.image_field.storage.delete(name)
+
+    def create(self, rows):
+        try:
+            return self.write(rows)
+        except Exception:
+            self.delete_images(name for _, data in rows for name in data['image_names'])
+            raise
+
+    def write(self, rows):
+        ArticleTranslation = Article._parler_meta.root_model
+
+        with transaction.atomic():
+            # The images first, so every article is created with its main image
+            images = Image.objects.bulk_create([
+                Image(image=name) for _, data in rows for name in data['image_names']
+            ])
+            image_iter = iter(images)
+            row_images = [[next(image_iter) for _ in data['image_names']] for _, data in rows]
+
+            articles = Article.objects.bulk_create([
+                Article(
+                    author=self.author,
+                    team_id=data['team'],
+                    status=data['status'],
+                    type=data['type'],
+                    video_url=data['video_url'],
+                    scheduled_publish_at=data['scheduled_publish_at'],
+                    slug=data['slug'],
+                    main_image=article_images[0],
+                )
+                for (_, data), article_images in zip(rows, row_images)
+            ])
+
+            translations = [
+                ArticleTranslation(
+                    master_id=article.id,
+                    language_code=code,
+                    title=data[f'title_{code}'],
+                    body=data[f'body_{code}'],
+                    excerpt=make_excerpt(data[f'body_{code}']),
+                    normalized_title=unique_key(data[f'title_{code}']),
+                )
+                for article, (_, data) in zip(articles, rows)
+                for code in LANGUAGES
+            ]
+            ArticleTranslation.objects.bulk_create(translations)
+
+            # The whole batch is normalized in one pass, then written in one bulk update
+            texts = prepare_search_texts(text for translation in translations for text in (translation.title, translation.body))
+            for index, translation in enumerate(translations):
+                translation.search_vector = search_vector_expression(
+                    texts[2 * index], texts[2 * index + 1], translation.language_code
+                )
+            ArticleTranslation.objects.bulk_update(translations, ['search_vector'])
+
+            ArticleImage.objects.bulk_create([
+                ArticleImage(image=image, article=article, position=position)
+                for article, article_images in zip(articles, row_images)
+                for position, image in enumerate(article_images)
+            ])
+
+            # bulk_create sends no post_save signal, invalidate the cached content and
+            # queue the image variants here
+            transaction.on_commit(bump_content_version)
+            queue_variants(images)
+
+        return [
+            {'row': number, 'id': article.id, 'slug': article.slug}
+            for article, (number, _) in zip(articles, rows)
+        ]
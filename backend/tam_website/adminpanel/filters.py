@@ -2,7 +2,6 @@ from csv import DictReader
 from django_filters import rest_framework as filters
 from accounts.models import User
 from django.db.models import Q
-from django.contrib.postgres.search import SearchVector, SearchQuery, SearchRank
 from blog.models.partial import Player
 from blog.models.article import Team, Article
 
@@ -30,12 +29,13 @@ class UserFilter(filters.FilterSet):
         if not value:
             return queryset
         
-        search_words = value.split()
+        search_words = value.upper().split()
         query = Q()
+        # Upper cased like the trigram indexes of the fields
         for word in search_words:
-            query &= (Q(phone_number__icontains=word) |
-                      Q(user_profile__first_name__icontains=word) |
-                      Q(user_profile__last_name__icontains=word))
+            query &= (Q(phone_number__upper__contains=word) |
+                      Q(user_profile__first_name__upper__contains=word) |
+                      Q(user_profile__last_name__upper__contains=word))
         return queryset.filter(query).distinct()
 
 
@@ -59,12 +59,12 @@ class PlayerFilter(filters.FilterSet):
         if search_language == 'en':
             # Search in English translations
             return queryset.filter(
-                Q(translations__name__icontains=value) & Q(translations__language_code='en')
+                Q(translations__name__upper__contains=value.upper()) & Q(translations__language_code='en')
             ).distinct()
         else:
             # Default to search in Persian translations
             return queryset.filter(
-                Q(translations__name__icontains=value) & Q(translations__language_code='fa')
+                Q(translations__name__upper__contains=value.upper()) & Q(translations__language_code='fa')
             ).distinct()
     
     def filter_search_language(self, queryset, name, value):
@@ -87,11 +87,11 @@ class TeamFilter(filters.FilterSet):
         search_language = self.request.query_params.get('search_language', 'fa')
         if search_language == 'en':
             return queryset.filter(
-                Q(translations__name__icontains=value) & Q(translations__language_code='en')
+                Q(translations__name__upper__contains=value.upper()) & Q(translations__language_code='en')
             ).distinct()
         else:
             return queryset.filter(
-                Q(translations__name__icontains=value) & Q(translations__language_code='fa')
+                Q(translations__name__upper__contains=value.upper()) & Q(translations__language_code='fa')
             ).distinct()
     def filter_search_language(self, queryset, name, value):
         return queryset
@@ -111,45 +111,10 @@ class ArticleFilter(filters.FilterSet):
     def filter_search(self, queryset, name, value):
         if not value:
             return queryset
-        
-        try:
-            # Get search language from request, default to 'fa'
-            search_language = self.request.query_params.get('search_language', 'fa')
-            
-            # Use 'simple' configuration as a fallback if language-specific config doesn't exist
-            config = 'simple'
-            
-            # Create search vectors for title and body
-            title_vector = SearchVector('translations__title', weight='A', config=config)
-            body_vector = SearchVector('translations__body', weight='B', config=config)
-            
-            # Combine vectors
-            search_vector = title_vector + body_vector
-            
-            # Create search query with proper escaping
-            search_query = SearchQuery(value, config=config)
-            
-            # Perform the search with ranking
-            return queryset.filter(
-                translations__language_code=search_language
-            ).annotate(
-                rank=SearchRank(search_vector, search_query)
-            ).filter(
-                rank__gt=0.3
-            ).order_by(
-                '-rank',  # Sort by search rank first
-                '-created_date'  # Then by creation date
-            ).distinct()
-        except Exception as e:
-            # If search fails, fall back to simple contains search
-            if search_language == 'en':
-                return queryset.filter(
-                    Q(translations__title__icontains=value) & Q(translations__language_code='en')
-                ).distinct()
-            else:
-                return queryset.filter(
-                    Q(translations__title__icontains=value) & Q(translations__language_code='fa')
-                ).distinct()
+
+        # Get search language from request, default to 'fa'
+        search_language = self.request.query_params.get('search_language', 'fa')
+        return queryset.search(value, search_language)
         
     def filter_status(self, queryset, name, value):
         if not value:
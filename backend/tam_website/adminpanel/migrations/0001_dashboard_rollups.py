@@ -0,0 +1,46 @@
+# Generated by Django 5.2.1 on 2026-10-18 13:04
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        ('blog', '0017_team_player_normalized_name'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DashboardSnapshot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('data', models.JSONField(default=dict)),
+                ('computed_at', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='ArticleDailyStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('views', models.IntegerField(default=0, help_text='New views of the day')),
+                ('likes', models.IntegerField(default=0, help_text='Net likes of the day (unlikes are subtracted)')),
+                ('publishes', models.PositiveSmallIntegerField(default=0, help_text='1 when the article got published that day')),
+                ('view_total', models.PositiveIntegerField(default=0)),
+                ('like_total', models.PositiveIntegerField(default=0)),
+                ('published', models.BooleanField(default=False)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('article', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_stats', to='blog.article')),
+            ],
+            options={
+                'verbose_name': 'Article daily stats',
+                'verbose_name_plural': 'Article daily stats',
+                'indexes': [models.Index(fields=['date'], name='adminpanel_daily_stats_date')],
+                'constraints': [models.UniqueConstraint(fields=('article', 'date'), name='adminpanel_article_daily_stats_unique')],
+            },
+        ),
+    ]
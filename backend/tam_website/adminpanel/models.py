@@ -1,2 +1,50 @@
 from django.db import models
+from django.utils import timezone
 
+
+class ArticleDailyStats(models.Model):
+    """
+    Per-day, per-article activity, maintained by the ``adminpanel.tasks.refresh_dashboard_stats`` job.
+
+    The ``*_total`` columns are the article counters as seen by the last rollup of the day,
+    the daily values are their difference with the previous stored day.
+    """
+    article = models.ForeignKey("blog.Article", on_delete=models.CASCADE, related_name='daily_stats')
+    date = models.DateField()
+
+    views = models.IntegerField(default=0, help_text="New views of the day")
+    likes = models.IntegerField(default=0, help_text="Net likes of the day (unlikes are subtracted)")
+    publishes = models.PositiveSmallIntegerField(default=0, help_text="1 when the article got published that day")
+
+    view_total = models.PositiveIntegerField(default=0)
+    like_total = models.PositiveIntegerField(default=0)
+    published = models.BooleanField(default=False)
+
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = 'Article daily stats'
+        verbose_name_plural = 'Article daily stats'
+        constraints = [
+            models.UniqueConstraint(fields=['article', 'date'], name='adminpanel_article_daily_stats_unique'),
+        ]
+        indexes = [
+            models.Index(fields=['date'], name='adminpanel_daily_stats_date'),
+        ]
+
+    def __str__(self):
+        return f"{self.article_id} - {self.date}"
+
+
+class DashboardSnapshot(models.Model):
+    """
+    The precomputed admin dashboard payload, a single row rebuilt from the rollup table
+    so a dashboard refresh costs one query.
+    """
+    SINGLETON_ID = 1
+
+    data = models.JSONField(default=dict)
+    computed_at = models.DateTimeField(default=timezone.now)
+
+    def __str__(self):
+        return f"Dashboard snapshot ({self.computed_at})"
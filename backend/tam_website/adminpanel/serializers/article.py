@@ -1,14 +1,45 @@
 from rest_framework import serializers
-from blog.models.article import Article, Team, Image
+from blog.models.article import Article, ArticleImage, Team, Image
 from django.db.models import Count
 from accounts.models import Profile
 from django.utils.html import strip_tags
 from django.utils import timezone
 from datetime import datetime
-from celery import current_app
+from django.db import IntegrityError, transaction
+from blog.cache import bump_content_version
+from blog.images import mark_orphan_images, queue_variants, variant_urls
+from blog.media import MediaListSerializer, MediaSerializerMixin, image_names
+from blog.uploads import stored_files
 
 
-class BilingualArticleSerializer(serializers.ModelSerializer):
+TITLE_EXISTS_ERRORS = {
+    'fa': "مقاله‌ای با این عنوان فارسی در سیستم موجود است.",
+    'en': "مقاله‌ای با این عنوان انگلیسی در سیستم موجود است.",
+}
+
+
+def title_errors(titles, exclude_pk=None):
+    """Validation errors of the titles ({language_code: title}) used by another article"""
+    conflicts = Article.conflicting_titles(titles, exclude_pk=exclude_pk)
+    return {f'title_{language_code}': TITLE_EXISTS_ERRORS[language_code] for language_code in sorted(conflicts)}
+
+
+def save_translations_or_raise(save, titles, exclude_pk=None):
+    """
+    Run ``save`` atomically. A title taken by a concurrent request after validation trips the
+    unique constraint, it is reported like the validation error instead of a server error.
+    """
+    try:
+        with transaction.atomic():
+            return save()
+    except IntegrityError:
+        errors = title_errors(titles, exclude_pk=exclude_pk)
+        if not errors:
+            raise
+        raise serializers.ValidationError(errors)
+
+
+class BilingualArticleSerializer(MediaSerializerMixin, serializers.ModelSerializer):
     """
     Serializer for Article model with language selection support
     """
@@ -27,13 +58,15 @@ class BilingualArticleSerializer(serializers.ModelSerializer):
     body_en = serializers.SerializerMethodField()
     video_url = serializers.URLField(required=False, allow_null=True)
     main_image = serializers.SerializerMethodField()
+    main_image_variants = serializers.SerializerMethodField()
     slideshow_images = serializers.SerializerMethodField()
 
     class Meta:
         model = Article
         fields = ['id', 'title', 'title_fa', 'title_en', 'body_fa', 'body_en', 'status', 'type', 'team', 'team_id',
                   'hits_count', 'likes_count', 'updated_date', 'created_date', 'scheduled_publish_at', 
-                  'remaining_time', 'video_url', 'main_image', 'slideshow_images']
+                  'remaining_time', 'video_url', 'main_image', 'main_image_variants', 'slideshow_images']
+        list_serializer_class = MediaListSerializer
     
     def get_title(self, obj):
         # Get the language from request query params or default to 'fa'
@@ -84,10 +117,10 @@ class BilingualArticleSerializer(serializers.ModelSerializer):
         return obj.team.id if obj.team else None
     
     def get_hits_count(self, obj):
-        return obj.hits.count()
+        return obj.view_count
     
     def get_likes_count(self, obj):
-        return obj.likes.count()
+        return obj.like_count
 
     def get_updated_date(self, obj):
         return obj.updated_date.strftime('%Y-%m-%d')
@@ -119,40 +152,29 @@ class BilingualArticleSerializer(serializers.ModelSerializer):
         else:
             return f"{minutes} دقیقه"
     
+    def media_names(self, instance):
+        return [name for image in instance.get_images() for name in image_names(image)]
+
     def get_main_image(self, obj):
         """Get the main image URL for the article"""
-        images = obj.article_images.all()
-        if images.exists():
-            return images.first().image.url
-        return None
-    
+        main_image = obj.get_main_image(obj.get_images())
+        return self.media.url(main_image.image.name) if main_image else None
+
+    def get_main_image_variants(self, obj):
+        """Get the srcset and variant URLs of the main image, None until they are generated"""
+        main_image = obj.get_main_image(obj.get_images())
+        return variant_urls(main_image.image, main_image.variants, self.media) if main_image else None
+
     def get_slideshow_images(self, obj):
-        """Get all slideshow images URLs and IDs for the article"""
+        """Get all slideshow images URLs and IDs for the article, in slideshow order"""
         # Ensure 'request' is in context for `build_absolute_uri`
         if 'request' not in self.context:
             return [] # Or handle error appropriately
 
-        images = obj.article_images.all()
-        if images.count() > 0:
-            main_image_url = None
-            # Assuming the first image linked to the article is the main image
-            # This logic needs to be robust. If main image is explicitly stored, use that.
-            # Otherwise, assuming `article_images` first element is main_image.
-            first_linked_image = obj.article_images.first()
-            if first_linked_image:
-                main_image_url = self.context['request'].build_absolute_uri(first_linked_image.image.url)
-
-            slideshow_data = []
-            for img_obj in images:
-                img_url = self.context['request'].build_absolute_uri(img_obj.image.url)
-                # Ensure we don't include the main image in the slideshow images list if it's distinct
-                if img_url != main_image_url:
-                    slideshow_data.append({
-                        'id': img_obj.id,
-                        'url': img_url
-                    })
-            return slideshow_data
-        return []
+        return [
+            {'id': img_obj.id, 'url': self.media.absolute_url(img_obj.image.name)}
+            for img_obj in obj.get_slideshow_images(obj.get_images())
+        ]
 
 
 class CreateArticleSerializer(serializers.Serializer):
@@ -177,32 +199,17 @@ class CreateArticleSerializer(serializers.Serializer):
         Validate that both language titles are unique and bodies are not empty.
         Also validate the scheduled_publish_at date if provided.
         """
-        # Check if Persian title exists
-        fa_title_exists = False
-        for article in Article.objects.all():
-            if article.has_translation('fa') and article.safe_translation_getter('title', language_code='fa') == data['title_fa']:
-                fa_title_exists = True
-                break
-        
-        # Check if English title exists
-        en_title_exists = False
-        for article in Article.objects.all():
-            if article.has_translation('en') and article.safe_translation_getter('title', language_code='en') == data['title_en']:
-                en_title_exists = True
-                break
-        
         # Check if content is empty (strip HTML tags for comparison)
         if not strip_tags(data['body_fa']).strip():
             raise serializers.ValidationError({"body_fa": "متن مقاله فارسی نمی‌تواند خالی باشد."})
             
         if not strip_tags(data['body_en']).strip():
             raise serializers.ValidationError({"body_en": "متن مقاله انگلیسی نمی‌تواند خالی باشد."})
-                
-        if fa_title_exists:
-            raise serializers.ValidationError({"title_fa": "مقاله‌ای با این عنوان فارسی در سیستم موجود است."})
-        
-        if en_title_exists:
-            raise serializers.ValidationError({"title_en": "مقاله‌ای با این عنوان انگلیسی در سیستم موجود است."})
+
+        # Check if the titles exist, both languages in one query
+        errors = title_errors({'fa': data['title_fa'], 'en': data['title_en']})
+        if errors:
+            raise serializers.ValidationError(errors)
         
         # Validate slideshow images for slideshow type articles
         if data['type'] == Article.Type.SLIDE_SHOW and data.get('slideshow_image_count', 0) < 1:
@@ -233,54 +240,47 @@ class CreateArticleSerializer(serializers.Serializer):
         # Extract scheduled_publish_at if present
         scheduled_publish_at = validated_data.pop('scheduled_publish_at', None)
         
-        # Create the article instance
-        article = Article(
-            team=validated_data.get('team'),
-            status=validated_data.get('status'),
-            type=validated_data.get('type'),
-            video_url=validated_data.get('video_url', ''),
-            author=Profile.objects.get(user=self.context['request'].user),
-            scheduled_publish_at=scheduled_publish_at
-        )
-        
-        # Save without translations first
-        article.save()
-        
-        # Set Persian translations
-        article.set_current_language('fa')
-        article.title = title_fa
-        article.body = body_fa
-        article.save()
-        
-        # Set English translations
-        article.set_current_language('en')
-        article.title = title_en
-        article.body = body_en
-        article.save()
-        
-        # Save main image
-        main_image_obj = Image.objects.create(image=main_image)
-        main_image_obj.article.add(article)
-        
-        # Extract and save slideshow images if present
-        slideshow_images = []
-        for i in range(slideshow_image_count):
-            if f'slideshow_image_{i}' in self.context['request'].FILES:
-                slideshow_image = self.context['request'].FILES[f'slideshow_image_{i}']
-                slideshow_image_obj = Image.objects.create(image=slideshow_image)
-                slideshow_image_obj.article.add(article)
-                slideshow_images.append(slideshow_image_obj)
-        
-        # Schedule publication if needed
-        if scheduled_publish_at and article.status == Article.Status.DRAFT:
-            from blog.tasks import publish_scheduled_article
-            result = publish_scheduled_article.apply_async(
-                args=[article.id],
-                eta=scheduled_publish_at
+        def save():
+            # The main image first, then the slideshow images
+            images = Image.objects.bulk_create([Image(image=name) for name in image_names])
+            # bulk_create sends no post_save signal, queue the image variants here
+            queue_variants(images)
+
+            article = Article(
+                team=validated_data.get('team'),
+                status=validated_data.get('status'),
+                type=validated_data.get('type'),
+                video_url=validated_data.get('video_url', ''),
+                author=Profile.objects.get(user=self.context['request'].user),
+                scheduled_publish_at=scheduled_publish_at,
+                main_image=images[0],
             )
-            article.scheduled_task_id = result.id
+
+            # Both translations are set before the first save, so the article row
+            # (slug included) and each translation are written once
+            article.set_current_language('fa')
+            article.title = title_fa
+            article.body = body_fa
+            article.set_current_language('en')
+            article.title = title_en
+            article.body = body_en
             article.save()
-        
+
+            ArticleImage.objects.bulk_create([
+                ArticleImage(article=article, image=image, position=position)
+                for position, image in enumerate(images)
+            ])
+            return article
+
+        # The files are stored concurrently before the transaction is opened, then the
+        # article, its translations and images are created in one transaction
+        files = self.context['request'].FILES
+        uploads = [main_image] + [
+            files[f'slideshow_image_{i}'] for i in range(slideshow_image_count) if f'slideshow_image_{i}' in files
+        ]
+        with stored_files(Image._meta.get_field('image'), uploads) as image_names:
+            article = save_translations_or_raise(save, {'fa': title_fa, 'en': title_en})
+
         return article
 
 
@@ -317,35 +317,18 @@ class ArticleUpdateSerializer(serializers.Serializer):
         if not instance:
             raise serializers.ValidationError({"error": "مقاله مورد نظر یافت نشد."})
         
-        # Check if Persian title exists in other articles
-        if 'title_fa' in data:
-            fa_title_exists = False
-            for article in Article.objects.exclude(id=instance.id):
-                if article.has_translation('fa') and article.safe_translation_getter('title', language_code='fa') == data['title_fa']:
-                    fa_title_exists = True
-                    break
-            
-            if fa_title_exists:
-                raise serializers.ValidationError({"title_fa": "مقاله‌ای با این عنوان فارسی در سیستم موجود است."})
-            
-            # Check if content is empty (strip HTML tags for comparison)
-            if not strip_tags(data['title_fa']).strip():
-                raise serializers.ValidationError({"title_fa": "عنوان مقاله فارسی نمی‌تواند خالی باشد."})
-        
-        # Check if English title exists in other articles
-        if 'title_en' in data:
-            en_title_exists = False
-            for article in Article.objects.exclude(id=instance.id):
-                if article.has_translation('en') and article.safe_translation_getter('title', language_code='en') == data['title_en']:
-                    en_title_exists = True
-                    break
-            
-            if en_title_exists:
-                raise serializers.ValidationError({"title_en": "مقاله‌ای با این عنوان انگلیسی در سیستم موجود است."})
-            
-            # Check if content is empty (strip HTML tags for comparison)
-            if not strip_tags(data['title_en']).strip():
-                raise serializers.ValidationError({"title_en": "عنوان مقاله انگلیسی نمی‌تواند خالی باشد."})
+        # Check if the titles are empty
+        if 'title_fa' in data and not strip_tags(data['title_fa']).strip():
+            raise serializers.ValidationError({"title_fa": "عنوان مقاله فارسی نمی‌تواند خالی باشد."})
+
+        if 'title_en' in data and not strip_tags(data['title_en']).strip():
+            raise serializers.ValidationError({"title_en": "عنوان مقاله انگلیسی نمی‌تواند خالی باشد."})
+
+        # Check if the titles exist in other articles, both languages in one query
+        titles = {code: data[f'title_{code}'] for code in ('fa', 'en') if f'title_{code}' in data}
+        errors = title_errors(titles, exclude_pk=instance.id)
+        if errors:
+            raise serializers.ValidationError(errors)
         
         # Check if body content is empty if provided
         if 'body_fa' in data and not strip_tags(data['body_fa']).strip():
@@ -357,19 +340,15 @@ class ArticleUpdateSerializer(serializers.Serializer):
         # Validate slideshow images for slideshow type articles
         article_type = data.get('type', self.context.get('article_instance').type)
         if article_type == Article.Type.SLIDE_SHOW:
-            # Get existing slideshow images that are not marked for deletion
-            existing_slideshow_images_kept = self.context.get('article_instance').article_images.exclude(
-                id__in=data.get('deleted_image_ids', [])
-            )
-            # Filter out the main image from `existing_slideshow_images_kept` if it's there
-            # Assuming main image is the first one.
-            main_image_obj = self.context.get('article_instance').article_images.first()
-            if main_image_obj:
-                existing_slideshow_images_kept = existing_slideshow_images_kept.exclude(id=main_image_obj.id)
+            # Get existing slideshow images (the main image excluded) that are not marked for deletion
+            deleted_image_ids = set(data.get('deleted_image_ids', []))
+            existing_slideshow_images_kept = [
+                image for image in instance.get_slideshow_images() if image.id not in deleted_image_ids
+            ]
                 
             new_slideshow_image_count = data.get('slideshow_image_count', 0)
             
-            if new_slideshow_image_count == 0 and existing_slideshow_images_kept.count() == 0:
+            if new_slideshow_image_count == 0 and not existing_slideshow_images_kept:
                 raise serializers.ValidationError({"slideshow_images": "لطفا حداقل یک تصویر برای اسلایدشو انتخاب کنید."})
         
         # Removed scheduled_publish_at validation from here, it will be handled in update method
@@ -396,101 +375,86 @@ class ArticleUpdateSerializer(serializers.Serializer):
         if 'video_url' in validated_data:
             instance.video_url = validated_data.get('video_url', '')
         
-        # Handle scheduled_publish_at and schedule Celery task
-        scheduled_publish_at_changed = False
+        # Scheduled drafts are published by the publish_due_articles task, only the date is stored
         if 'scheduled_publish_at' in validated_data:
             scheduled_publish_at = validated_data.get('scheduled_publish_at')
-            # If scheduled_publish_at is provided, check if it's in the future and schedule the task
             if scheduled_publish_at and (validated_data.get('status', instance.status) == Article.Status.DRAFT):
                 if scheduled_publish_at <= timezone.now():
                     raise serializers.ValidationError({"scheduled_publish_at": "زمان انتشار باید در آینده باشد."})
-                # If scheduled_publish_at changed or was not set before, revoke previous task
-                if instance.scheduled_task_id:
-                    try:
-                        current_app.control.revoke(instance.scheduled_task_id, terminate=True)
-                    except Exception:
-                        pass
                 instance.scheduled_publish_at = scheduled_publish_at
-                # Schedule new task
-                from blog.tasks import publish_scheduled_article
-                result = publish_scheduled_article.apply_async(
-                    args=[instance.id],
-                    eta=scheduled_publish_at
-                )
-                instance.scheduled_task_id = result.id
-                scheduled_publish_at_changed = True
             else:
-                # If scheduled_publish_at is removed or status changed, revoke previous task
-                if instance.scheduled_task_id:
-                    try:
-                        current_app.control.revoke(instance.scheduled_task_id, terminate=True)
-                    except Exception:
-                        pass
-                    instance.scheduled_task_id = None
                 instance.scheduled_publish_at = None
         elif instance.scheduled_publish_at and (validated_data.get('status', instance.status) != Article.Status.DRAFT):
-            # If existing scheduled_publish_at is present but status changed from DRAFT, clear it and revoke
-            if instance.scheduled_task_id:
-                try:
-                    current_app.control.revoke(instance.scheduled_task_id, terminate=True)
-                except Exception:
-                    pass
-                instance.scheduled_task_id = None
+            # The article is no longer a draft, the schedule is dropped
             instance.scheduled_publish_at = None
         
-        # Update translations if provided
-        if 'title_fa' in validated_data or 'body_fa' in validated_data:
-            instance.set_current_language('fa')
-            if 'title_fa' in validated_data:
-                instance.title = validated_data.get('title_fa')
-            if 'body_fa' in validated_data:
-                instance.body = validated_data.get('body_fa')
-            instance.save()
-        
-        if 'title_en' in validated_data or 'body_en' in validated_data:
-            instance.set_current_language('en')
-            if 'title_en' in validated_data:
-                instance.title = validated_data.get('title_en')
-            if 'body_en' in validated_data:
-                instance.body = validated_data.get('body_en')
-            instance.save()
-        
-        # Update main image if provided
-        if 'main_image' in validated_data:
-            main_image = validated_data.get('main_image')
-            # Get the first image (main image) or create a new one
-            main_image_obj = instance.article_images.first()
-            if main_image_obj:
-                # Update existing main image
-                main_image_obj.image = main_image
-                main_image_obj.save()
-            else:
-                # Create new main image
-                main_image_obj = Image.objects.create(image=main_image)
-                main_image_obj.article.add(instance)
-        
-        # Handle deleted slideshow images
-        deleted_image_ids = validated_data.pop('deleted_image_ids', [])
-        for img_id in deleted_image_ids:
-            try:
-                image_obj = Image.objects.get(id=img_id)
-                instance.article_images.remove(image_obj) # Remove the ManyToMany relationship
-                # Optionally, delete the Image object itself if it's no longer linked to any article
-                if image_obj.article.count() == 0:
-                    image_obj.delete() # This deletes the file from storage
-            except Image.DoesNotExist:
-                pass # Image already deleted or never existed
-
-        # Add new slideshow images (files sent via request.FILES)
-        new_slideshow_image_count = validated_data.get('slideshow_image_count', 0)
-        for i in range(new_slideshow_image_count):
-            file_key = f'slideshow_image_{i}'
-            if file_key in self.context['request'].FILES:
-                slideshow_image_file = self.context['request'].FILES[file_key]
-                slideshow_image_obj = Image.objects.create(image=slideshow_image_file)
-                slideshow_image_obj.article.add(instance)
-        
-        # Save the instance
-        instance.save()
-        
+        # Update translations if provided, everything changed is written by one save
+        def save():
+            for code in ('fa', 'en'):
+                if f'title_{code}' in validated_data or f'body_{code}' in validated_data:
+                    instance.set_current_language(code)
+                    if f'title_{code}' in validated_data:
+                        instance.title = validated_data.get(f'title_{code}')
+                    if f'body_{code}' in validated_data:
+                        instance.body = validated_data.get(f'body_{code}')
+            images = instance.get_images()
+            new_images = []
+
+            # Update main image if provided
+            if main_image is not None:
+                main_image_obj = instance.get_main_image(images)
+                if main_image_obj:
+                    # Update existing main image
+                    main_image_obj.image = image_names[0]
+                    main_image_obj.save(update_fields=['image'])
+                else:
+                    # Create new main image
+                    instance.main_image = Image.objects.create(image=image_names[0])
+                    new_images.append(instance.main_image)
+
+            # Add new slideshow images (files sent via request.FILES) after the current ones
+            slideshow_names = image_names[1:] if main_image is not None else image_names
+            if slideshow_names:
+                slideshow_images = Image.objects.bulk_create([Image(image=name) for name in slideshow_names])
+                queue_variants(slideshow_images)
+                new_images.extend(slideshow_images)
+            if new_images:
+                ArticleImage.objects.bulk_create([
+                    ArticleImage(article=instance, image=image, position=position)
+                    for position, image in enumerate(new_images, start=instance.next_image_position())
+                ])
+                # bulk_create sends no post_save signal, invalidate the cached content here
+                transaction.on_commit(bump_content_version)
+
+            instance.save_dirty()
+
+        # The new files are stored concurrently before the transaction is opened
+        main_image = validated_data.get('main_image')
+        files = self.context['request'].FILES
+        uploads = ([main_image] if main_image is not None else []) + [
+            files[f'slideshow_image_{i}']
+            for i in range(validated_data.get('slideshow_image_count', 0))
+            if f'slideshow_image_{i}' in files
+        ]
+        titles = {code: validated_data[f'title_{code}'] for code in ('fa', 'en') if f'title_{code}' in validated_data}
+        with stored_files(Image._meta.get_field('image'), uploads) as image_names:
+            save_translations_or_raise(save, titles, exclude_pk=instance.id)
+
+        # Handle deleted slideshow images, the whole batch with one query per step
+        deleted_image_ids = set(validated_data.pop('deleted_image_ids', []))
+        if deleted_image_ids:
+            with transaction.atomic():
+                ArticleImage.objects.filter(article=instance, image_id__in=deleted_image_ids).delete()
+
+                if instance.main_image_id in deleted_image_ids:
+                    # The first remaining image becomes the main image
+                    first_link = ArticleImage.objects.filter(article=instance).first()
+                    instance.main_image_id = first_link.image_id if first_link else None
+                    instance.save(update_fields=['main_image'])
+
+                # Images no other article uses are deleted with their files by the
+                # collect_orphan_images task, outside of the request
+                mark_orphan_images(deleted_image_ids)
+                transaction.on_commit(bump_content_version)
+
         return instance
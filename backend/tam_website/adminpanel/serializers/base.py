@@ -0,0 +1,88 @@
+from datetime import datetime, time, timedelta
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+from rest_framework import serializers
+from blog.models.managers import conflicting_translations
+from ..stats import VIEW_STATS_BUCKETS, VIEW_STATS_MAX_BUCKETS
+
+
+class TranslatedUniqueValidator:
+    """
+    Serializer validator for the bilingual fields of a parler model (``<field>_fa``, ``<field>_en``).
+    Rejects values already used by another object in the same language, checking all the
+    submitted languages in one query on the indexed ``normalized_<field>`` column.
+    On update the serializer instance is excluded.
+    """
+    requires_context = True
+
+    def __init__(self, model, field, messages):
+        self.model = model
+        self.field = field
+        self.messages = messages
+
+    def __call__(self, attrs, serializer):
+        values = {
+            language_code: attrs[f'{self.field}_{language_code}']
+            for language_code in self.messages
+            if attrs.get(f'{self.field}_{language_code}')
+        }
+        instance = serializer.instance
+        conflicts = conflicting_translations(
+            self.model, self.field, values, exclude_pk=instance.pk if instance is not None else None
+        )
+        if conflicts:
+            raise serializers.ValidationError({
+                f'{self.field}_{language_code}': self.messages[language_code]
+                for language_code in self.messages if language_code in conflicts
+            })
+
+
+class DateOrDateTimeField(serializers.CharField):
+    """
+    An ISO date or datetime, returned as an aware datetime.
+    A plain date is the start of the day, or the start of the next day with ``end_of_day``
+    so that it can be used as an inclusive upper bound.
+    """
+
+    def __init__(self, end_of_day=False, **kwargs):
+        self.end_of_day = end_of_day
+        super().__init__(**kwargs)
+
+    def to_internal_value(self, data):
+        value = super().to_internal_value(data)
+        try:
+            moment = parse_datetime(value)
+            if moment is None:
+                day = parse_date(value)
+                if day is None:
+                    raise ValueError
+                moment = datetime.combine(day + timedelta(days=1) if self.end_of_day else day, time.min)
+        except ValueError:
+            raise serializers.ValidationError("Enter a valid date or datetime (ISO 8601).")
+        if timezone.is_naive(moment):
+            moment = timezone.make_aware(moment)
+        return moment
+
+
+class ViewStatsQuerySerializer(serializers.Serializer):
+    """Query parameters of the view statistics endpoint"""
+    start = DateOrDateTimeField(required=False)
+    end = DateOrDateTimeField(required=False, end_of_day=True)
+    bucket = serializers.ChoiceField(choices=list(VIEW_STATS_BUCKETS), default='day')
+
+    def get_fields(self):
+        # "from" is a keyword, the fields can't be declared with their parameter names
+        fields = super().get_fields()
+        fields['from'] = fields.pop('start')
+        fields['to'] = fields.pop('end')
+        return fields
+
+    def validate(self, attrs):
+        step = VIEW_STATS_BUCKETS[attrs['bucket']]
+        attrs.setdefault('to', timezone.now())
+        attrs.setdefault('from', attrs['to'] - 7 * VIEW_STATS_BUCKETS['day'])
+        if attrs['from'] >= attrs['to']:
+            raise serializers.ValidationError({'from': "Must be before 'to'."})
+        if (attrs['to'] - attrs['from']) / step > VIEW_STATS_MAX_BUCKETS:
+            raise serializers.ValidationError({'bucket': f"At most {VIEW_STATS_MAX_BUCKETS} buckets can be requested."})
+        return attrs
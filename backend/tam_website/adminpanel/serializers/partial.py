@@ -1,10 +1,14 @@
+from django.db import transaction
 from rest_framework import serializers
 from blog.models.partial import Player
 from blog.models.article import Team
+from blog.media import MediaListSerializer, MediaSerializerMixin
+from blog.uploads import stored_files
+from .base import TranslatedUniqueValidator
 
 
 
-class BilingualPlayerSerializer(serializers.ModelSerializer):
+class BilingualPlayerSerializer(MediaSerializerMixin, serializers.ModelSerializer):
     """
     Serializer for Player model with language selection support
     """
@@ -14,6 +18,7 @@ class BilingualPlayerSerializer(serializers.ModelSerializer):
     class Meta:
         model = Player
         fields = ['id', 'name', 'image', 'number', 'position', 'goals', 'games']
+        list_serializer_class = MediaListSerializer
     
     def get_name(self, obj):
         # Get the language from request query params or default to 'fa'
@@ -49,11 +54,12 @@ class BilingualPlayerSerializer(serializers.ModelSerializer):
         return obj.position
 
 
-class BilingualTeamSerializer(serializers.ModelSerializer):
+class BilingualTeamSerializer(MediaSerializerMixin, serializers.ModelSerializer):
     name = serializers.SerializerMethodField()
     class Meta:
         model = Team
         fields = ['id', 'name', 'image', 'slug']
+        list_serializer_class = MediaListSerializer
     def get_name(self, obj):
         search_language = self.context.get('request').query_params.get('search_language', 'fa')
         if search_language == 'en':
@@ -86,31 +92,12 @@ class PlayerCreateSerializer(serializers.Serializer):
             raise serializers.ValidationError("Player number must be between 1 and 99.")
         return value
     
-    def validate(self, data):
-        """
-        Validate that both language names are unique
-        """
-        # Check if Persian name exists
-        fa_exists = False
-        for player in Player.objects.all():
-            if player.has_translation('fa') and player.safe_translation_getter('name', language_code='fa') == data['name_fa']:
-                fa_exists = True
-                break
-        
-        # Check if English name exists
-        en_exists = False
-        for player in Player.objects.all():
-            if player.has_translation('en') and player.safe_translation_getter('name', language_code='en') == data['name_en']:
-                en_exists = True
-                break
-                
-        if fa_exists:
-            raise serializers.ValidationError({"name_fa": "بازیکنی با این نام فارسی در سیستم موجود است."})
-        
-        if en_exists:
-            raise serializers.ValidationError({"name_en": "بازیکنی با این نام انگلیسی در سیستم موجود است."})
-            
-        return data
+    class Meta:
+        # Both language names must be unique
+        validators = [TranslatedUniqueValidator(Player, 'name', {
+            'fa': "بازیکنی با این نام فارسی در سیستم موجود است.",
+            'en': "بازیکنی با این نام انگلیسی در سیستم موجود است.",
+        })]
     
     def create(self, validated_data):
         """
@@ -122,29 +109,26 @@ class PlayerCreateSerializer(serializers.Serializer):
         
         # Create the player instance
         player = Player(
-            image=validated_data.get('image'),
             number=validated_data.get('number'),
             position=validated_data.get('position'),
             goals=validated_data.get('goals'),
             games=validated_data.get('games')
         )
-        
-        # Save without translations first
-        player.save()
-        
-        # Set translations
+        # One save writes the player and both translations
         player.set_current_language('fa')
         player.name = name_fa
-        player.save()
-        
         player.set_current_language('en')
         player.name = name_en
-        player.save()
+
+        # The image is stored before the transaction, it is deleted again if the player can't be saved
+        with stored_files(Player._meta.get_field('image'), [validated_data['image']]) as (image_name,), transaction.atomic():
+            player.image = image_name
+            player.save()
         
         return player
 
 
-class PlayerDetailSerializer(serializers.ModelSerializer):
+class PlayerDetailSerializer(MediaSerializerMixin, serializers.ModelSerializer):
     """
     Serializer for retrieving detailed player information including translations
     """
@@ -171,37 +155,6 @@ class PlayerUpdateSerializer(PlayerCreateSerializer):
     Serializer for updating an existing Player with bilingual support
     """
     image = serializers.ImageField(required=False)  # Image is optional during update
-        
-    def validate(self, data):
-        """
-        Override validate to check name uniqueness excluding the current instance
-        """
-        # Get the current instance being updated
-        instance = self.context.get('player_instance')
-        
-        # Check if Persian name exists for other players
-        fa_exists = False
-        if 'name_fa' in data:
-            for player in Player.objects.exclude(id=instance.id):
-                if player.has_translation('fa') and player.safe_translation_getter('name', language_code='fa') == data['name_fa']:
-                    fa_exists = True
-                    break
-        
-        # Check if English name exists for other players
-        en_exists = False
-        if 'name_en' in data:
-            for player in Player.objects.exclude(id=instance.id):
-                if player.has_translation('en') and player.safe_translation_getter('name', language_code='en') == data['name_en']:
-                    en_exists = True
-                    break
-                
-        if fa_exists:
-            raise serializers.ValidationError({"name_fa": "بازیکنی با این نام فارسی در سیستم موجود است."})
-        
-        if en_exists:
-            raise serializers.ValidationError({"name_en": "بازیکنی با این نام انگلیسی در سیستم موجود است."})
-            
-        return data
     
     def update(self, instance, validated_data):
         """
@@ -211,23 +164,26 @@ class PlayerUpdateSerializer(PlayerCreateSerializer):
         name_fa = validated_data.pop('name_fa', None)
         name_en = validated_data.pop('name_en', None)
         
+        image = validated_data.pop('image', None)
+        
         # Update regular fields
         for attr, value in validated_data.items():
             setattr(instance, attr, value)
-        
-        # Save without translations first
-        instance.save()
-        
+
         # Update translations if provided
         if name_fa:
             instance.set_current_language('fa')
             instance.name = name_fa
-            instance.save()
-        
         if name_en:
             instance.set_current_language('en')
             instance.name = name_en
-            instance.save()
+        
+        # Only the changed fields and translations are written, a new image is stored
+        # before the transaction and deleted again if the player can't be saved
+        with stored_files(Player._meta.get_field('image'), [image] if image else []) as image_names, transaction.atomic():
+            if image_names:
+                instance.image = image_names[0]
+            instance.save_dirty()
         
         return instance
 
@@ -237,44 +193,31 @@ class TeamCreateSerializer(serializers.Serializer):
     name_en = serializers.CharField(max_length=250, required=True)
     image = serializers.ImageField(required=True)
 
-    def validate(self, data):
-        from blog.models.article import Team
-        # Check if Persian name exists
-        fa_exists = False
-        for team in Team.objects.all():
-            if team.has_translation('fa') and team.safe_translation_getter('name', language_code='fa') == data['name_fa']:
-                fa_exists = True
-                break
-        # Check if English name exists
-        en_exists = False
-        for team in Team.objects.all():
-            if team.has_translation('en') and team.safe_translation_getter('name', language_code='en') == data['name_en']:
-                en_exists = True
-                break
-        if fa_exists:
-            raise serializers.ValidationError({"name_fa": "تیمی با این نام فارسی در سیستم موجود است."})
-        if en_exists:
-            raise serializers.ValidationError({"name_en": "تیمی با این نام انگلیسی در سیستم موجود است."})
-        return data
+    class Meta:
+        # Both language names must be unique
+        validators = [TranslatedUniqueValidator(Team, 'name', {
+            'fa': "تیمی با این نام فارسی در سیستم موجود است.",
+            'en': "تیمی با این نام انگلیسی در سیستم موجود است.",
+        })]
 
     def create(self, validated_data):
         from blog.models.article import Team
         name_fa = validated_data.pop('name_fa')
         name_en = validated_data.pop('name_en')
-        team = Team(
-            image=validated_data.get('image')
-        )
-        team.save()
+        team = Team()
+        # One save writes the team (slug included) and both translations
         team.set_current_language('fa')
         team.name = name_fa
-        team.save()
         team.set_current_language('en')
         team.name = name_en
-        team.save()
+        # The image is stored before the transaction, it is deleted again if the team can't be saved
+        with stored_files(Team._meta.get_field('image'), [validated_data['image']]) as (image_name,), transaction.atomic():
+            team.image = image_name
+            team.save()
         return team
 
 
-class TeamDetailSerializer(serializers.ModelSerializer):
+class TeamDetailSerializer(MediaSerializerMixin, serializers.ModelSerializer):
     name_fa = serializers.SerializerMethodField()
     name_en = serializers.SerializerMethodField()
     class Meta:
@@ -296,48 +239,27 @@ class TeamUpdateSerializer(TeamCreateSerializer):
     """
     image = serializers.ImageField(required=False)  # Image is optional during update
 
-    def validate(self, data):
-        from blog.models.article import Team
-        # Get the current instance being updated
-        instance = self.context.get('team_instance')
-        # Check if Persian name exists for other teams
-        fa_exists = False
-        if 'name_fa' in data:
-            for team in Team.objects.exclude(id=instance.id):
-                if team.has_translation('fa') and team.safe_translation_getter('name', language_code='fa') == data['name_fa']:
-                    fa_exists = True
-                    break
-        # Check if English name exists for other teams
-        en_exists = False
-        if 'name_en' in data:
-            for team in Team.objects.exclude(id=instance.id):
-                if team.has_translation('en') and team.safe_translation_getter('name', language_code='en') == data['name_en']:
-                    en_exists = True
-                    break
-        if fa_exists:
-            raise serializers.ValidationError({"name_fa": "تیمی با این نام فارسی در سیستم موجود است."})
-        if en_exists:
-            raise serializers.ValidationError({"name_en": "تیمی با این نام انگلیسی در سیستم موجود است."})
-        return data
-
     def update(self, instance, validated_data):
         # Extract name translations if provided
         name_fa = validated_data.pop('name_fa', None)
         name_en = validated_data.pop('name_en', None)
+        image = validated_data.pop('image', None)
         # Update regular fields
         for attr, value in validated_data.items():
             setattr(instance, attr, value)
-        # Save without translations first
-        instance.save()
         # Update translations if provided
         if name_fa:
             instance.set_current_language('fa')
             instance.name = name_fa
-            instance.save()
         if name_en:
             instance.set_current_language('en')
             instance.name = name_en
-            instance.save()
+        # Only the changed fields and translations are written, a new image is stored
+        # before the transaction and deleted again if the team can't be saved
+        with stored_files(Team._meta.get_field('image'), [image] if image else []) as image_names, transaction.atomic():
+            if image_names:
+                instance.image = image_names[0]
+            instance.save_dirty()
         return instance
 
 
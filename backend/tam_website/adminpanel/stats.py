@@ -0,0 +1,181 @@
+from datetime import datetime, time, timedelta
+from django.conf import settings
+from django.db.models import Count, Q, Sum
+from django.db.models.functions import Trunc
+from django.utils import timezone
+from accounts.models import User
+from blog.models import Article, Team, Player, MiddleArticleIpAddress
+from .models import ArticleDailyStats, DashboardSnapshot
+
+
+# Days covered by the "recent" dashboard figures
+DASHBOARD_RECENT_DAYS = 7
+# Number of articles in the top viewed/liked lists
+DASHBOARD_TOP_ARTICLES = 3
+
+# Bucket sizes of the view statistics and the maximum number of buckets of one request
+VIEW_STATS_BUCKETS = {'day': timedelta(days=1), 'hour': timedelta(hours=1)}
+VIEW_STATS_MAX_BUCKETS = 24 * 31
+
+
+def rollup_article_stats(day=None, batch_size=1000):
+    """
+    Store the activity of ``day`` (today by default) in ArticleDailyStats.
+
+    The daily values are the difference between the current article counters and the
+    totals stored on the last previous day, so running it several times a day is safe.
+    Articles without any change since that day get no row.
+    """
+    day = day or timezone.localdate()
+
+    # Latest totals before the day, one row per article
+    previous = {
+        article_id: totals
+        for article_id, *totals in ArticleDailyStats.objects.filter(date__lt=day)
+        .order_by('article_id', '-date').distinct('article_id')
+        .values_list('article_id', 'view_total', 'like_total', 'published')
+    }
+    # Rows of the day must be rewritten even when the change was reverted since the last run
+    current = set(ArticleDailyStats.objects.filter(date=day).values_list('article_id', flat=True))
+
+    rows = []
+    articles = Article.objects.order_by().values_list('id', 'view_count', 'like_count', 'status')
+    for article_id, view_count, like_count, status in articles.iterator(chunk_size=batch_size):
+        view_total, like_total, was_published = previous.get(article_id, (0, 0, False))
+        published = status == Article.Status.PUBLISHED
+        views, likes = view_count - view_total, like_count - like_total
+        if article_id not in current and not views and not likes and published == was_published:
+            continue
+
+        rows.append(ArticleDailyStats(
+            article_id=article_id,
+            date=day,
+            views=views,
+            likes=likes,
+            publishes=int(published and not was_published),
+            view_total=view_count,
+            like_total=like_count,
+            published=published,
+        ))
+
+    ArticleDailyStats.objects.bulk_create(
+        rows,
+        batch_size=batch_size,
+        update_conflicts=True,
+        unique_fields=['article', 'date'],
+        update_fields=['views', 'likes', 'publishes', 'view_total', 'like_total', 'published', 'updated_at'],
+    )
+    return len(rows)
+
+
+def _bucket_starts(start, end, bucket):
+    tz = timezone.get_current_timezone()
+    if bucket == 'day':
+        day, last = timezone.localtime(start, tz).date(), timezone.localtime(end - timedelta(microseconds=1), tz).date()
+        while day <= last:
+            yield timezone.make_aware(datetime.combine(day, time.min), tz)
+            day += timedelta(days=1)
+    else:
+        moment = timezone.localtime(start, tz).replace(minute=0, second=0, microsecond=0)
+        while moment < end:
+            yield moment
+            moment += VIEW_STATS_BUCKETS['hour']
+
+
+def view_buckets(start, end, bucket='day'):
+    """
+    Number of article views per ``bucket`` ('day' or 'hour', in the site timezone) between
+    ``start`` (included) and ``end`` (excluded), empty buckets included. The range filter on
+    ``created_at`` limits the scan to the partitions of the hit table covering it.
+    """
+    rows = MiddleArticleIpAddress.objects.filter(
+        created_at__gte=start,
+        created_at__lt=end,
+    ).annotate(
+        bucket=Trunc('created_at', bucket, tzinfo=timezone.get_current_timezone()),
+    ).values('bucket').annotate(views=Count('id')).order_by('bucket')
+
+    counts = {row['bucket']: row['views'] for row in rows}
+    return [
+        {'bucket': moment.isoformat(), 'views': counts.get(moment, 0)}
+        for moment in _bucket_starts(start, end, bucket)
+    ]
+
+
+def _top_articles(per_article, field):
+    top = list(per_article.filter(**{f'{field}__gt': 0}).order_by(f'-{field}')[:DASHBOARD_TOP_ARTICLES])
+    articles = Article.objects.prefetch_related('translations').in_bulk([row['article_id'] for row in top])
+    return [
+        {
+            'id': article.id,
+            'title': article.get_title('fa') or article.get_title('en'),
+            field: row[field],
+            'slug': article.slug,
+        }
+        for row in top
+        if (article := articles.get(row['article_id']))
+    ]
+
+
+def build_dashboard_data(today=None):
+    """Compute the dashboard payload from the rollup table and the table counts"""
+    today = today or timezone.localdate()
+    since = today - timedelta(days=DASHBOARD_RECENT_DAYS - 1)
+
+    article_counts = Article.objects.aggregate(
+        total=Count('id'),
+        published=Count('id', filter=Q(status=Article.Status.PUBLISHED)),
+        draft=Count('id', filter=Q(status=Article.Status.DRAFT)),
+    )
+    rollup = ArticleDailyStats.objects.aggregate(
+        total_views=Sum('views'),
+        recent_views=Sum('views', filter=Q(date__gte=since)),
+        recent_likes=Sum('likes', filter=Q(date__gte=since)),
+        recent_publishes=Sum('publishes', filter=Q(date__gte=since)),
+    )
+    per_article = ArticleDailyStats.objects.values('article_id').annotate(
+        views=Sum('views'),
+        likes=Sum('likes'),
+    ).order_by()
+
+    return {
+        'users': User.objects.count(),
+        'articles': article_counts['total'],
+        'teams': Team.objects.count(),
+        'players': Player.objects.count(),
+        'total_views': rollup['total_views'] or 0,
+        'published_articles': article_counts['published'],
+        'draft_articles': article_counts['draft'],
+        'recent_views': rollup['recent_views'] or 0,
+        'recent_likes': rollup['recent_likes'] or 0,
+        'recent_publishes': rollup['recent_publishes'] or 0,
+        'daily_views': view_buckets(
+            timezone.make_aware(datetime.combine(since, time.min)),
+            timezone.make_aware(datetime.combine(today + timedelta(days=1), time.min)),
+        ),
+        'top_viewed_articles': _top_articles(per_article, 'views'),
+        'top_liked_articles': _top_articles(per_article, 'likes'),
+    }
+
+
+def refresh_dashboard_snapshot():
+    snapshot, _ = DashboardSnapshot.objects.update_or_create(
+        pk=DashboardSnapshot.SINGLETON_ID,
+        defaults={'data': build_dashboard_data(), 'computed_at': timezone.now()},
+    )
+    return snapshot
+
+
+def get_dashboard_snapshot(max_age=None):
+    """
+    Return the dashboard snapshot, a single query while it is fresh.
+    A missing snapshot or one older than ``max_age`` seconds (``DASHBOARD_STATS_MAX_AGE``
+    by default) means the periodic job is not running, it is then rebuilt in place.
+    """
+    if max_age is None:
+        max_age = settings.DASHBOARD_STATS_MAX_AGE
+    snapshot = DashboardSnapshot.objects.filter(pk=DashboardSnapshot.SINGLETON_ID).first()
+    if snapshot is None or timezone.now() - snapshot.computed_at > timedelta(seconds=max_age):
+        rollup_article_stats()
+        snapshot = refresh_dashboard_snapshot()
+    return snapshot
@@ -0,0 +1,17 @@
+from celery import shared_task
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+@shared_task
+def refresh_dashboard_stats():
+    """
+    Periodic task that rolls the article counters up into ArticleDailyStats
+    and rebuilds the admin dashboard snapshot from it.
+    """
+    from .stats import refresh_dashboard_snapshot, rollup_article_stats
+
+    rows = rollup_article_stats()
+    refresh_dashboard_snapshot()
+    return f"Rolled up {rows} article daily stats"
@@ -1,3 +1,318 @@
-from django.test import TestCase
+import json
+import re
+from datetime import timedelta
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection
+from django.db.models import Index
+from django.test import RequestFactory, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.exceptions import ValidationError
+from rest_framework.request import Request
+from accounts.models import Profile, User
+from blog.models import Article, ArticleImage, Image, Player, Team
+from .serializers.article import ArticleUpdateSerializer, BilingualArticleSerializer, save_translations_or_raise, title_errors
+from .serializers.partial import PlayerUpdateSerializer, TeamCreateSerializer, TeamUpdateSerializer
+from .bulk import BulkArticleImporter, UploadedImages, parse_ndjson
+from .filters import PlayerFilter, TeamFilter, UserFilter
+from .models import ArticleDailyStats
+from .stats import get_dashboard_snapshot, refresh_dashboard_snapshot, rollup_article_stats, view_buckets
+from blog.models import IpAddress, MiddleArticleIpAddress
+from blog.partitions import list_partitions, month_start
 
-# Create your tests here.
+
+class ArticleTitleUniquenessTests(TestCase):
+
+    def create_article(self, title_fa, title_en):
+        article = Article()
+        article.set_current_language('fa')
+        article.title = title_fa
+        article.body = 'متن'
+        article.set_current_language('en')
+        article.title = title_en
+        article.body = 'Body'
+        article.save()
+        return article
+
+    def test_titles_are_compared_normalized_in_one_query(self):
+        article = self.create_article('گزارش بازي', 'Match Report')
+
+        with self.assertNumQueries(1):
+            errors = title_errors({'fa': 'گزارش بازی', 'en': 'match report'})
+        self.assertEqual(set(errors), {'title_fa', 'title_en'})
+        self.assertEqual(title_errors({'fa': 'گزارش بازی'}, exclude_pk=article.pk), {})
+
+    def test_duplicate_created_after_validation_is_a_validation_error(self):
+        self.create_article('گزارش بازی', 'Match report')
+
+        # Validation passed, a concurrent request stored the same title in the meantime
+        with self.assertRaises(ValidationError) as context:
+            save_translations_or_raise(
+                lambda: self.create_article('عنوان دیگر', 'MATCH REPORT'),
+                {'fa': 'عنوان دیگر', 'en': 'MATCH REPORT'},
+            )
+        self.assertEqual(set(context.exception.detail), {'title_en'})
+        self.assertEqual(Article.objects.count(), 1)
+
+
+class TranslatedUniqueValidatorTests(TestCase):
+
+    def setUp(self):
+        self.team = Team()
+        self.team.set_current_language('fa')
+        self.team.name = 'استقلال كرمان'
+        self.team.set_current_language('en')
+        self.team.name = 'Esteghlal'
+        self.team.save()
+
+    def test_names_are_checked_in_one_query(self):
+        with self.assertNumQueries(1):
+            with self.assertRaises(ValidationError) as context:
+                TeamCreateSerializer().run_validators({'name_fa': 'استقلال کرمان', 'name_en': 'ESTEGHLAL'})
+        self.assertEqual(set(context.exception.detail), {'name_fa', 'name_en'})
+
+    def test_update_excludes_the_instance(self):
+        serializer = TeamUpdateSerializer(self.team, data={'name_fa': 'استقلال کرمان', 'name_en': 'Esteghlal'}, partial=True)
+        self.assertTrue(serializer.is_valid(), serializer.errors)
+
+
+class PlayerSaveTests(TestCase):
+
+    def setUp(self):
+        player = Player(position=Player.Positions.FORWARD, number=9)
+        player.set_current_language('fa')
+        player.name = 'علی کریمی'
+        player.set_current_language('en')
+        player.name = 'Ali Karimi'
+        player.save()
+        self.player = Player.objects.get(pk=player.pk)
+
+    def writes(self, queries):
+        return [query['sql'].split('"')[1] for query in queries if query['sql'].startswith(('INSERT', 'UPDATE'))]
+
+    def test_update_only_writes_the_changed_translation(self):
+        serializer = PlayerUpdateSerializer(self.player, data={'name_en': 'Ali Karimi Jr'}, partial=True)
+        self.assertTrue(serializer.is_valid(), serializer.errors)
+
+        with CaptureQueriesContext(connection) as queries:
+            serializer.save()
+
+        self.assertEqual(self.writes(queries), ['blog_player_translation'])
+        self.assertEqual(Player.objects.get(pk=self.player.pk).get_name('en'), 'Ali Karimi Jr')
+
+    def test_unchanged_player_is_not_written(self):
+        serializer = PlayerUpdateSerializer(self.player, data={'number': 9}, partial=True)
+        self.assertTrue(serializer.is_valid(), serializer.errors)
+
+        with CaptureQueriesContext(connection) as queries:
+            serializer.save()
+
+        self.assertEqual(self.writes(queries), [])
+
+
+class TrigramSearchIndexTests(TestCase):
+    """
+    The admin search filters compare the expressions of the trigram indexes.
+    """
+
+    def indexed_expression(self, model, name):
+        # A btree copy of the index has its expression, gin_trgm_ops may not be installed
+        opclass, = next(index for index in model._meta.indexes if index.name == name).expressions
+        with connection.schema_editor() as editor:
+            editor.add_index(model, Index(*opclass.get_source_expressions(), name=f'{name}_copy'))
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT pg_get_indexdef(%s::regclass)", [f'{name}_copy'])
+            return re.search(r'USING btree \((.*)\)$', cursor.fetchone()[0])[1]
+
+    def plan(self, queryset):
+        sql, params = queryset.query.sql_with_params()
+        with connection.cursor() as cursor:
+            cursor.execute("SET LOCAL enable_seqscan = off")
+            cursor.execute(f"EXPLAIN {sql}", params)
+            plan = '\n'.join(row[0] for row in cursor.fetchall())
+        # Join plans qualify the columns with their table
+        return re.sub(r'\b[a-z_]+\.', '', plan)
+
+    def assert_reads_index(self, plan, model, name):
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT 1 FROM pg_indexes WHERE indexname = %s", [name])
+            exists = cursor.fetchone()
+        self.assertIn(self.indexed_expression(model, name), plan)
+        if exists:
+            self.assertIn(name, plan)
+
+    def test_name_searches_read_the_trigram_indexes(self):
+        for model, filterset in ((Player, PlayerFilter), (Team, TeamFilter)):
+            request = Request(RequestFactory().get('/', {'search': 'ali', 'search_language': 'en'}))
+            plan = self.plan(filterset(request.query_params, queryset=model.objects.all(), request=request).qs)
+            translations = model._parler_meta.root_model
+            self.assert_reads_index(plan, translations, f'blog_{model._meta.model_name}_tr_name_trgm')
+
+    def test_user_search_compares_the_indexed_expressions(self):
+        plan = self.plan(UserFilter({'search': 'ali'}, queryset=User.objects.all()).qs)
+
+        self.assertIn(self.indexed_expression(User, 'accounts_user_phone_trgm'), plan)
+        self.assertIn(self.indexed_expression(Profile, 'accounts_profile_first_trgm'), plan)
+        self.assertIn(self.indexed_expression(Profile, 'accounts_profile_last_trgm'), plan)
+
+
+class DashboardRollupTests(TestCase):
+
+    def setUp(self):
+        self.article = Article(status=Article.Status.PUBLISHED, view_count=5, like_count=2)
+        self.article.set_current_language('en')
+        self.article.title = 'Rollup'
+        self.article.body = 'Body'
+        self.article.save()
+
+    def test_daily_rows_store_the_difference_with_the_previous_day(self):
+        yesterday = timezone.localdate() - timedelta(days=1)
+        rollup_article_stats(day=yesterday)
+        Article.objects.filter(pk=self.article.pk).update(view_count=9, like_count=1)
+        rollup_article_stats()
+        rollup_article_stats()
+
+        today = ArticleDailyStats.objects.get(article=self.article, date=timezone.localdate())
+        self.assertEqual((today.views, today.likes, today.publishes), (4, -1, 0))
+        self.assertEqual(ArticleDailyStats.objects.get(date=yesterday).publishes, 1)
+
+    def test_fresh_snapshot_is_read_in_one_query(self):
+        rollup_article_stats()
+        refresh_dashboard_snapshot()
+
+        with self.assertNumQueries(1):
+            snapshot = get_dashboard_snapshot()
+        self.assertEqual(snapshot.data['total_views'], 5)
+        self.assertEqual(snapshot.data['top_liked_articles'][0]['id'], self.article.id)
+
+
+class ViewStatsTests(TestCase):
+
+    def test_views_are_bucketed_per_day_including_empty_days(self):
+        article = Article()
+        article.set_current_language('en')
+        article.title = 'Views'
+        article.body = 'Body'
+        article.save()
+        ip = IpAddress.objects.create(ip='10.0.0.1')
+        now = timezone.now()
+        for days_ago in (0, 0, 2, 40):
+            MiddleArticleIpAddress.objects.create(article=article, ipaddress=ip, created_at=now - timedelta(days=days_ago))
+
+        buckets = view_buckets(now - timedelta(days=3), now + timedelta(seconds=1))
+        self.assertEqual([bucket['views'] for bucket in buckets][-3:], [1, 0, 2])
+        self.assertEqual(sum(bucket['views'] for bucket in buckets), 3)
+
+    def test_hit_table_is_partitioned_by_month(self):
+        self.assertIn(month_start(timezone.now()), list_partitions())
+
+
+@override_settings(STORAGES={
+    'default': {'BACKEND': 'django.core.files.storage.InMemoryStorage'},
+    'staticfiles': {'BACKEND': 'django.contrib.staticfiles.storage.StaticFilesStorage'},
+})
+class BulkArticleImportTests(TestCase):
+
+    def setUp(self):
+        self.team = Team()
+        self.team.set_current_language('en')
+        self.team.name = 'Bulk team'
+        self.team.save()
+
+    def row(self, title_en, title_fa, images):
+        return json.dumps({
+            'title_en': title_en, 'title_fa': title_fa, 'body_en': '<p>English body</p>', 'body_fa': '<p>متن</p>',
+            'team': self.team.id, 'status': Article.Status.PUBLISHED, 'images': images,
+        })
+
+    def test_valid_rows_are_created_and_invalid_rows_reported(self):
+        lines = [
+            self.row('Season opener', 'بازی اول', ['a.jpg', 'b.jpg']),
+            self.row('SEASON OPENER', 'بازی دوم', ['c.jpg']),
+            '{not json',
+            self.row('Missing image', 'بدون تصویر', ['missing.jpg']),
+        ]
+        files = {name: SimpleUploadedFile(name, b'image', content_type='image/jpeg') for name in ('a.jpg', 'b.jpg', 'c.jpg')}
+
+        report = BulkArticleImporter(None, UploadedImages(files), max_workers=2).run(parse_ndjson(lines))
+
+        self.assertEqual([row['row'] for row in report['created']], [1])
+        self.assertEqual({error['row']: set(error['errors']) for error in report['errors']}, {
+            2: {'title_en'}, 3: {'non_field_errors'}, 4: {'images'},
+        })
+        article = Article.objects.get(pk=report['created'][0]['id'])
+        self.assertEqual(article.slug, 'season-opener')
+        self.assertEqual(article.article_images.count(), 2)
+        self.assertEqual(Article.objects.search('opener', 'en').get(), article)
+
+
+@override_settings(STORAGES={
+    'default': {'BACKEND': 'django.core.files.storage.InMemoryStorage'},
+    'staticfiles': {'BACKEND': 'django.contrib.staticfiles.storage.StaticFilesStorage'},
+})
+class ArticleImageOrderTests(TestCase):
+
+    def create_slideshow(self, index):
+        images = Image.objects.bulk_create([Image(image=f'article-images/{index}-{name}.png') for name in 'abc'])
+        article = Article(type=Article.Type.SLIDE_SHOW, main_image=images[1])
+        article.set_current_language('en')
+        article.title = f'Slideshow {index}'
+        article.body = 'Body'
+        article.save()
+        # The main image is linked last, the slideshow is ordered by position not by id
+        ArticleImage.objects.bulk_create([
+            ArticleImage(article=article, image=images[2], position=0),
+            ArticleImage(article=article, image=images[0], position=1),
+            ArticleImage(article=article, image=images[1], position=2),
+        ])
+        return article
+
+    def serialize(self):
+        request = Request(RequestFactory().get('/'))
+        articles = Article.objects.with_images().order_by('pk')
+        return BilingualArticleSerializer(articles, many=True, context={'request': request}).data
+
+    def test_main_image_and_slideshow_are_read_from_the_prefetched_images(self):
+        self.create_slideshow(1)
+        with self.assertNumQueries(3):
+            self.serialize()
+
+        self.create_slideshow(2)
+        with self.assertNumQueries(3):
+            data = self.serialize()
+        self.assertTrue(data[1]['main_image'].endswith('article-images/2-b.png'))
+        self.assertEqual(
+            [image['url'].rsplit('/', 1)[-1] for image in data[1]['slideshow_images']], ['2-c.png', '2-a.png'],
+        )
+
+    def test_update_validation_counts_the_kept_slideshow_images(self):
+        article = self.create_slideshow(1)
+        article = Article.objects.with_images().get(pk=article.pk)
+        slideshow_ids = [image.id for image in article.get_slideshow_images()]
+
+        serializer = ArticleUpdateSerializer(data={'deleted_image_ids': slideshow_ids}, partial=True, context={
+            'article_instance': article,
+        })
+        with self.assertNumQueries(0):
+            self.assertFalse(serializer.is_valid())
+        self.assertIn('slideshow_images', serializer.errors)
+
+    def test_removed_images_are_unlinked_in_bulk_and_marked_as_orphans(self):
+        article = self.create_slideshow(1)
+        article = Article.objects.with_images().get(pk=article.pk)
+        main_image, first, second = article.get_images()
+
+        serializer = ArticleUpdateSerializer(data={'deleted_image_ids': [main_image.id, first.id]}, partial=True, context={
+            'article_instance': article, 'request': Request(RequestFactory().get('/')),
+        })
+        self.assertTrue(serializer.is_valid(), serializer.errors)
+        with CaptureQueriesContext(connection) as queries:
+            serializer.update(article, {'deleted_image_ids': [main_image.id, first.id]})
+        # delete the links, pick the new main image, save it, mark the orphans
+        statements = [query['sql'] for query in queries if 'SAVEPOINT' not in query['sql']]
+        self.assertEqual(len(statements), 4, statements)
+
+        article = Article.objects.with_images().get(pk=article.pk)
+        self.assertEqual(article.get_images(), [second])
+        self.assertEqual(article.main_image_id, second.id)
+        self.assertEqual(set(Image.objects.filter(orphaned_at__isnull=False)), {main_image, first})
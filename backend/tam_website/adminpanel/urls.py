@@ -14,6 +14,7 @@ urlpatterns = [
     
     # Dashboard
     path('admin-dashboard-data/', views.dashboard_stats_view, name='dashboard-stats'),
+    path('stats/views/', views.view_stats_view, name='view-stats'),
     
     # User management
     path('users/', views.AdminUserListView.as_view(), name='admin-user-list'),
@@ -41,6 +42,7 @@ urlpatterns = [
     # Article management
     path('article-filter-data/', views.AdminArticleFilterDataView.as_view(), name='article-filter-data'),
     path('article-create/', views.CreateArticleView.as_view(), name='article-create'),
+    path('articles/bulk/', views.BulkCreateArticlesView.as_view(), name='article-bulk-create'),
     path('article-detail/<int:article_id>/', views.ArticleDetailView.as_view(), name='article-detail'),
     path('article-update/<int:article_id>/', views.UpdateArticleView.as_view(), name='article-update'),
     path('article-delete/<int:article_id>/', views.delete_article, name='article-delete'),
@@ -10,16 +10,20 @@ from .base import BasePagination
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework import status
 from django.utils import timezone
-from blog.tasks import publish_scheduled_article
 from permissions import *
 from django.utils.translation import get_language, gettext_lazy as _
+from django.conf import settings
+from rest_framework.parsers import MultiPartParser
+from accounts.models import Profile
+from ..bulk import BulkArticleImporter, NDJSONParser, StoredImages, UploadedImages, parse_ndjson
 
 
 class AdminArticleListView(viewsets.ReadOnlyModelViewSet):
     """
     Viewset for listing or retrieving articles.
     """
-    queryset = Article.objects.all()
+    # The images of the whole page are loaded at once, their URLs resolved in one batch
+    queryset = Article.objects.with_images()
     serializer_class = BilingualArticleSerializer
     filterset_class = ArticleFilter
     filter_backends = [DjangoFilterBackend]
@@ -73,7 +77,7 @@ class ArticleDetailView(RetrieveAPIView):
     """
     View for retrieving article details for editing
     """
-    queryset = Article.objects.all()
+    queryset = Article.objects.with_images()
     serializer_class = BilingualArticleSerializer
     permission_classes = [IsAuthorAndSuperuser]
     lookup_url_kwarg = 'article_id'
@@ -83,7 +87,7 @@ class UpdateArticleView(UpdateAPIView):
     """
     View for updating an existing article
     """
-    queryset = Article.objects.all()
+    queryset = Article.objects.with_images()
     serializer_class = ArticleUpdateSerializer
     permission_classes = [IsAuthorAndSuperuser]
     lookup_url_kwarg = 'article_id'
@@ -130,6 +134,42 @@ class UpdateArticleView(UpdateAPIView):
                 status=status.HTTP_400_BAD_REQUEST
             )
 
+class BulkCreateArticlesView(APIView):
+    """
+    Create many articles at once.
+
+    The body is either NDJSON (``application/x-ndjson``, one article per line, images are
+    names of files already in the media storage) or a multipart batch whose ``articles``
+    file holds the NDJSON and whose other files are the images, referenced by field name.
+    Invalid rows are reported with their line number and don't prevent the others from
+    being created.
+    """
+    permission_classes = [IsAuthorAndSuperuser]
+    parser_classes = [NDJSONParser, MultiPartParser]
+
+    def post(self, request):
+        if request.content_type.startswith('multipart/'):
+            batch = request.FILES.get('articles')
+            lines = batch if batch else []
+            images = UploadedImages(request.FILES)
+        else:
+            lines = request.data
+            images = StoredImages()
+
+        rows = parse_ndjson(lines)
+        if not rows:
+            return Response({"detail": "هیچ مقاله‌ای ارسال نشده است."}, status=status.HTTP_400_BAD_REQUEST)
+        if len(rows) > settings.ARTICLE_BULK_MAX_ROWS:
+            return Response(
+                {"detail": f"حداکثر {settings.ARTICLE_BULK_MAX_ROWS} مقاله در هر درخواست مجاز است."},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        author, _ = Profile.objects.get_or_create(user=request.user)
+        report = BulkArticleImporter(author, images).run(rows)
+        return Response(report, status=status.HTTP_201_CREATED if report['created'] else status.HTTP_400_BAD_REQUEST)
+
+
 class AdminArticleFilterDataView(APIView):
     """
     View to return all article filter options.
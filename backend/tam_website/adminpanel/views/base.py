@@ -5,13 +5,13 @@ from rest_framework import status
 from ..serializers.user import AdminAccessUserSerializer # Import the new serializer
 from ..serializers import *
 from rest_framework.decorators import api_view, permission_classes
-from accounts.models import User
 from permissions import *
 from rest_framework.pagination import PageNumberPagination
-from django.db.models import Q, Count
 from django_filters.rest_framework import DjangoFilterBackend
 from rest_framework.views import APIView
-from blog.models import Article, Team, MiddleArticleIpAddress, Player # Import Player model
+from blog.redis import UniqueViewerCounter
+from ..stats import get_dashboard_snapshot, view_buckets
+from ..serializers.base import ViewStatsQuerySerializer
 from django.utils import timezone
 from datetime import timedelta
 
@@ -42,71 +42,50 @@ def dashboard_stats_view(request):
     - Total teams
     - Total players # Added for player count
     - Total site views
+    - Unique site visitors of the last 7 days
     - Daily view statistics for the last 7 days
     - Recent articles
     - Top viewed articles
     - Top liked articles
+    Everything but the unique visitors is read from the dashboard snapshot, see adminpanel/stats.py.
     """
     try:
-        
-        # Basic counts
-        users_count = User.objects.count()
-        articles_count = Article.objects.count()
-        teams_count = Team.objects.count()
-        players_count = Player.objects.count() # Get players count
-        
-        # Calculate total views (unique IP addresses that viewed articles)
-        total_views = MiddleArticleIpAddress.objects.values('ipaddress').count()
-        
-        
-        # Article status distribution
-        published_articles = Article.objects.filter(status='PB').count()
-        draft_articles = Article.objects.filter(status='DR').count()
-        
-        
-        # Get top viewed articles (top 3 by view count)
-        top_viewed_articles = []
-        viewed_articles = Article.objects.annotate(
-            view_count=Count('viewed_articles', distinct=True)
-        ).filter(view_count__gt=0).order_by('-view_count')[:3]
-        
-        for article in viewed_articles:
-            top_viewed_articles.append({
-                'id': article.id,
-                'title': article.get_title('fa') or article.get_title('en'),
-                'views': article.view_count,
-                'slug': article.slug
-            })
-        
-        # Get top liked articles (top 3 by like count)
-        top_liked_articles = []
-        liked_articles = Article.objects.annotate(
-            like_count=Count('likes', distinct=True)
-        ).filter(like_count__gt=0).order_by('-like_count')[:3]
-        
-        for article in liked_articles:
-            top_liked_articles.append({
-                'id': article.id,
-                'title': article.get_title('fa') or article.get_title('en'),
-                'likes': article.like_count,
-                'slug': article.slug
-            })
-        
+        # Counts and top articles are precomputed by the refresh_dashboard_stats job
+        snapshot = get_dashboard_snapshot()
+
+        # Unique visitors of the last 7 days (merged daily HyperLogLogs)
+        today = timezone.localdate()
+        unique_visitors = UniqueViewerCounter().unique_viewers(today - timedelta(days=6), today)
+
         return Response({
-            'users': users_count,
-            'articles': articles_count,
-            'teams': teams_count,
-            'players': players_count, # Include players count in response
-            'total_views': total_views,
-            'published_articles': published_articles,
-            'draft_articles': draft_articles,
-            'top_viewed_articles': top_viewed_articles,
-            'top_liked_articles': top_liked_articles
+            **snapshot.data,
+            'unique_visitors': unique_visitors,
+            'computed_at': snapshot.computed_at,
         })
     except Exception as e:
         return Response({'error': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 
+@api_view(['GET'])
+@permission_classes([IsAuthorAndSuperuser])
+def view_stats_view(request):
+    """
+    Article views per day or hour.
+    Query parameters: ``from`` and ``to`` (ISO dates or datetimes, ``to`` dates are inclusive,
+    defaults to the last 7 days) and ``bucket`` (day|hour).
+    """
+    params = ViewStatsQuerySerializer(data=request.query_params)
+    params.is_valid(raise_exception=True)
+    start, end, bucket = params.validated_data['from'], params.validated_data['to'], params.validated_data['bucket']
+
+    return Response({
+        'from': start,
+        'to': end,
+        'bucket': bucket,
+        'results': view_buckets(start, end, bucket),
+    })
+
+
     
 
 class BasePagination(PageNumberPagination):
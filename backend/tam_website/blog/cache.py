@@ -0,0 +1,139 @@
+from django.conf import settings
+from django.core.cache import cache
+from django_redis import get_redis_connection
+from redis.exceptions import LockError, WatchError
+from .media import MediaUrls
+
+
+CONTENT_VERSION_KEY = "blog:content-version"
+
+
+def get_content_version():
+    """
+    Return the current version of the public blog content.
+    Cached payloads are keyed by it, so bumping the version invalidates all of them at once.
+    """
+    version = cache.get(CONTENT_VERSION_KEY)
+    if version is None:
+        cache.add(CONTENT_VERSION_KEY, 1, timeout=None)
+        version = cache.get(CONTENT_VERSION_KEY, 1)
+    return version
+
+
+def bump_content_version():
+    """Invalidate every payload keyed by the content version"""
+    try:
+        return cache.incr(CONTENT_VERSION_KEY)
+    except ValueError:
+        # The version key was evicted, start a new sequence
+        cache.add(CONTENT_VERSION_KEY, 1, timeout=None)
+        return cache.incr(CONTENT_VERSION_KEY)
+
+
+def warm_content_version(entries, version, timeout=None):
+    """
+    Bump the content version from ``version`` and store ``entries``, (key function,
+    arguments, value) triples rendered while ``version`` was current whose keys are made
+    with the new version, in the same Redis transaction: the first readers of the new
+    version find them cached. Entries of content changed meanwhile are dropped, the
+    version is only bumped. Returns the new version.
+    """
+    timeout, _ = payload_timeouts(timeout)
+    version_key = cache.make_key(CONTENT_VERSION_KEY)
+    with get_redis_connection('default').pipeline() as pipe:
+        try:
+            pipe.watch(version_key)
+            # Like get_content_version(), an evicted version key starts a new sequence
+            if int(pipe.get(version_key) or 1) != version:
+                raise WatchError
+            pipe.multi()
+            pipe.set(version_key, version + 1)
+            for key, args, value in entries:
+                pipe.set(cache.make_key(key(*args, version=version + 1)), cache.client.encode(value), ex=timeout)
+            pipe.execute()
+            return version + 1
+        except WatchError:
+            # The content was changed since the entries were rendered, they may be stale
+            pipe.reset()
+            return bump_content_version()
+
+
+def home_cache_key(language_code, version=None):
+    if version is None:
+        version = get_content_version()
+    return f"blog:home:{language_code}:v{version}"
+
+
+def home_stale_cache_key(language_code, version=None):
+    """The last built home payload, served while a new one is built. It outlives the content versions"""
+    return f"blog:home:{language_code}:stale"
+
+
+def article_cache_key(article_id, language_code, version=None):
+    if version is None:
+        version = get_content_version()
+    return f"blog:article:{article_id}:{language_code}:v{version}"
+
+
+def related_cache_key(article_id, language_code, version=None):
+    if version is None:
+        version = get_content_version()
+    return f"blog:article:{article_id}:related:{language_code}:v{version}"
+
+
+def payload_timeouts(timeout=None):
+    """
+    Seconds a built payload and its stale copy are cached for. Payloads hold media URLs,
+    signed ones are only guaranteed valid for ``MEDIA_SIGNED_URL_MIN_VALIDITY`` seconds,
+    so neither copy outlives them. The stale copy doesn't expire with unsigned URLs.
+    """
+    timeout = timeout or settings.BLOG_CACHE_TIMEOUT
+    validity = MediaUrls().validity()
+    if validity is None:
+        return timeout, None
+    return min(timeout, validity), validity
+
+
+def get_or_build(key, builder, stale_key=None, timeout=None):
+    """
+    Return the cached value of ``key``, building it with ``builder()`` on a miss.
+
+    Only the worker holding the rebuild lock runs the builder. The other workers serve
+    the last built value stored under ``stale_key`` if there is one, otherwise they wait
+    for the lock holder and read its result.
+    """
+    timeout, stale_timeout = payload_timeouts(timeout)
+    value = cache.get(key)
+    if value is not None:
+        return value
+
+    lock = cache.lock(f"{key}:lock", timeout=settings.BLOG_CACHE_LOCK_TIMEOUT)
+    if not lock.acquire(blocking=False):
+        if stale_key:
+            stale = cache.get(stale_key)
+            if stale is not None:
+                return stale
+
+        # Wait for the worker that is rebuilding the value
+        if lock.acquire(blocking=True, blocking_timeout=settings.BLOG_CACHE_LOCK_TIMEOUT):
+            value = cache.get(key)
+            if value is not None:
+                lock.release()
+                return value
+        else:
+            # The lock holder is taking too long, build it here as well
+            return builder()
+
+    try:
+        value = builder()
+        cache.set(key, value, timeout=timeout)
+        if stale_key:
+            # Only served while a rebuild is running, kept as long as its URLs are valid
+            cache.set(stale_key, value, timeout=stale_timeout)
+    finally:
+        try:
+            lock.release()
+        except LockError:
+            # The lock expired while building
+            pass
+    return value
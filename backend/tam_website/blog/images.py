@@ -0,0 +1,180 @@
+"""
+Responsive image variants.
+
+Every uploaded article, team and player image gets resized copies (``IMAGE_VARIANT_WIDTHS``)
+encoded in the ``IMAGE_VARIANT_FORMATS``, stored beside the original by the
+``generate_image_variants`` Celery task. The model's ``variants`` field records them::
+
+    {"source": "article-images/a.png",
+     "card": {"width": 640, "height": 360, "webp": "article-images/a-card.webp"}, ...}
+
+``source`` is the image the variants were made from, variants of a replaced image are
+ignored until the new ones are generated.
+
+Article images linked to no article anymore are marked with ``orphaned_at`` and deleted,
+files and variants included, by the periodic ``collect_orphan_images`` task.
+"""
+import json
+import logging
+import os
+from io import BytesIO
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.db import connection, transaction
+from django.db.models import Exists, OuterRef
+from django.utils import timezone
+from PIL import Image as PILImage, ImageOps
+from .media import MediaUrls
+from .uploads import delete_files, delete_stored_files, save_file
+
+
+logger = logging.getLogger(__name__)
+
+# Pillow format names of the variant formats
+FORMATS = {'webp': 'WEBP', 'avif': 'AVIF'}
+
+
+def variant_names(variants):
+    """Names of the stored files of a ``variants`` value"""
+    return [
+        name
+        for size, variant in variants.items() if size != 'source'
+        for fmt, name in variant.items() if fmt in FORMATS
+    ]
+
+
+def needs_variants(instance):
+    """True when the image of ``instance`` has no variants made from it yet"""
+    return bool(instance.image) and instance.variants.get('source') != instance.image.name
+
+
+def create_variants(field_file):
+    """Store the variants of the image ``field_file`` and return their ``variants`` value"""
+    with field_file.open('rb'):
+        image = PILImage.open(field_file)
+        image.load()
+    image = ImageOps.exif_transpose(image)
+    if image.mode not in ('RGB', 'RGBA'):
+        image = image.convert('RGBA' if 'transparency' in image.info or image.mode in ('LA', 'PA') else 'RGB')
+
+    root = os.path.splitext(os.path.basename(field_file.name))[0]
+    variants = {'source': field_file.name}
+    try:
+        for size, width in settings.IMAGE_VARIANT_WIDTHS.items():
+            # Images are never enlarged
+            resized = image.copy()
+            resized.thumbnail((min(width, image.width), image.height), PILImage.LANCZOS)
+            variant = {'width': resized.width, 'height': resized.height}
+            for fmt in settings.IMAGE_VARIANT_FORMATS:
+                output = BytesIO()
+                resized.save(output, FORMATS[fmt], quality=settings.IMAGE_VARIANT_QUALITY)
+                variant[fmt] = save_file(field_file.field, ContentFile(output.getvalue(), name=f'{root}-{size}.{fmt}'))
+            variants[size] = variant
+    except Exception:
+        delete_files(field_file.field, variant_names(variants))
+        raise
+    return variants
+
+
+def queue_variants(instances):
+    """Generate the missing variants of ``instances`` once the current transaction commits"""
+    pending = [(instance._meta.label, instance.pk) for instance in instances if needs_variants(instance)]
+    if not pending:
+        return
+
+    def queue():
+        from .tasks import generate_image_variants
+        for label, pk in pending:
+            try:
+                generate_image_variants.delay(label, pk)
+            except Exception:
+                # The originals are still served, the variants can be generated later
+                logger.exception("Could not queue the image variants of %s %s", label, pk)
+
+    transaction.on_commit(queue)
+
+
+def variant_urls(field_file, variants, media=None):
+    """
+    The ``srcset`` of every format and the URL and dimensions of every variant of
+    ``field_file``, or None while its variants are not generated. URLs come from
+    ``media`` (a blog.media.MediaUrls).
+    """
+    if not field_file or variants.get('source') != field_file.name:
+        return None
+    media = media or MediaUrls(field_file.storage)
+    sizes = {size: variant for size, variant in variants.items() if size != 'source'}
+    return {
+        'srcset': {
+            fmt: ', '.join(
+                f"{media.url(variant[fmt])} {variant['width']}w"
+                for variant in sorted(sizes.values(), key=lambda variant: variant['width']) if fmt in variant
+            )
+            for fmt in FORMATS if any(fmt in variant for variant in sizes.values())
+        },
+        'variants': {
+            size: {
+                'width': variant['width'],
+                'height': variant['height'],
+                **{fmt: media.url(variant[fmt]) for fmt in FORMATS if fmt in variant},
+            }
+            for size, variant in sizes.items()
+        },
+    }
+
+
+def orphan_images():
+    """The article images neither linked to an article nor used as its main image"""
+    from .models import Article, ArticleImage, Image
+    return Image.objects.filter(
+        ~Exists(ArticleImage.objects.filter(image=OuterRef('pk'))),
+        ~Exists(Article.objects.filter(main_image=OuterRef('pk'))),
+    )
+
+
+def mark_orphan_images(image_ids=None):
+    """Mark the orphan images (among ``image_ids`` when given) for collection, returns their number"""
+    images = orphan_images().filter(orphaned_at__isnull=True)
+    if image_ids is not None:
+        images = images.filter(pk__in=image_ids)
+    return images.update(orphaned_at=timezone.now())
+
+
+# Deletes a batch of the images marked before a date, checking again that they are still
+# orphans. Rows locked by a concurrent sweep are skipped.
+DELETE_ORPHANS_SQL = """
+DELETE FROM {image} WHERE id IN (
+    SELECT image.id FROM {image} image
+    WHERE image.orphaned_at <= %(before)s
+      AND NOT EXISTS (SELECT 1 FROM {links} links WHERE links.image_id = image.id)
+      AND NOT EXISTS (SELECT 1 FROM {article} article WHERE article.main_image_id = image.id)
+    ORDER BY image.orphaned_at
+    LIMIT %(limit)s
+    FOR UPDATE SKIP LOCKED
+)
+RETURNING image, variants
+"""
+
+
+def delete_orphan_images(before, limit):
+    """
+    Delete up to ``limit`` orphan images marked before ``before`` in one statement, their
+    files and variants are deleted once the transaction commits. Returns the deleted count.
+    """
+    from .models import Article, ArticleImage, Image
+    with connection.cursor() as cursor:
+        cursor.execute(
+            DELETE_ORPHANS_SQL.format(
+                image=Image._meta.db_table, links=ArticleImage._meta.db_table, article=Article._meta.db_table,
+            ),
+            {'before': before, 'limit': limit},
+        )
+        rows = cursor.fetchall()
+
+    names = []
+    for name, variants in rows:
+        names.append(name)
+        names.extend(variant_names(variants if isinstance(variants, dict) else json.loads(variants)))
+    storage = Image._meta.get_field('image').storage
+    transaction.on_commit(lambda: delete_stored_files(storage, names))
+    return len(rows)
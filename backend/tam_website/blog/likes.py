@@ -0,0 +1,71 @@
+"""
+Article likes.
+
+Liking and unliking are each one SQL statement: the like row is inserted (or deleted) and
+``Article.like_count`` is adjusted only when a row was actually inserted (or deleted), so
+repeated or concurrent requests of the same visitor can't move the counter twice and
+concurrent likes of different visitors are serialized by the article row lock.
+"""
+from django.db import connection
+from .models import Article
+
+
+def _run(sql, slug, ip_id):
+    article_table = Article._meta.db_table
+    likes_table = Article.likes.through._meta.db_table
+    with connection.cursor() as cursor:
+        cursor.execute(
+            sql.format(article=article_table, likes=likes_table),
+            {'slug': slug, 'status': Article.Status.PUBLISHED, 'ip_id': ip_id},
+        )
+        return cursor.fetchone()
+
+
+LIKE_SQL = """
+WITH article AS (
+    SELECT id, like_count FROM {article} WHERE slug = %(slug)s AND status = %(status)s
+), liked AS (
+    INSERT INTO {likes} (article_id, ipaddress_id)
+    SELECT id, %(ip_id)s FROM article
+    ON CONFLICT (article_id, ipaddress_id) DO NOTHING
+    RETURNING article_id
+), counted AS (
+    UPDATE {article} SET like_count = like_count + 1
+    WHERE id IN (SELECT article_id FROM liked)
+    RETURNING like_count
+)
+SELECT COALESCE((SELECT like_count FROM counted), article.like_count) FROM article
+"""
+
+UNLIKE_SQL = """
+WITH article AS (
+    SELECT id, like_count FROM {article} WHERE slug = %(slug)s AND status = %(status)s
+), unliked AS (
+    DELETE FROM {likes}
+    WHERE article_id = (SELECT id FROM article) AND ipaddress_id = %(ip_id)s
+    RETURNING article_id
+), counted AS (
+    UPDATE {article} SET like_count = GREATEST(like_count - 1, 0)
+    WHERE id IN (SELECT article_id FROM unliked)
+    RETURNING like_count
+)
+SELECT COALESCE((SELECT like_count FROM counted), article.like_count) FROM article
+"""
+
+
+def like_article(slug, ip_id):
+    """
+    Like the published article ``slug`` for the visitor ``ip_id``.
+    Returns the like count of the article, or None when there is no such article.
+    """
+    row = _run(LIKE_SQL, slug, ip_id)
+    return row[0] if row else None
+
+
+def unlike_article(slug, ip_id):
+    """
+    Remove the like of the visitor ``ip_id`` from the published article ``slug``.
+    Returns the like count of the article, or None when there is no such article.
+    """
+    row = _run(UNLIKE_SQL, slug, ip_id)
+    return row[0] if row else None
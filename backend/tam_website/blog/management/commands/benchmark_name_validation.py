@@ -0,0 +1,67 @@
+import random
+import statistics
+import time
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+from faker import Faker
+from blog.models import Player
+from blog.utils.normalization import unique_key
+from adminpanel.serializers.partial import PlayerCreateSerializer
+
+
+class Command(BaseCommand):
+    help = 'Measures the player name uniqueness validation while the roster grows'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', type=int, nargs='+', default=[100, 1000, 10000, 100000], help='Roster sizes to measure')
+        parser.add_argument('--queries', type=int, default=200, help='Number of measured validations per size')
+
+    def handle(self, *args, **options):
+        random.seed(0)
+        self.fake = {'en': Faker('en_US'), 'fa': Faker('fa_IR')}
+        serializer = PlayerCreateSerializer()
+        validator = PlayerCreateSerializer.Meta.validators[0]
+
+        # Everything is seeded in a transaction and rolled back at the end
+        with transaction.atomic():
+            seeded = 0
+            for size in sorted(options['sizes']):
+                self.seed(size - seeded)
+                seeded = size
+                with connection.cursor() as cursor:
+                    cursor.execute(f'ANALYZE {Player._parler_meta.root_model._meta.db_table}')
+
+                timings = []
+                with CaptureQueriesContext(connection) as queries:
+                    for _ in range(options['queries']):
+                        attrs = {'name_fa': self.fake['fa'].name(), 'name_en': self.fake['en'].name()}
+                        start = time.perf_counter()
+                        try:
+                            validator(attrs, serializer)
+                        except Exception:
+                            # Taken names are rejected, the cost is the same
+                            pass
+                        timings.append((time.perf_counter() - start) * 1000)
+
+                self.stdout.write(self.style.SUCCESS(
+                    f'{size} players: median {statistics.median(timings):.2f} ms, max {max(timings):.2f} ms, '
+                    f'{len(queries) / options["queries"]:.0f} query per validation'
+                ))
+
+            transaction.set_rollback(True)
+
+    def seed(self, count):
+        players = Player.objects.bulk_create(
+            [Player(position=random.choice(Player.Positions.values)) for _ in range(count)],
+            batch_size=5000,
+        )
+        PlayerTranslation = Player._parler_meta.root_model
+        translations = []
+        for player in players:
+            for language_code, fake in self.fake.items():
+                name = fake.name()
+                translations.append(PlayerTranslation(
+                    master_id=player.pk, language_code=language_code, name=name, normalized_name=unique_key(name)
+                ))
+        PlayerTranslation.objects.bulk_create(translations, batch_size=5000)
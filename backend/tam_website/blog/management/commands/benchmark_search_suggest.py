@@ -0,0 +1,96 @@
+import random
+import statistics
+import time
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from faker import Faker
+from blog.models import Article, Team, Player
+from blog.suggest import suggest, suggestion_querysets
+
+
+SEED_PREFIX = 'suggest-bench-'
+
+
+class Command(BaseCommand):
+    help = 'Seeds articles, teams and players and measures the search suggestion latency'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=100000, help='Number of seeded articles, with en and fa translations')
+        parser.add_argument('--queries', type=int, default=200, help='Number of measured suggestion requests')
+        parser.add_argument('--keep', action='store_true', help='Keep the seeded rows instead of rolling them back')
+
+    def handle(self, *args, **options):
+        random.seed(0)
+        self.fake = {'en': Faker('en_US'), 'fa': Faker('fa_IR')}
+
+        with transaction.atomic():
+            self.stdout.write(f"Seeding {options['rows']} articles...")
+            titles = self.seed(options['rows'])
+
+            with connection.cursor() as cursor:
+                for model in (Article, Team, Player):
+                    cursor.execute(f'ANALYZE {model._parler_meta.root_model._meta.db_table}')
+
+            for language_code in ('en', 'fa'):
+                queries = [self.misspell(random.choice(titles[language_code])) for _ in range(options['queries'])]
+                self.measure(language_code, queries)
+
+            if not options['keep']:
+                transaction.set_rollback(True)
+
+    def seed(self, rows):
+        """Bulk creates the rows and returns the seeded title words per language"""
+        teams = Team.objects.bulk_create([Team(slug=f'{SEED_PREFIX}team-{index}') for index in range(max(rows // 100, 1))])
+        players = Player.objects.bulk_create(
+            [Player(position=random.choice(Player.Positions.values)) for _ in range(max(rows // 10, 1))],
+            batch_size=5000,
+        )
+        articles = Article.objects.bulk_create(
+            [
+                Article(slug=f'{SEED_PREFIX}{index}', status=Article.Status.PUBLISHED, team=random.choice(teams))
+                for index in range(rows)
+            ],
+            batch_size=5000,
+        )
+
+        titles = {'en': [], 'fa': []}
+        for model, objects, field, fake_value in (
+            (Team, teams, 'name', lambda fake: fake.city()),
+            (Player, players, 'name', lambda fake: fake.name()),
+            (Article, articles, 'title', lambda fake: fake.sentence(nb_words=6)),
+        ):
+            translations = []
+            for obj in objects:
+                for language_code, fake in self.fake.items():
+                    value = fake_value(fake)
+                    titles[language_code].extend(word.strip('.') for word in value.split() if len(word) > 4)
+                    translations.append(model._parler_meta.root_model(
+                        master_id=obj.pk, language_code=language_code, **{field: value}, **self.extra_fields(model)
+                    ))
+            model._parler_meta.root_model.objects.bulk_create(translations, batch_size=5000)
+        return titles
+
+    def extra_fields(self, model):
+        return {'body': ''} if model is Article else {}
+
+    def misspell(self, word):
+        """Replaces one inner letter so the suggestions have to be typo tolerant"""
+        if len(word) < 5:
+            return word
+        index = random.randrange(1, len(word) - 1)
+        return word[:index] + random.choice(word) + word[index + 1:]
+
+    def measure(self, language_code, queries):
+        timings = []
+        for query in queries:
+            start = time.perf_counter()
+            suggest(query, language_code)
+            timings.append((time.perf_counter() - start) * 1000)
+
+        timings.sort()
+        p95 = timings[int(len(timings) * 0.95) - 1]
+        self.stdout.write(self.style.SUCCESS(
+            f'{language_code}: {len(timings)} requests, median {statistics.median(timings):.1f} ms, '
+            f'p95 {p95:.1f} ms, max {timings[-1]:.1f} ms'
+        ))
+        self.stdout.write(suggestion_querysets(queries[0], language_code)['articles'].explain(analyze=True))
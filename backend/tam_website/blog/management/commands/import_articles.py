@@ -0,0 +1,40 @@
+import json
+from django.core.management.base import BaseCommand, CommandError
+from accounts.models import Profile, User
+from adminpanel.bulk import BulkArticleImporter, LocalImages, StoredImages, parse_ndjson
+
+
+class Command(BaseCommand):
+    help = 'Imports articles from an NDJSON file (one article per line), in batches'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='NDJSON file of the articles')
+        parser.add_argument('--author', required=True, help='Phone number of the author of the articles')
+        parser.add_argument(
+            '--images-dir',
+            help='Directory the image paths are relative to, without it images are names of files already in the media storage',
+        )
+        parser.add_argument('--batch-size', type=int, default=500, help='Articles written per batch')
+        parser.add_argument('--workers', type=int, default=None, help='Threads storing the images concurrently')
+
+    def handle(self, *args, **options):
+        try:
+            user = User.objects.get(phone_number=options['author'])
+        except User.DoesNotExist:
+            raise CommandError(f"No user with the phone number {options['author']}.")
+        author, _ = Profile.objects.get_or_create(user=user)
+        images = LocalImages(options['images_dir']) if options['images_dir'] else StoredImages()
+
+        with open(options['path'], 'rb') as articles_file:
+            rows = parse_ndjson(articles_file)
+
+        created = failed = 0
+        for start in range(0, len(rows), options['batch_size']):
+            batch = rows[start:start + options['batch_size']]
+            report = BulkArticleImporter(author, images, max_workers=options['workers']).run(batch)
+            created += len(report['created'])
+            failed += len(report['errors'])
+            for error in report['errors']:
+                self.stderr.write(f"Line {error['row']}: {json.dumps(error['errors'], ensure_ascii=False)}")
+
+        self.stdout.write(self.style.SUCCESS(f'Imported {created} articles, {failed} lines failed.'))
@@ -0,0 +1,38 @@
+from django.core.management.base import BaseCommand
+from blog.models import Article
+from blog.utils.search import prepare_search_texts, search_vector_expression
+
+
+class Command(BaseCommand):
+    help = 'Rebuilds the search vectors of all article translations'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000, help='Translations normalized and written per batch')
+
+    def handle(self, *args, **options):
+        ArticleTranslation = Article._parler_meta.root_model
+        batch_size = options['batch_size']
+
+        # Parler translations read every field on init, so only plain values are loaded
+        rows = ArticleTranslation.objects.order_by('pk').values_list('pk', 'language_code', 'title', 'body')
+        batch = []
+        total = 0
+        for row in rows.iterator(chunk_size=batch_size):
+            batch.append(row)
+            if len(batch) >= batch_size:
+                total += self.reindex(ArticleTranslation, batch)
+                batch = []
+        if batch:
+            total += self.reindex(ArticleTranslation, batch)
+
+        self.stdout.write(self.style.SUCCESS(f'Reindexed {total} article translations.'))
+
+    def reindex(self, model, rows):
+        # Titles and bodies of the whole batch are normalized in one pass
+        texts = prepare_search_texts(text for _, _, title, body in rows for text in (title, body))
+        translations = [
+            model(pk=pk, search_vector=search_vector_expression(texts[2 * index], texts[2 * index + 1], language_code))
+            for index, (pk, language_code, _, _) in enumerate(rows)
+        ]
+        model.objects.bulk_update(translations, ['search_vector'])
+        return len(translations)
@@ -0,0 +1,167 @@
+"""
+Media URLs for the serializers.
+
+Every ``.url`` of an S3 stored file goes through botocore's presigner (signing it with
+the default ``AWS_QUERYSTRING_AUTH``), which is slow enough to show up on pages with many
+images. :class:`MediaUrls` resolves storage names to URLs instead:
+
+* with ``MEDIA_CDN_URL`` set, URLs are the CDN base URL joined with the name, no signing;
+* otherwise the storage URLs are kept in a process wide LRU, signed URLs only until
+  ``MEDIA_SIGNED_URL_MIN_VALIDITY`` seconds before they expire;
+* one instance is shared by the serializers of a request and memoizes every name, and
+  list serializers resolve the names of the whole page with one :meth:`MediaUrls.prime`.
+"""
+import threading
+import time
+from collections import OrderedDict
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.db import models
+from django.utils.encoding import filepath_to_uri
+from rest_framework import serializers
+from rest_framework.settings import api_settings
+
+
+class MediaUrls:
+    """URLs of the files of ``storage`` (the default storage by default), see the module docstring"""
+    # (storage key, name) -> (url, monotonic expiry), shared by the threads of the process
+    _cache = OrderedDict()
+    _lock = threading.Lock()
+
+    def __init__(self, storage=None, request=None):
+        self.storage = storage or default_storage
+        self.request = request
+        self.cdn_url = settings.MEDIA_CDN_URL.rstrip('/') + '/' if settings.MEDIA_CDN_URL else None
+        self.storage_key = (
+            f"{self.storage.__class__.__module__}.{self.storage.__class__.__qualname__}",
+            getattr(self.storage, 'bucket_name', None) or getattr(self.storage, 'base_url', None),
+        )
+        self.memo = {}
+
+    def timeout(self):
+        """Seconds a URL of the storage can be reused for"""
+        if getattr(self.storage, 'querystring_auth', False):
+            return max(self.storage.querystring_expire - settings.MEDIA_SIGNED_URL_MIN_VALIDITY, 0)
+        return settings.MEDIA_URL_CACHE_TIMEOUT
+
+    def validity(self):
+        """Seconds every URL handed out stays valid for at least, None when the URLs don't expire"""
+        if self.cdn_url or not getattr(self.storage, 'querystring_auth', False):
+            return None
+        return settings.MEDIA_SIGNED_URL_MIN_VALIDITY
+
+    def prime(self, names):
+        """Resolve the URLs of ``names`` in one pass, later :meth:`url` calls are memo hits"""
+        missing = {name for name in names if name and name not in self.memo}
+        if not missing:
+            return
+        if self.cdn_url:
+            self.memo.update((name, self.cdn_url + filepath_to_uri(name)) for name in missing)
+            return
+
+        now = time.monotonic()
+        with self._lock:
+            for name in list(missing):
+                cached = self._cache.get((self.storage_key, name))
+                if cached and cached[1] > now:
+                    self._cache.move_to_end((self.storage_key, name))
+                    self.memo[name] = cached[0]
+                    missing.discard(name)
+
+        urls = {name: self.storage.url(name) for name in missing}
+        self.memo.update(urls)
+        expires = now + self.timeout()
+        with self._lock:
+            for name, url in urls.items():
+                self._cache[(self.storage_key, name)] = (url, expires)
+            while len(self._cache) > settings.MEDIA_URL_CACHE_SIZE:
+                self._cache.popitem(last=False)
+
+    def url(self, name):
+        """URL of the file ``name``, None for an empty name"""
+        if not name:
+            return None
+        if name not in self.memo:
+            self.prime([name])
+        return self.memo[name]
+
+    def absolute_url(self, name):
+        """:meth:`url` made absolute with the request, when there is one"""
+        url = self.url(name)
+        if url is None or self.request is None:
+            return url
+        key = ('absolute', name)
+        if key not in self.memo:
+            self.memo[key] = self.request.build_absolute_uri(url)
+        return self.memo[key]
+
+    @classmethod
+    def clear_cache(cls):
+        with cls._lock:
+            cls._cache.clear()
+
+
+def media_urls(context):
+    """The MediaUrls shared by the serializers of the request (or serializer context) of ``context``"""
+    request = context.get('request')
+    if request is None:
+        return context.setdefault('media_urls', MediaUrls())
+    urls = getattr(request, '_media_urls', None)
+    if urls is None:
+        urls = request._media_urls = MediaUrls(request=request)
+    return urls
+
+
+def image_names(instance, variants=True):
+    """Storage names of the images of ``instance`` and, with ``variants``, of their variants"""
+    from .images import variant_names
+    names = []
+    for field in instance._meta.concrete_fields:
+        if isinstance(field, models.FileField) and field.attname in instance.__dict__:
+            name = getattr(instance, field.attname).name
+            if name:
+                names.append(name)
+    if names and variants and 'variants' in instance.__dict__:
+        names.extend(variant_names(instance.variants))
+    return names
+
+
+class MediaImageField(serializers.ImageField):
+    """ImageField representing its file with the request's MediaUrls"""
+
+    def to_representation(self, value):
+        if not value:
+            return None
+        if not getattr(self, 'use_url', api_settings.UPLOADED_FILES_USE_URL):
+            return value.name
+        return media_urls(self.context).absolute_url(value.name)
+
+
+class MediaListSerializer(serializers.ListSerializer):
+    """Primes the MediaUrls with the images of every row (``child.media_names()``) before serializing them"""
+
+    def to_representation(self, data):
+        items = list(data.all() if isinstance(data, models.manager.BaseManager) else data)
+        media_urls(self.context).prime(name for item in items for name in self.child.media_names(item))
+        return super().to_representation(items)
+
+
+class MediaSerializerMixin:
+    """
+    For model serializers: image fields use MediaImageField. Set ``list_serializer_class``
+    to MediaListSerializer in Meta and override :meth:`media_names` for related images.
+    """
+    serializer_field_mapping = {
+        **serializers.ModelSerializer.serializer_field_mapping,
+        models.ImageField: MediaImageField,
+    }
+    # Whether the variants of the images are serialized as well
+    media_variants = False
+
+    @property
+    def media(self):
+        return media_urls(self.context)
+
+    def media_names(self, instance):
+        """Storage names of the files serialized for ``instance``"""
+        return image_names(instance, self.media_variants)
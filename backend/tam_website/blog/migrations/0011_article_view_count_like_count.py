@@ -0,0 +1,44 @@
+# Generated by Django 5.2.1 on 2026-10-18 12:43
+
+from django.db import migrations, models
+from django.db.models import Count, IntegerField, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def backfill_counters(apps, schema_editor):
+    Article = apps.get_model('blog', 'Article')
+    MiddleArticleIpAddress = apps.get_model('blog', 'MiddleArticleIpAddress')
+    ArticleLikes = Article.likes.through
+
+    hits = MiddleArticleIpAddress.objects.filter(
+        article=OuterRef('pk')
+    ).order_by().values('article').annotate(total=Count('pk')).values('total')
+    likes = ArticleLikes.objects.filter(
+        article=OuterRef('pk')
+    ).order_by().values('article').annotate(total=Count('pk')).values('total')
+
+    Article.objects.update(
+        view_count=Coalesce(Subquery(hits, output_field=IntegerField()), 0),
+        like_count=Coalesce(Subquery(likes, output_field=IntegerField()), 0),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0010_remove_article_celery_task_id_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='article',
+            name='like_count',
+            field=models.PositiveIntegerField(db_index=True, default=0, help_text='Number of likes of the article'),
+        ),
+        migrations.AddField(
+            model_name='article',
+            name='view_count',
+            field=models.PositiveIntegerField(db_index=True, default=0, help_text='Number of unique views of the article'),
+        ),
+        migrations.RunPython(backfill_counters, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.2.1 on 2026-10-18 12:45
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0011_article_view_count_like_count'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='middlearticleipaddress',
+            name='created_at',
+            field=models.DateTimeField(default=django.utils.timezone.now),
+        ),
+    ]
@@ -0,0 +1,45 @@
+# Generated by Django 5.2.1 on 2026-10-18 12:49
+
+from html import unescape
+
+from django.db import migrations, models
+from django.utils.html import strip_tags
+
+
+# A frozen copy of blog.utils.blog_utils.make_excerpt as of this migration, so the
+# backfill keeps producing the same excerpts when the function changes later
+def make_excerpt(html, length=10):
+    words = unescape(strip_tags(html or '')).split(maxsplit=length)
+    if len(words) > length:
+        return ' '.join(words[:length]) + '...'
+    return ' '.join(words)
+
+
+def backfill_excerpts(apps, schema_editor):
+    ArticleTranslation = apps.get_model('blog', 'ArticleTranslation')
+
+    # Parler translations read every field on init, so don't load them with deferred fields
+    batch = []
+    for pk, body in ArticleTranslation.objects.values_list('id', 'body').iterator(chunk_size=500):
+        batch.append(ArticleTranslation(id=pk, excerpt=make_excerpt(body)))
+        if len(batch) >= 500:
+            ArticleTranslation.objects.bulk_update(batch, ['excerpt'])
+            batch = []
+    if batch:
+        ArticleTranslation.objects.bulk_update(batch, ['excerpt'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0012_alter_middlearticleipaddress_created_at'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='articletranslation',
+            name='excerpt',
+            field=models.TextField(blank=True, default='', verbose_name='excerpt'),
+        ),
+        migrations.RunPython(backfill_excerpts, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,77 @@
+# Generated by Django 5.2.1 on 2026-10-18 12:54
+
+import re
+from html import unescape
+
+import django.contrib.postgres.indexes
+import django.contrib.postgres.search
+from django.contrib.postgres.search import SearchVector
+from django.db import migrations
+from django.db.models import Value
+from django.utils.html import strip_tags
+
+
+# A frozen copy of blog.utils.search.build_search_vector and the normalization it uses
+# as of this migration, so the backfill keeps producing the same vectors when they change
+# later (the reindex_article_search command rebuilds them with the current ones)
+SEARCH_CONFIGS = {'en': 'english'}
+NORMALIZATION_TABLE = str.maketrans({
+    'ي': 'ی', 'ى': 'ی', 'ك': 'ک', 'ة': 'ه', 'ۀ': 'ه',
+    **{persian: str(index) for index, persian in enumerate('۰۱۲۳۴۵۶۷۸۹')},
+    **{arabic: str(index) for index, arabic in enumerate('٠١٢٣٤٥٦٧٨٩')},
+    '\u200c': ' ',
+    **dict.fromkeys('\u200d\u200e\u200f\ufeff\u0640' + ''.join(chr(code) for code in range(0x064B, 0x0653))),
+})
+WHITESPACE = re.compile(r'\s+')
+HALF_SPACED_WORD = re.compile(r'\S+(?:\u200c\S+)+')
+
+
+def prepare_search_text(text):
+    text = unescape(strip_tags(text or ''))
+    words = HALF_SPACED_WORD.findall(text)
+    if words:
+        # Half spaced words are indexed in their joined form too
+        text = ' '.join([text, *(word.replace('\u200c', '') for word in words)])
+    return WHITESPACE.sub(' ', text.translate(NORMALIZATION_TABLE)).strip()
+
+
+def build_search_vector(title, body, language_code):
+    config = SEARCH_CONFIGS.get(language_code, 'simple')
+    return (
+        SearchVector(Value(prepare_search_text(title)), weight='A', config=config)
+        + SearchVector(Value(prepare_search_text(body)), weight='B', config=config)
+    )
+
+
+def backfill_search_vectors(apps, schema_editor):
+    ArticleTranslation = apps.get_model('blog', 'ArticleTranslation')
+
+    batch = []
+    rows = ArticleTranslation.objects.order_by('pk').values_list('pk', 'title', 'body', 'language_code')
+    for pk, title, body, language_code in rows.iterator(chunk_size=500):
+        batch.append(ArticleTranslation(pk=pk, search_vector=build_search_vector(title, body, language_code)))
+        if len(batch) >= 500:
+            ArticleTranslation.objects.bulk_update(batch, ['search_vector'])
+            batch = []
+    if batch:
+        ArticleTranslation.objects.bulk_update(batch, ['search_vector'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0013_articletranslation_excerpt'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='articletranslation',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='articletranslation',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['search_vector'], name='blog_article_tr_search_gin'),
+        ),
+        migrations.RunPython(backfill_search_vectors, migrations.RunPython.noop),
+    ]
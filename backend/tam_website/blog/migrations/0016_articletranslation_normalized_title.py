@@ -0,0 +1,63 @@
+# Generated by Django 5.2.1 on 2026-10-18 12:59
+
+import re
+from django.db import migrations, models
+
+
+# A frozen copy of blog.utils.normalization.unique_key as of this migration, so the
+# backfill keeps producing the same keys when the normalization changes later
+NORMALIZATION_TABLE = str.maketrans({
+    'ي': 'ی', 'ى': 'ی', 'ك': 'ک', 'ة': 'ه', 'ۀ': 'ه',
+    **{persian: str(index) for index, persian in enumerate('۰۱۲۳۴۵۶۷۸۹')},
+    **{arabic: str(index) for index, arabic in enumerate('٠١٢٣٤٥٦٧٨٩')},
+    '\u200c': ' ',
+    **dict.fromkeys('\u200d\u200e\u200f\ufeff\u0640' + ''.join(chr(code) for code in range(0x064B, 0x0653))),
+})
+WHITESPACE = re.compile(r'\s+')
+
+
+def unique_key(text):
+    return WHITESPACE.sub(' ', (text or '').translate(NORMALIZATION_TABLE)).strip().casefold()
+
+
+def backfill_normalized_titles(apps, schema_editor):
+    """
+    Fill normalized_title in id order. Titles equal to an earlier one of the same language
+    are left NULL, the constraint ignores them until the article is edited.
+    """
+    ArticleTranslation = apps.get_model('blog', 'ArticleTranslation')
+
+    seen = set()
+    batch = []
+    rows = ArticleTranslation.objects.order_by('pk').values_list('pk', 'language_code', 'title')
+    for pk, language_code, title in rows.iterator(chunk_size=500):
+        key = (language_code, unique_key(title))
+        if key in seen:
+            continue
+        seen.add(key)
+        batch.append(ArticleTranslation(pk=pk, normalized_title=key[1]))
+        if len(batch) >= 500:
+            ArticleTranslation.objects.bulk_update(batch, ['normalized_title'])
+            batch = []
+    if batch:
+        ArticleTranslation.objects.bulk_update(batch, ['normalized_title'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0015_trigram_search_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='articletranslation',
+            name='normalized_title',
+            field=models.TextField(editable=False, null=True),
+        ),
+        migrations.RunPython(backfill_normalized_titles, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='articletranslation',
+            constraint=models.UniqueConstraint(fields=('language_code', 'normalized_title'), name='blog_article_tr_unique_title'),
+        ),
+    ]
@@ -0,0 +1,59 @@
+# Generated by Django 5.2.1 on 2026-10-18 13:01
+
+import re
+from django.db import migrations, models
+
+
+# A frozen copy of blog.utils.normalization.unique_key as of this migration, so the
+# backfill keeps producing the same keys when the normalization changes later
+NORMALIZATION_TABLE = str.maketrans({
+    'ي': 'ی', 'ى': 'ی', 'ك': 'ک', 'ة': 'ه', 'ۀ': 'ه',
+    **{persian: str(index) for index, persian in enumerate('۰۱۲۳۴۵۶۷۸۹')},
+    **{arabic: str(index) for index, arabic in enumerate('٠١٢٣٤٥٦٧٨٩')},
+    '\u200c': ' ',
+    **dict.fromkeys('\u200d\u200e\u200f\ufeff\u0640' + ''.join(chr(code) for code in range(0x064B, 0x0653))),
+})
+WHITESPACE = re.compile(r'\s+')
+
+
+def unique_key(text):
+    return WHITESPACE.sub(' ', (text or '').translate(NORMALIZATION_TABLE)).strip().casefold()
+
+
+def backfill_normalized_names(apps, schema_editor):
+    for model_name in ('TeamTranslation', 'PlayerTranslation'):
+        Translation = apps.get_model('blog', model_name)
+        translations = [
+            Translation(pk=pk, normalized_name=unique_key(name))
+            for pk, name in Translation.objects.values_list('pk', 'name').iterator(chunk_size=500)
+        ]
+        Translation.objects.bulk_update(translations, ['normalized_name'], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0016_articletranslation_normalized_title'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='playertranslation',
+            name='normalized_name',
+            field=models.TextField(editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='teamtranslation',
+            name='normalized_name',
+            field=models.TextField(editable=False, null=True),
+        ),
+        migrations.RunPython(backfill_normalized_names, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='playertranslation',
+            index=models.Index(fields=['language_code', 'normalized_name'], name='blog_player_tr_norm_name'),
+        ),
+        migrations.AddIndex(
+            model_name='teamtranslation',
+            index=models.Index(fields=['language_code', 'normalized_name'], name='blog_team_tr_norm_name'),
+        ),
+    ]
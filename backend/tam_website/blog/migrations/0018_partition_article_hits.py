@@ -0,0 +1,149 @@
+from datetime import datetime, timezone as dt_timezone
+from django.contrib.postgres.indexes import BrinIndex
+from django.db import migrations
+from django.db.models import Index
+from django.utils import timezone
+
+
+# Frozen copies of the blog.partitions naming and month helpers as of this migration
+HIT_TABLE = 'blog_middlearticleipaddress'
+
+
+def month_start(value):
+    value = value.astimezone(dt_timezone.utc)
+    return datetime(value.year, value.month, 1, tzinfo=dt_timezone.utc)
+
+
+def add_months(month, count):
+    index = month.year * 12 + month.month - 1 + count
+    return month.replace(year=index // 12, month=index % 12 + 1)
+
+
+OLD_TABLE = f'{HIT_TABLE}_old'
+
+
+CREATE_PARTITIONED_TABLE = f"""
+ALTER TABLE {HIT_TABLE} RENAME TO {OLD_TABLE};
+CREATE TABLE {HIT_TABLE} (
+    id bigint NOT NULL,
+    created_at timestamp with time zone NOT NULL,
+    article_id bigint NOT NULL,
+    ipaddress_id bigint NOT NULL
+) PARTITION BY RANGE (created_at);
+CREATE TABLE {HIT_TABLE}_default PARTITION OF {HIT_TABLE} DEFAULT;
+"""
+
+# The old table (with its identity sequence, indexes and constraints) is dropped
+# before the new ones are created, they keep the names they had in this database
+COPY_ROWS = f"""
+INSERT INTO {HIT_TABLE} (id, created_at, article_id, ipaddress_id)
+    SELECT id, created_at, article_id, ipaddress_id FROM {OLD_TABLE};
+DROP TABLE {OLD_TABLE};
+CREATE SEQUENCE {HIT_TABLE}_id_seq OWNED BY {HIT_TABLE}.id;
+SELECT setval('{HIT_TABLE}_id_seq', COALESCE((SELECT MAX(id) FROM {HIT_TABLE}), 0) + 1, false);
+ALTER TABLE {HIT_TABLE} ALTER COLUMN id SET DEFAULT nextval('{HIT_TABLE}_id_seq');
+-- The partition key has to be part of the primary key
+ALTER TABLE {HIT_TABLE} ADD CONSTRAINT {HIT_TABLE}_pkey PRIMARY KEY (id, created_at);
+CREATE INDEX blog_hit_created_brin ON {HIT_TABLE} USING brin (created_at);
+"""
+
+UNPARTITION_TABLE = f"""
+CREATE TABLE {OLD_TABLE} (
+    id bigint NOT NULL GENERATED BY DEFAULT AS IDENTITY,
+    created_at timestamp with time zone NOT NULL,
+    article_id bigint NOT NULL,
+    ipaddress_id bigint NOT NULL
+);
+INSERT INTO {OLD_TABLE} (id, created_at, article_id, ipaddress_id)
+    SELECT id, created_at, article_id, ipaddress_id FROM {HIT_TABLE};
+DROP TABLE {HIT_TABLE};
+ALTER TABLE {OLD_TABLE} RENAME TO {HIT_TABLE};
+ALTER SEQUENCE {OLD_TABLE}_id_seq RENAME TO {HIT_TABLE}_id_seq;
+SELECT setval('{HIT_TABLE}_id_seq', COALESCE((SELECT MAX(id) FROM {HIT_TABLE}), 0) + 1, false);
+ALTER TABLE {HIT_TABLE} ADD CONSTRAINT {HIT_TABLE}_pkey PRIMARY KEY (id);
+"""
+
+
+def column_indexes_and_foreign_keys(schema_editor, table):
+    """
+    The single column btree indexes ({column: name}) and the foreign keys
+    ({column: (name, to_table, to_column)}) of ``table``, under the names Django
+    generated for them in this database.
+    """
+    connection = schema_editor.connection
+    with connection.cursor() as cursor:
+        constraints = connection.introspection.get_constraints(cursor, table)
+    indexes, foreign_keys = {}, {}
+    for name, constraint in constraints.items():
+        if len(constraint['columns']) != 1:
+            continue
+        column = constraint['columns'][0]
+        if constraint['foreign_key']:
+            foreign_keys[column] = (name, *constraint['foreign_key'])
+        elif constraint['index'] and not constraint['primary_key'] and not constraint['unique'] and constraint['type'] == Index.suffix:
+            indexes[column] = name
+    return indexes, foreign_keys
+
+
+def recreate_indexes_and_foreign_keys(schema_editor, table, indexes, foreign_keys):
+    quote = schema_editor.quote_name
+    for column, name in indexes.items():
+        schema_editor.execute(f"CREATE INDEX {quote(name)} ON {quote(table)} ({quote(column)})")
+    for column, (name, to_table, to_column) in foreign_keys.items():
+        schema_editor.execute(
+            f"ALTER TABLE {quote(table)} ADD CONSTRAINT {quote(name)} FOREIGN KEY ({quote(column)}) "
+            f"REFERENCES {quote(to_table)} ({quote(to_column)}) DEFERRABLE INITIALLY DEFERRED"
+        )
+
+
+def copy_rows(apps, schema_editor):
+    indexes, foreign_keys = column_indexes_and_foreign_keys(schema_editor, OLD_TABLE)
+    schema_editor.execute(COPY_ROWS)
+    recreate_indexes_and_foreign_keys(schema_editor, HIT_TABLE, indexes, foreign_keys)
+
+
+def unpartition_table(apps, schema_editor):
+    indexes, foreign_keys = column_indexes_and_foreign_keys(schema_editor, HIT_TABLE)
+    schema_editor.execute(UNPARTITION_TABLE)
+    recreate_indexes_and_foreign_keys(schema_editor, HIT_TABLE, indexes, foreign_keys)
+
+
+def create_monthly_partitions(apps, schema_editor):
+    """One partition per month from the oldest stored hit to two months ahead"""
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute(f"SELECT MIN(created_at) FROM {OLD_TABLE}")
+        oldest = cursor.fetchone()[0]
+    now = timezone.now()
+    quote = schema_editor.quote_name
+    month, last = month_start(oldest or now), add_months(month_start(now), 2)
+    while month <= last:
+        schema_editor.execute(
+            f"CREATE TABLE {quote(f'{HIT_TABLE}_p{month:%Y%m}')} PARTITION OF {quote(HIT_TABLE)} "
+            "FOR VALUES FROM (%s) TO (%s)",
+            [month, add_months(month, 1)],
+        )
+        month = add_months(month, 1)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0017_team_player_normalized_name'),
+    ]
+
+    operations = [
+        migrations.SeparateDatabaseAndState(
+            database_operations=[
+                migrations.RunPython(migrations.RunPython.noop, unpartition_table),
+                migrations.RunSQL(CREATE_PARTITIONED_TABLE, reverse_sql=migrations.RunSQL.noop),
+                migrations.RunPython(create_monthly_partitions, migrations.RunPython.noop),
+                migrations.RunPython(copy_rows, migrations.RunPython.noop),
+            ],
+            state_operations=[
+                migrations.AddIndex(
+                    model_name='middlearticleipaddress',
+                    index=BrinIndex(fields=['created_at'], name='blog_hit_created_brin'),
+                ),
+            ],
+        ),
+    ]
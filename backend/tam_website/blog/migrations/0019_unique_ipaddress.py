@@ -0,0 +1,51 @@
+from django.db import migrations, models
+
+
+# Rows sharing an IP are merged into the oldest one: its hits and likes are moved
+# over (likes of the same article only once) and the like counters recounted
+MERGE_DUPLICATE_IPS = """
+CREATE TEMPORARY TABLE blog_ip_duplicates ON COMMIT DROP AS
+    SELECT id, keep_id FROM (
+        SELECT id, MIN(id) OVER (PARTITION BY ip) AS keep_id FROM blog_ipaddress
+    ) ips WHERE id <> keep_id;
+
+CREATE TEMPORARY TABLE blog_ip_merged_likes ON COMMIT DROP AS
+    SELECT DISTINCT likes.article_id FROM blog_article_likes likes
+    JOIN blog_ip_duplicates duplicates ON duplicates.id = likes.ipaddress_id;
+
+INSERT INTO blog_article_likes (article_id, ipaddress_id)
+    SELECT DISTINCT likes.article_id, duplicates.keep_id FROM blog_article_likes likes
+    JOIN blog_ip_duplicates duplicates ON duplicates.id = likes.ipaddress_id
+    ON CONFLICT DO NOTHING;
+DELETE FROM blog_article_likes likes USING blog_ip_duplicates duplicates
+    WHERE likes.ipaddress_id = duplicates.id;
+
+UPDATE blog_middlearticleipaddress hits SET ipaddress_id = duplicates.keep_id
+    FROM blog_ip_duplicates duplicates WHERE hits.ipaddress_id = duplicates.id;
+
+DELETE FROM blog_ipaddress ips USING blog_ip_duplicates duplicates
+    WHERE ips.id = duplicates.id;
+
+UPDATE blog_article article SET like_count = (
+    SELECT COUNT(*) FROM blog_article_likes likes WHERE likes.article_id = article.id
+) WHERE article.id IN (SELECT article_id FROM blog_ip_merged_likes);
+
+-- Check the deferred foreign keys now, the table can't be altered with pending trigger events
+SET CONSTRAINTS ALL IMMEDIATE;
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0018_partition_article_hits'),
+    ]
+
+    operations = [
+        migrations.RunSQL(MERGE_DUPLICATE_IPS, reverse_sql=migrations.RunSQL.noop),
+        migrations.AlterField(
+            model_name='ipaddress',
+            name='ip',
+            field=models.GenericIPAddressField(unique=True),
+        ),
+    ]
@@ -0,0 +1,67 @@
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+# The images of an article keep their current order (by id) and the first one, which
+# was taken as the main image so far, becomes the explicit main image
+BACKFILL_POSITIONS = """
+UPDATE blog_image_article links SET position = ordered.position
+FROM (
+    SELECT id, ROW_NUMBER() OVER (PARTITION BY article_id ORDER BY image_id) - 1 AS position
+    FROM blog_image_article
+) ordered
+WHERE links.id = ordered.id;
+
+UPDATE blog_article article SET main_image_id = links.image_id
+FROM (
+    SELECT article_id, MIN(image_id) AS image_id FROM blog_image_article GROUP BY article_id
+) links
+WHERE article.id = links.article_id;
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0020_image_variants'),
+    ]
+
+    operations = [
+        # The automatic through table becomes the ArticleImage model, the table is kept as is
+        migrations.SeparateDatabaseAndState(
+            state_operations=[
+                migrations.CreateModel(
+                    name='ArticleImage',
+                    fields=[
+                        ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                        ('image', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='article_links', to='blog.image')),
+                        ('article', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='image_links', to='blog.article')),
+                    ],
+                    options={
+                        'db_table': 'blog_image_article',
+                        'unique_together': {('image', 'article')},
+                    },
+                ),
+                migrations.AlterField(
+                    model_name='image',
+                    name='article',
+                    field=models.ManyToManyField(related_name='article_images', through='blog.ArticleImage', to='blog.article'),
+                ),
+            ],
+        ),
+        migrations.AddField(
+            model_name='articleimage',
+            name='position',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AlterModelOptions(
+            name='articleimage',
+            options={'ordering': ['position', 'id']},
+        ),
+        migrations.AddField(
+            model_name='article',
+            name='main_image',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='blog.image'),
+        ),
+        migrations.RunSQL(BACKFILL_POSITIONS, reverse_sql=migrations.RunSQL.noop),
+    ]
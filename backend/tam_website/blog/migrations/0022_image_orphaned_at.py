@@ -0,0 +1,22 @@
+# Generated by Django 5.2.1 on 2026-10-18 13:24
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0021_article_image_positions'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='image',
+            name='orphaned_at',
+            field=models.DateTimeField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='image',
+            index=models.Index(condition=models.Q(('orphaned_at__isnull', False)), fields=['orphaned_at'], name='blog_image_orphaned'),
+        ),
+    ]
@@ -0,0 +1,22 @@
+# Generated by Django 5.2.1 on 2026-10-18 13:27
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0003_trigram_search_indexes'),
+        ('blog', '0022_image_orphaned_at'),
+    ]
+
+    operations = [
+        migrations.RemoveField(
+            model_name='article',
+            name='scheduled_task_id',
+        ),
+        migrations.AddIndex(
+            model_name='article',
+            index=models.Index(condition=models.Q(('status', 'DR')), fields=['scheduled_publish_at'], name='blog_article_scheduled'),
+        ),
+    ]
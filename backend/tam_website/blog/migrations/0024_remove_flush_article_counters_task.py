@@ -0,0 +1,21 @@
+# Generated by Django 5.2.1 on 2026-10-18 16:05
+
+from django.db import migrations
+
+
+def remove_flush_article_counters_task(apps, schema_editor):
+    # The database scheduler keeps the entries removed from CELERY_BEAT_SCHEDULE
+    PeriodicTask = apps.get_model('django_celery_beat', 'PeriodicTask')
+    PeriodicTask.objects.filter(task='blog.tasks.flush_article_counters').delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0023_scheduled_publisher'),
+        ('django_celery_beat', '0018_improve_crontab_helptext'),
+    ]
+
+    operations = [
+        migrations.RunPython(remove_flush_article_counters_task, migrations.RunPython.noop),
+    ]
@@ -1,15 +1,21 @@
 from django.db import models
 from accounts.models import Profile
-from django.utils.text import slugify
+from django.utils import timezone
 from django_jalali.db import models as jmodels
 from parler.models import TranslatableModel, TranslatedFields
 from django.utils.translation import gettext_lazy as _
-from uuid import uuid4
-from .managers import ArticleManager
+from .managers import ArticleManager, conflicting_translations
+from .mixins import TranslatedSlugMixin
+from ..utils.blog_utils import make_excerpt
+from ..utils.search import build_search_vector
+from ..utils.normalization import unique_key
+from django.contrib.postgres.indexes import BrinIndex, GinIndex, OpClass
+from django.db.models.functions import Upper
+from django.contrib.postgres.search import SearchVectorField
 
 
 
-class Article(TranslatableModel):
+class Article(TranslatedSlugMixin, TranslatableModel):
 
     class Type(models.TextChoices):
         TEXT = 'TX', 'Text'
@@ -37,6 +43,19 @@ class Article(TranslatableModel):
     translations = TranslatedFields(
         title=models.CharField(_("title"), max_length=250),
         body=models.TextField(_("body")),
+        # Plain text start of the body served by list pages, computed in save_translation
+        excerpt=models.TextField(_("excerpt"), blank=True, default=""),
+        # unique_key() of the title, unique per language
+        normalized_title=models.TextField(null=True, editable=False),
+        # Weighted title/body vector in the text search config of the language, kept up to date in save_translation
+        search_vector=SearchVectorField(null=True, editable=False),
+        meta={'indexes': [
+            GinIndex(fields=['search_vector'], name='blog_article_tr_search_gin'),
+            # Trigram index on the upper cased title, used by the suggestions
+            GinIndex(OpClass(Upper('title'), name='gin_trgm_ops'), name='blog_article_tr_title_trgm'),
+        ], 'constraints': [
+            models.UniqueConstraint(fields=['language_code', 'normalized_title'], name='blog_article_tr_unique_title'),
+        ]},
     )
 
     # Core fields
@@ -57,9 +76,8 @@ class Article(TranslatableModel):
     # video url field for storing a video url for video type articles
     video_url = models.URLField(null=True, blank=True)
 
-    # Scheduled publishing date and time
+    # Scheduled publishing date and time, due drafts are published by the publish_due_articles task
     scheduled_publish_at = models.DateTimeField(null=True, blank=True, help_text="Date and time when the article should be published automatically")
-    scheduled_task_id = models.CharField(max_length=255, null=True, blank=True, help_text="Celery task ID for scheduled publication")
 
     # Timestamps
     created_date = jmodels.jDateTimeField(
@@ -71,9 +89,16 @@ class Article(TranslatableModel):
         help_text="Date when the article was last modified"
     )
 
+    # The cover image, linked to the article (at the first position) like the slideshow images
+    main_image = models.ForeignKey("Image", on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+
     hits = models.ManyToManyField("IpAddress", through="MiddleArticleIpAddress", blank=True)
     likes = models.ManyToManyField("IpAddress", blank=True, related_name='liked_articles')
 
+    # Denormalized counters, likes are counted with their rows (blog/likes.py), views when they are flushed
+    view_count = models.PositiveIntegerField(default=0, db_index=True, help_text="Number of unique views of the article")
+    like_count = models.PositiveIntegerField(default=0, db_index=True, help_text="Number of likes of the article")
+
     # custom query set
     objects = ArticleManager()
 
@@ -81,6 +106,10 @@ class Article(TranslatableModel):
         ordering = ['-created_date']
         verbose_name = 'Article'
         verbose_name_plural = 'Articles'
+        indexes = [
+            # The scheduled drafts, scanned by every run of the publisher
+            models.Index(fields=['scheduled_publish_at'], condition=models.Q(status='DR'), name='blog_article_scheduled'),
+        ]
 
     def date_format(self, field, gregorian=False):
         """Returns date in Tehran-solar/Utc-gregorian timezone and date."""
@@ -101,20 +130,62 @@ class Article(TranslatableModel):
             return self.safe_translation_getter('body', language_code=language_code, default="")
         return ""
 
+    def get_images(self):
+        """
+        The images of the article: the main image, then the slideshow images in order. Reads
+        the ``image_links`` when they are prefetched (with their image), see ``with_images()``.
+        """
+        links = self.image_links.all()
+        if 'image_links' not in getattr(self, '_prefetched_objects_cache', {}):
+            links = links.select_related('image')
+        # A stable sort, the slideshow images keep their order
+        return sorted((link.image for link in links), key=lambda image: image.pk != self.main_image_id)
+
+    def next_image_position(self):
+        """The position after the last image of the article"""
+        if 'image_links' in getattr(self, '_prefetched_objects_cache', {}):
+            links = self.image_links.all()
+            return links[len(links) - 1].position + 1 if links else 0
+        last = self.image_links.aggregate(last=models.Max('position'))['last']
+        return 0 if last is None else last + 1
+
+    def get_main_image(self, images=None):
+        """The main image, taken from ``images`` (get_images()) so no query is needed"""
+        if self.main_image_id is None:
+            return None
+        images = self.get_images() if images is None else images
+        return next((image for image in images if image.pk == self.main_image_id), None)
+
+    def get_slideshow_images(self, images=None):
+        """The images other than the main image, in slideshow order"""
+        images = self.get_images() if images is None else images
+        return [image for image in images if image.pk != self.main_image_id]
+
     def __str__(self):
         return f"{self.get_title('en')}"
 
-    def save(self, *args, **kwargs):
-        title_en = self.get_title('en')
-        slugified_title = slugify(title_en)
-        if not self.slug or slugified_title != self.slug:
-            self.slug = slugified_title or self.slug or uuid4()
+    @classmethod
+    def conflicting_titles(cls, titles, exclude_pk=None):
+        """
+        Return the language codes of ``titles`` ({language_code: title}) already used by
+        another article. A single query on the unique (language_code, normalized_title) index.
+        """
+        return conflicting_translations(cls, 'title', titles, exclude_pk=exclude_pk)
 
-        super().save(*args, **kwargs)
+    def save_translation(self, translation, *args, **kwargs):
+        # Derived fields are only refreshed when the translation is going to be written
+        if translation.pk is None or translation.is_modified:
+            translation.excerpt = make_excerpt(translation.body)
+            translation.normalized_title = unique_key(translation.title)
+            # Computed by the database in the same INSERT or UPDATE
+            translation.search_vector = build_search_vector(translation.title, translation.body, translation.language_code)
+
+        super().save_translation(translation, *args, **kwargs)
 
 
 class IpAddress(models.Model):
-    ip = models.GenericIPAddressField()
+    # Stored as inet, resolved to ids through blog.redis.VisitorIds
+    ip = models.GenericIPAddressField(unique=True)
     created_at = models.DateTimeField(auto_now_add=True)
 
     def __str__(self):
@@ -122,9 +193,19 @@ class IpAddress(models.Model):
     
 
 class MiddleArticleIpAddress(models.Model):
+    """
+    A view of an article. The table is range partitioned by month on ``created_at``
+    (see blog/partitions.py), its primary key in the database is (id, created_at).
+    """
     ipaddress = models.ForeignKey(IpAddress, on_delete=models.CASCADE, related_name='viewed_articles')
     article = models.ForeignKey("Article", on_delete=models.CASCADE, related_name='viewed_articles')
-    created_at = models.DateTimeField(auto_now_add=True)
+    # Set explicitly by the view flush task to the time of the view, not the time of the insert
+    created_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        indexes = [
+            BrinIndex(fields=['created_at'], name='blog_hit_created_brin'),
+        ]
 
     def __str__(self):
         return f"{self.ipaddress} - {self.article}"
@@ -132,13 +213,40 @@ class MiddleArticleIpAddress(models.Model):
 
 class Image(models.Model):
     image = models.ImageField(upload_to='article-images/')
-    article = models.ManyToManyField(Article, related_name='article_images')
+    # Resized copies of the image, see blog.images
+    variants = models.JSONField(default=dict, blank=True, editable=False)
+    article = models.ManyToManyField(Article, through='ArticleImage', related_name='article_images')
+    # Set once the image is linked to no article, collected later by the collect_orphan_images task
+    orphaned_at = models.DateTimeField(null=True, blank=True, editable=False)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['orphaned_at'], condition=models.Q(orphaned_at__isnull=False), name='blog_image_orphaned'),
+        ]
 
     def __str__(self) -> str:
         return f"{self.image}"
+
+
+class ArticleImage(models.Model):
+    """An image of an article, ``position`` is its place in the slideshow"""
+    image = models.ForeignKey(Image, on_delete=models.CASCADE, related_name='article_links')
+    article = models.ForeignKey(Article, on_delete=models.CASCADE, related_name='image_links')
+    position = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        # The table of the former automatic many-to-many through model
+        db_table = 'blog_image_article'
+        unique_together = [('image', 'article')]
+        ordering = ['position', 'id']
+
+    def __str__(self):
+        return f"{self.article_id} #{self.position}: {self.image_id}"
     
 
-class Category(TranslatableModel):
+class Category(TranslatedSlugMixin, TranslatableModel):
+    slug_source = 'name'
+
     translations = TranslatedFields(
         name=models.CharField(max_length=250),
         description=models.TextField(),
@@ -146,23 +254,25 @@ class Category(TranslatableModel):
     image=models.ImageField(upload_to='categories/', null=True, blank=True, max_length=850)
     slug = models.SlugField(max_length=250, unique=True, blank=True)
     
-    def save(self, *args, **kwargs):
-        title_en = self.safe_translation_getter("name", language_code='en', default="")
-        slugified_title = slugify(title_en)
-        if not self.slug or slugified_title != self.slug:
-            self.slug = slugified_title or self.slug or uuid4()
-
-        super().save(*args, **kwargs)
-
     def __str__(self):
         return self.name
     
 
-class Team(TranslatableModel):
+class Team(TranslatedSlugMixin, TranslatableModel):
+    slug_source = 'name'
+
     translations = TranslatedFields(
         name=models.CharField(_("name"), max_length=250),
+        # unique_key() of the name, checked by the admin serializers
+        normalized_name=models.TextField(null=True, editable=False),
+        meta={'indexes': [
+            GinIndex(OpClass(Upper('name'), name='gin_trgm_ops'), name='blog_team_tr_name_trgm'),
+            models.Index(fields=['language_code', 'normalized_name'], name='blog_team_tr_norm_name'),
+        ]},
     )
     image = models.ImageField(upload_to='team_pictures/', null=True, blank=True)
+    # Resized copies of the image, see blog.images
+    variants = models.JSONField(default=dict, blank=True, editable=False)
     slug = models.SlugField(max_length=250, unique=True, blank=True)
 
     def get_name(self, language_code='fa'):
@@ -170,13 +280,9 @@ class Team(TranslatableModel):
             return self.safe_translation_getter('name', language_code=language_code, default="")
         return ""
 
-    def save(self, *args, **kwargs):
-        title_en = self.safe_translation_getter("name", language_code='en', default="")
-        slugified_title = slugify(title_en)
-        if not self.slug or slugified_title != self.slug:
-            self.slug = slugified_title or self.slug or uuid4()
-
-        super().save(*args, **kwargs)
+    def save_translation(self, translation, *args, **kwargs):
+        translation.normalized_name = unique_key(translation.name)
+        super().save_translation(translation, *args, **kwargs)
 
     def __str__(self):
         return self.name
@@ -1,7 +1,78 @@
 from django.db import models
-from parler.managers import TranslatableManager
+from django.db.models import F, OuterRef, Prefetch, Subquery
+from django.contrib.postgres.search import SearchRank
+from parler.managers import TranslatableManager, TranslatableQuerySet
+from ..utils.search import build_search_query
+from ..utils.normalization import unique_key
 
-class ArticleManager(TranslatableManager):
+
+def conflicting_translations(model, field, values, exclude_pk=None):
+    """
+    Return the language codes of ``values`` ({language_code: value}) already used in the
+    translated ``field`` of another ``model`` object. Compares unique_key() of the values
+    with the ``normalized_<field>`` column in a single indexed query.
+    """
+    normalized_field = f'normalized_{field}'
+    conditions = models.Q()
+    for language_code, value in values.items():
+        conditions |= models.Q(language_code=language_code, **{normalized_field: unique_key(value)})
+    if not conditions:
+        return set()
+
+    translations = model._parler_meta.root_model.objects.filter(conditions)
+    if exclude_pk is not None:
+        translations = translations.exclude(master_id=exclude_pk)
+    return set(translations.values_list('language_code', flat=True))
+
+
+class ArticleQuerySet(TranslatableQuerySet):
+
+    def for_list(self, language_code):
+        """
+        Queryset for list pages, serialized by ``ArticleListSerializer`` with a constant
+        number of queries: the author and team are joined, the title and stored excerpt of
+        the requested language are annotated as ``list_title`` and ``list_excerpt``, and only
+        the team translations of that language and the ordered images are prefetched.
+
+        The article translations are not prefetched so their body is never loaded. Parler
+        reads every translated field when it builds a translation, so deferring the body on
+        a translations prefetch would load it again with one query per row.
+        """
+        article_translations = self.model._parler_meta.root_model.objects.filter(
+            master=OuterRef('pk'), language_code=language_code
+        )
+        team_model = self.model._meta.get_field('team').related_model
+        team_translations = team_model._parler_meta.root_model.objects.filter(language_code=language_code)
+
+        return self.select_related('author', 'team').annotate(
+            list_title=Subquery(article_translations.values('title')[:1]),
+            list_excerpt=Subquery(article_translations.values('excerpt')[:1]),
+        ).prefetch_related(
+            Prefetch('team__translations', queryset=team_translations),
+        ).with_images()
+
+    def with_images(self):
+        """Prefetch the ordered image links with their image, read by ``Article.get_images()``"""
+        link_model = self.model._meta.get_field('image_links').related_model
+        return self.prefetch_related(
+            Prefetch('image_links', queryset=link_model.objects.select_related('image')),
+        )
+
+    def search(self, value, language_code):
+        """
+        Full text search in the translation of the given language, ranked by relevance.
+        Matches the stored ``search_vector`` so the GIN index is used.
+        """
+        query = build_search_query(value, language_code)
+        return self.filter(
+            translations__language_code=language_code,
+            translations__search_vector=query,
+        ).annotate(
+            rank=SearchRank(F('translations__search_vector'), query)
+        ).order_by('-rank', '-created_date')
+
+
+class ArticleManager(TranslatableManager.from_queryset(ArticleQuerySet)):
 
     def accepted(self):
         return self.filter(status='AC')
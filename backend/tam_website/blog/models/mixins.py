@@ -0,0 +1,121 @@
+from uuid import uuid4
+from django.db.models.signals import class_prepared, post_init
+from django.dispatch import receiver
+from django.utils.text import slugify
+from parler.cache import is_missing
+from parler.models import TranslatedFieldsModelMixin
+from parler.signals import post_translation_save
+
+
+class DirtyFieldsMixin:
+    """
+    Tracks the concrete fields changed since the instance was loaded or last saved.
+    :meth:`save_dirty` writes only those fields.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._saved_values = self._field_values()
+
+    def _field_values(self):
+        # Deferred fields are not loaded, they can't be dirty
+        return {
+            field.attname: self.__dict__[field.attname]
+            for field in self._meta.concrete_fields
+            if field.attname in self.__dict__
+        }
+
+    def get_dirty_fields(self):
+        """Names of the concrete fields whose value differs from the saved one"""
+        return {
+            self._meta.get_field(attname).name
+            for attname, value in self._field_values().items()
+            if self._state.adding or self._saved_values.get(attname) != value
+        }
+
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        update_fields = kwargs.get('update_fields')
+        values = self._field_values()
+        if update_fields is not None:
+            values = {
+                attname: value for attname, value in values.items()
+                if self._meta.get_field(attname).name in update_fields
+            }
+        self._saved_values.update(values)
+
+    def save_dirty(self, **kwargs):
+        """
+        Save only the changed fields (and the ``auto_now`` ones with them), a new instance
+        is saved in full. Modified translations are saved either way.
+        """
+        if self._state.adding:
+            return self.save(**kwargs)
+        self.prepare_save()
+        dirty = self.get_dirty_fields()
+        if dirty:
+            dirty |= {field.name for field in self._meta.concrete_fields if getattr(field, 'auto_now', False)}
+        return self.save(update_fields=dirty, **kwargs)
+
+    def prepare_save(self):
+        """Hook to update derived fields before the dirty fields are collected"""
+
+
+class TranslatedSlugMixin(DirtyFieldsMixin):
+    """
+    Keeps ``slug`` equal to the slugified English ``slug_source`` translated field.
+
+    The slug is only recomputed when the instance has no slug yet or when the English
+    translation loaded on the instance has a new value of the field, so saves that don't
+    touch the English translation neither fetch it nor slugify it. The saved value of the
+    field is kept on each translation when it is loaded or saved.
+    """
+    slug_source = 'title'
+    slug_language = 'en'
+
+    def translated_field_changed(self, field, language_code):
+        """True when the loaded ``language_code`` translation holds an unsaved value of ``field``"""
+        translation = self._translations_cache[self._parler_meta.root_model].get(language_code)
+        if translation is None or is_missing(translation):
+            return False
+        if translation.pk is None or field != self.slug_source:
+            return True
+        return translation._saved_slug_source != getattr(translation, field)
+
+    def update_slug(self):
+        """Recompute the slug if needed, returns True when it changed"""
+        if self.slug and not self.translated_field_changed(self.slug_source, self.slug_language):
+            return False
+        source = self.safe_translation_getter(self.slug_source, language_code=self.slug_language, default="")
+        slug = slugify(source) or self.slug or str(uuid4())
+        if slug == self.slug:
+            return False
+        self.slug = slug
+        return True
+
+    def prepare_save(self):
+        self.update_slug()
+
+    def save(self, *args, **kwargs):
+        update_fields = kwargs.get('update_fields')
+        if self.update_slug() and update_fields is not None:
+            kwargs['update_fields'] = {*update_fields, 'slug'}
+        super().save(*args, **kwargs)
+
+
+def snapshot_slug_source(sender, instance, **kwargs):
+    """Keep the saved value of the slug source on a translation of a :class:`TranslatedSlugMixin` model"""
+    field = instance.shared_model.slug_source
+    # A deferred field has no saved value here, it counts as changed
+    instance._saved_slug_source = getattr(instance, field) if field in instance.__dict__ else None
+
+
+@receiver(class_prepared)
+def track_slug_source(sender, **kwargs):
+    if not issubclass(sender, TranslatedFieldsModelMixin):
+        return
+    shared_model = sender._meta.get_field('master').remote_field.model
+    # Historical models of the migrations point to their shared model by name
+    if isinstance(shared_model, type) and issubclass(shared_model, TranslatedSlugMixin):
+        post_init.connect(snapshot_slug_source, sender=sender)
+        post_translation_save.connect(snapshot_slug_source, sender=shared_model)
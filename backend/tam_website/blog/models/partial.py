@@ -1,4 +1,6 @@
 from django.db import models
+from django.db.models.functions import Upper
+from django.contrib.postgres.indexes import GinIndex, OpClass
 from accounts.models import User
 from django_jalali.db import models as jmodels
 from parler.models import TranslatableModel, TranslatedFields
@@ -6,6 +8,8 @@ from django.utils.translation import gettext_lazy as _
 from django.utils.text import slugify
 from uuid import uuid4
 from ..utils.blog_utils import get_localization_position
+from ..utils.normalization import unique_key
+from .mixins import DirtyFieldsMixin
 
 
 # class Comment(models.Model):
@@ -34,12 +38,20 @@ from ..utils.blog_utils import get_localization_position
 #         return self.replies.filter(is_active=True)
 
 
-class Player(TranslatableModel):
+class Player(DirtyFieldsMixin, TranslatableModel):
     # player information
     translations = TranslatedFields(
         name = models.CharField(max_length=250, help_text="The name of the player"),
+        # unique_key() of the name, checked by the admin serializers
+        normalized_name = models.TextField(null=True, editable=False),
+        meta={'indexes': [
+            GinIndex(OpClass(Upper('name'), name='gin_trgm_ops'), name='blog_player_tr_name_trgm'),
+            models.Index(fields=['language_code', 'normalized_name'], name='blog_player_tr_norm_name'),
+        ]},
     )
     image = models.ImageField(upload_to='players/', null=True, blank=True, help_text="Profile image of the player")
+    # Resized copies of the image, see blog.images
+    variants = models.JSONField(default=dict, blank=True, editable=False)
     number = models.IntegerField(null=True, blank=True, help_text="The jersey number of the player")
 
     # player position
@@ -67,3 +79,7 @@ class Player(TranslatableModel):
         print(self.position, language_code)
         return get_localization_position(self.position, language_code)
 
+    def save_translation(self, translation, *args, **kwargs):
+        translation.normalized_name = unique_key(translation.name)
+        super().save_translation(translation, *args, **kwargs)
+
@@ -0,0 +1,99 @@
+"""
+Monthly range partitions of the article hit table (``MiddleArticleIpAddress``).
+
+The table is partitioned on ``created_at`` with one partition per UTC month named
+``<table>_pYYYYMM`` and a default partition catching rows outside of them. Queries
+filtering on ``created_at`` only scan the matching partitions, and old months are
+removed by detaching their partition instead of deleting rows.
+"""
+import re
+from datetime import datetime, timezone as dt_timezone
+from django.db import connection as default_connection
+
+
+HIT_TABLE = 'blog_middlearticleipaddress'
+PARTITION_NAME = re.compile(rf'^{HIT_TABLE}_p(\d{{4}})(\d{{2}})$')
+
+
+def month_start(value):
+    """First instant (UTC) of the month of ``value`` (a date or an aware datetime)"""
+    if isinstance(value, datetime):
+        value = value.astimezone(dt_timezone.utc)
+    return datetime(value.year, value.month, 1, tzinfo=dt_timezone.utc)
+
+
+def add_months(month, count):
+    index = month.year * 12 + month.month - 1 + count
+    return month.replace(year=index // 12, month=index % 12 + 1)
+
+
+def partition_name(month):
+    return f"{HIT_TABLE}_p{month:%Y%m}"
+
+
+def list_partitions(connection=None):
+    """Return {month: partition name} of the monthly partitions attached to the hit table"""
+    connection = connection or default_connection
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT child.relname FROM pg_inherits "
+            "JOIN pg_class parent ON parent.oid = pg_inherits.inhparent "
+            "JOIN pg_class child ON child.oid = pg_inherits.inhrelid "
+            "WHERE parent.relname = %s",
+            [HIT_TABLE],
+        )
+        names = [row[0] for row in cursor.fetchall()]
+
+    partitions = {}
+    for name in names:
+        match = PARTITION_NAME.match(name)
+        if match:
+            partitions[datetime(int(match[1]), int(match[2]), 1, tzinfo=dt_timezone.utc)] = name
+    return partitions
+
+
+def create_partitions(start, end, connection=None):
+    """
+    Create the missing monthly partitions from the month of ``start`` to the month of ``end``
+    (both included). Returns the names of the created partitions.
+    """
+    connection = connection or default_connection
+    existing = list_partitions(connection)
+    created = []
+    month, last = month_start(start), month_start(end)
+    with connection.cursor() as cursor:
+        while month <= last:
+            if month not in existing:
+                name = partition_name(month)
+                cursor.execute(
+                    f"CREATE TABLE {connection.ops.quote_name(name)} "
+                    f"PARTITION OF {connection.ops.quote_name(HIT_TABLE)} "
+                    "FOR VALUES FROM (%s) TO (%s)",
+                    [month, add_months(month, 1)],
+                )
+                created.append(name)
+            month = add_months(month, 1)
+    return created
+
+
+def detach_partitions(before, drop=False, connection=None):
+    """
+    Detach the monthly partitions of the months before the month of ``before``.
+    Detached tables keep their rows (for archiving) unless ``drop`` is set.
+    Returns the names of the detached partitions.
+    """
+    connection = connection or default_connection
+    limit = month_start(before)
+    detached = []
+    with connection.cursor() as cursor:
+        for month, name in sorted(list_partitions(connection).items()):
+            if month >= limit:
+                break
+            cursor.execute(
+                f"ALTER TABLE {connection.ops.quote_name(HIT_TABLE)} "
+                f"DETACH PARTITION {connection.ops.quote_name(name)}"
+            )
+            if drop:
+                cursor.execute(f"DROP TABLE {connection.ops.quote_name(name)}")
+            detached.append(name)
+    return detached
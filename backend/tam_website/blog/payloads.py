@@ -0,0 +1,39 @@
+"""
+Cached public payloads: the article detail, its related articles and the home page, in
+the active language. The views build them on a cache miss, the scheduled publisher
+(blog.publishing) renders them ahead of the first readers.
+"""
+from django.utils.translation import get_language
+from .models import Article, Player, Team
+from .serializers import ArticleListSerializer, ArticleSerializer, PlayerSerializer, TeamSerializer
+
+
+def article_payload(article_id):
+    """The detail payload of a published article shared by every visitor, the view adds ``is_liked``"""
+    article = Article.objects.select_related('author', 'team').with_images().get(pk=article_id)
+    return ArticleSerializer(article, context={'shared_payload': True}).data
+
+
+def related_payload(article, request=None):
+    """Up to 3 related articles by the same team (exclude current)"""
+    if not article.team_id:
+        return []
+    related = Article.objects.filter(
+        status=Article.Status.PUBLISHED, team_id=article.team_id,
+    ).for_list(get_language()).exclude(id=article.id).order_by('-created_date')[:3]
+    # Serialized in list context so list fields (like slug) are preserved
+    return ArticleListSerializer(related, many=True, context={'request': request}).data
+
+
+def home_payload(request=None):
+    language = get_language()
+    # Latest 5 text articles and videos
+    articles = Article.objects.filter(status=Article.Status.PUBLISHED, type=Article.Type.TEXT).for_list(language).order_by('-created_date')[:5]
+    videos = Article.objects.filter(status=Article.Status.PUBLISHED, type=Article.Type.VIDEO).for_list(language).order_by('-created_date')[:5]
+    context = {'request': request}
+    return {
+        'articles': ArticleListSerializer(articles, many=True, context=context).data,
+        'videos': ArticleListSerializer(videos, many=True, context=context).data,
+        'tam_teams': TeamSerializer(Team.objects.all(), many=True, context=context).data,
+        'players': PlayerSerializer(Player.objects.all(), many=True, context=context).data,
+    }
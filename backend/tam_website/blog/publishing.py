@@ -0,0 +1,100 @@
+"""
+Scheduled publishing.
+
+Drafts with a ``scheduled_publish_at`` are published by the periodic
+``publish_due_articles`` task (every ``SCHEDULED_ARTICLES_PUBLISH_INTERVAL`` seconds)
+instead of one ETA task per article: scheduling or rescheduling an article only writes
+its date, there is no task to revoke and nothing is lost when a worker restarts.
+
+Scheduled match reports draw their readers the minute they go live, so the publisher
+renders the cached payloads they read (the detail and related articles of every
+published article and the home page, in every language) once the publishing
+transaction commits, while readers are still served the previous content version,
+and stores them under the next one.
+"""
+import logging
+from django.conf import settings
+from django.db import connection, transaction
+from django.utils import timezone, translation
+from .cache import (
+    article_cache_key, bump_content_version, get_content_version, home_cache_key, home_stale_cache_key,
+    related_cache_key, warm_content_version,
+)
+
+
+logger = logging.getLogger(__name__)
+
+
+# Publishes the due drafts in one statement. A draft published concurrently no longer
+# matches the status condition once its row lock is released, so it is returned once.
+PUBLISH_DUE_SQL = """
+UPDATE {article} SET status = %(published)s, updated_date = %(now)s
+WHERE status = %(draft)s AND scheduled_publish_at <= %(now)s {ids}
+RETURNING id
+"""
+
+
+def render_payloads(article_ids):
+    """
+    The cache entries of the published ``article_ids`` for :func:`blog.cache.warm_content_version`:
+    their detail and related articles and the home page, in every language.
+    """
+    from .models import Article
+    from .payloads import article_payload, home_payload, related_payload
+
+    articles = list(Article.objects.filter(pk__in=article_ids).only('id', 'team_id'))
+    entries = []
+    for language_code, _ in settings.LANGUAGES:
+        with translation.override(language_code):
+            for article in articles:
+                entries.append((article_cache_key, (article.id, language_code), article_payload(article.id)))
+                entries.append((related_cache_key, (article.id, language_code), related_payload(article)))
+            home = home_payload()
+            # The stale copy served while the home page is rebuilt is replaced too
+            entries.append((home_cache_key, (language_code,), home))
+            entries.append((home_stale_cache_key, (language_code,), home))
+    return entries
+
+
+def warm_published_payloads(article_ids):
+    """
+    Render the payloads of the published ``article_ids`` and store them under the next
+    content version. Returns the new version.
+    """
+    version = get_content_version()
+    try:
+        entries = render_payloads(article_ids)
+    except Exception:
+        # The articles are published all the same, their readers build the payloads
+        logger.exception("Could not render the payloads of the published articles %s", article_ids)
+        return bump_content_version()
+    return warm_content_version(entries, version)
+
+
+def publish_due_articles(now=None, article_ids=None):
+    """
+    Publish the drafts scheduled up to ``now`` (among ``article_ids`` when given) and
+    replace the cached content with their rendered payloads once the transaction
+    commits. Returns their ids.
+    """
+    from .models import Article
+    with transaction.atomic():
+        with connection.cursor() as cursor:
+            cursor.execute(
+                PUBLISH_DUE_SQL.format(
+                    article=Article._meta.db_table,
+                    ids='AND id = ANY(%(ids)s)' if article_ids is not None else '',
+                ),
+                {
+                    'published': Article.Status.PUBLISHED,
+                    'draft': Article.Status.DRAFT,
+                    'now': now or timezone.now(),
+                    'ids': list(article_ids or []),
+                },
+            )
+            published = [row[0] for row in cursor.fetchall()]
+        # An UPDATE sends no post_save signal, the content version is bumped here. The
+        # payloads are rendered after the commit, not while the published rows are locked
+        if published:
+            transaction.on_commit(lambda: warm_published_payloads(published))
+    return published
@@ -1,33 +1,330 @@
-from django.core.cache import cache
+import ipaddress
+import json
+import threading
+from collections import OrderedDict
+from datetime import timedelta
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from django_redis import get_redis_connection
+from redis.exceptions import ResponseError
+
+
+VIEWERS_SEED_MARKER = "__seeded__"
+
+
+def is_valid_ip(value):
+    try:
+        ipaddress.ip_address(value)
+    except ValueError:
+        return False
+    return True
+
+
+class UniqueViewerCounter:
+    """
+    Unique-viewer counting backend.
+
+    Small articles are counted exactly with a Redis set of visitor IPs. Once an article
+    has more than ``ARTICLE_VIEWERS_EXACT_LIMIT`` viewers the set is folded into a
+    HyperLogLog (PFADD/PFCOUNT), which has a fixed ~12KB footprint and ~0.81% error.
+    Setting the limit to 0 disables the exact mode. Every view is also added to
+    per-day HyperLogLogs (per article and site wide) that can be merged over any
+    date range with :meth:`unique_viewers`.
+    """
+
+    def __init__(self, connection=None):
+        self.connection = connection or get_redis_connection('default')
+        self.exact_limit = getattr(settings, 'ARTICLE_VIEWERS_EXACT_LIMIT', 1000)
+        self.retention = timedelta(days=getattr(settings, 'ARTICLE_VIEWERS_DAILY_RETENTION_DAYS', 400))
+
+    @staticmethod
+    def exact_key(article_id):
+        return f"article:{article_id}:ips"
+
+    @staticmethod
+    def hll_key(article_id):
+        return f"article:{article_id}:hll"
+
+    @staticmethod
+    def daily_key(day, article_id=None):
+        scope = f"article:{article_id}" if article_id else "site"
+        return f"{scope}:viewers:{day:%Y%m%d}"
+
+    def add(self, article_id, visitor):
+        """
+        Add a visitor to the article counters. Returns True when the visitor may not
+        have viewed the article before: exactly in the exact mode, always once the
+        article is counted with a HyperLogLog. PFADD only reports a changed register,
+        which for n viewers happens with a probability of about 16384/n, so it can't
+        tell a new visitor and the flush task deduplicates these views instead.
+        """
+        exact_key, hll_key = self.exact_key(article_id), self.hll_key(article_id)
+        exact_exists, hll_exists = self._exists(article_id)
+        if not exact_exists and not hll_exists:
+            hll_exists = self._seed(article_id)
+
+        today = timezone.localdate()
+        pipe = self.connection.pipeline(transaction=False)
+        if hll_exists:
+            pipe.pfadd(hll_key, visitor)
+        else:
+            pipe.sadd(exact_key, visitor)
+            pipe.scard(exact_key)
+        for key in (self.daily_key(today, article_id), self.daily_key(today)):
+            pipe.pfadd(key, visitor)
+            pipe.expire(key, self.retention)
+        result = pipe.execute()
+
+        if hll_exists:
+            return True
+        if result[1] > self.exact_limit + 1:
+            self._promote(article_id)
+        return bool(result[0])
+
+    def count(self, article_id):
+        """Number of unique viewers of an article"""
+        exact_exists, hll_exists = self._exists(article_id)
+        if not exact_exists and not hll_exists:
+            hll_exists = self._seed(article_id)
+        if hll_exists:
+            return self.connection.pfcount(self.hll_key(article_id))
+        # The seed marker is a member of the set as well
+        return self.connection.scard(self.exact_key(article_id)) - 1
+
+    def unique_viewers(self, start_date, end_date, article_id=None):
+        """
+        Merged unique viewers between two dates (inclusive), site wide or for one article.
+        """
+        days = (end_date - start_date).days + 1
+        if days <= 0:
+            return 0
+        keys = [self.daily_key(start_date + timedelta(days=offset), article_id) for offset in range(days)]
+        return self.connection.pfcount(*keys)
+
+    def _exists(self, article_id):
+        pipe = self.connection.pipeline(transaction=False)
+        pipe.exists(self.exact_key(article_id))
+        pipe.exists(self.hll_key(article_id))
+        return pipe.execute()
+
+    def _seed(self, article_id):
+        """
+        Load the viewers already stored in the database into cold (e.g. evicted) counters,
+        so they are not counted a second time. A marker member keeps the exact set alive
+        for articles without any views yet. Returns True when seeded into a HyperLogLog.
+        """
+        from .models import MiddleArticleIpAddress
+        viewers = list(MiddleArticleIpAddress.objects.filter(
+            article_id=article_id
+        ).values_list('ipaddress__ip', flat=True))
+
+        if not self.exact_limit or len(viewers) > self.exact_limit:
+            self._pfadd_many(self.hll_key(article_id), viewers)
+            return True
+        self.connection.sadd(self.exact_key(article_id), VIEWERS_SEED_MARKER, *viewers)
+        return False
+
+    def _promote(self, article_id):
+        """Fold the exact set of an article that outgrew the exact mode into its HyperLogLog"""
+        exact_key, hll_key = self.exact_key(article_id), self.hll_key(article_id)
+        # Once the HyperLogLog exists new views are added to it, the set is then moved
+        # aside atomically and members added in the meantime are folded in as well.
+        self._pfadd_many(hll_key, self.connection.smembers(exact_key))
+        promoting_key = f"{exact_key}:promoting"
+        try:
+            self.connection.rename(exact_key, promoting_key)
+        except ResponseError:
+            # Already promoted by a concurrent request
+            return
+        self._pfadd_many(hll_key, self.connection.smembers(promoting_key))
+        self.connection.delete(promoting_key)
+
+    def _pfadd_many(self, key, members, chunk_size=5000):
+        members = [member for member in members if member not in (VIEWERS_SEED_MARKER, VIEWERS_SEED_MARKER.encode())]
+        pipe = self.connection.pipeline(transaction=False)
+        # PFADD without elements still creates the key, which marks the HyperLogLog mode
+        pipe.pfadd(key)
+        for start in range(0, len(members), chunk_size):
+            pipe.pfadd(key, *members[start:start + chunk_size])
+        pipe.execute()
 
 
 class RedisService:
-    def __init__(self, request):
+    """
+    View-ingestion service for article detail hits.
+
+    Unique viewers are deduplicated by :class:`UniqueViewerCounter`, and every possibly
+    first view is queued in a Redis list, so the request never writes to the database.
+    The ``blog.tasks.flush_article_views`` task bulk inserts the views not stored yet as
+    ``MiddleArticleIpAddress`` rows and adds them to ``view_count`` in the same transaction.
+    """
+    def __init__(self, request, connection=None):
         self.request = request
-        
+        self.connection = connection or get_redis_connection('default')
+        self.viewers = UniqueViewerCounter(self.connection)
+
+    def get_client_ip(self):
+        """
+        The first X-Forwarded-For address, or REMOTE_ADDR when it is not a valid IP
+        (e.g. ``unknown`` or an address with a port), which the inet column would reject.
+        """
+        forwarded = self.request.META.get('HTTP_X_FORWARDED_FOR', '').split(',')[0].strip()
+        return forwarded if is_valid_ip(forwarded) else self.request.META.get('REMOTE_ADDR')
 
     def add_article_view(self, article_id):
-        # Get user IP address
-        ip_address = (
-            self.request.META.get('HTTP_X_FORWARDED_FOR', '').split(',')[0]
-            or self.request.META.get('REMOTE_ADDR')
-        )
+        """
+        Register a view of the article by the requesting IP.
+        Returns True when it may be the first view of this IP and was queued.
+        """
+        ip_address = self.get_client_ip()
+        if not self.viewers.add(article_id, ip_address):
+            return False
 
-        # Cache key for unique IPs for this article
-        unique_ip_key = f"article:{article_id}:ips"
-        
-        # Get existing IPs from cache or initialize empty set
-        unique_ips = cache.get(unique_ip_key, set())
-        
-        # Add new IP if not present
-        if ip_address not in unique_ips:
-            unique_ips.add(ip_address)
-            # Store updated set in cache
-            cache.set(unique_ip_key, unique_ips)
+        view = json.dumps({
+            'article_id': article_id,
+            'ip': ip_address,
+            'viewed_at': timezone.now().isoformat(),
+        })
+        self.connection.rpush(PendingViewQueue.KEY, view)
+        return True
 
     def get_article_view_count(self, article_id):
-        unique_ip_key = f"article:{article_id}:ips"
-        unique_ips = cache.get(unique_ip_key, {})
-        return len(unique_ips)
-        
-        
\ No newline at end of file
+        return self.viewers.count(article_id)
+
+
+class PendingViewQueue:
+    """
+    Redis list of first views waiting to be persisted as ``MiddleArticleIpAddress`` rows.
+    """
+    KEY = "article:views:pending"
+    DEAD_LETTER_KEY = "article:views:dead"
+    DEAD_LETTER_LIMIT = 10000
+
+    def __init__(self, connection=None):
+        self.connection = connection or get_redis_connection('default')
+
+    def pop(self, count):
+        """Take up to ``count`` queued views from the head of the queue"""
+        entries = self.connection.lpop(self.KEY, count) or []
+        return [json.loads(entry) for entry in entries]
+
+    def requeue(self, views):
+        """Put views back at the head of the queue, used when a flush fails"""
+        if views:
+            self.connection.lpush(self.KEY, *[json.dumps(view) for view in reversed(views)])
+
+    def dead_letter(self, views):
+        """Set aside views that can't be stored, the last ``DEAD_LETTER_LIMIT`` are kept for inspection"""
+        if views:
+            pipe = self.connection.pipeline(transaction=False)
+            pipe.rpush(self.DEAD_LETTER_KEY, *[json.dumps(view) for view in views])
+            pipe.ltrim(self.DEAD_LETTER_KEY, -self.DEAD_LETTER_LIMIT, -1)
+            pipe.execute()
+
+    @staticmethod
+    def is_valid(view):
+        """True when ``view`` can be stored: an article id, a valid IP and a view time"""
+        try:
+            return (
+                isinstance(view['article_id'], int)
+                and is_valid_ip(view['ip'])
+                and parse_datetime(view['viewed_at']) is not None
+            )
+        except (KeyError, TypeError, ValueError):
+            return False
+
+    def __len__(self):
+        return self.connection.llen(self.KEY)
+
+
+class VisitorIds:
+    """
+    Maps visitor IPs to their ``IpAddress`` ids.
+
+    Lookups go through an in-process LRU, then Redis, and only the IPs missing from both
+    reach the database, all of them in a single ``INSERT ... ON CONFLICT (ip) ... RETURNING``
+    that creates the new rows and returns the ids of the existing ones. Ids are cached once
+    the transaction that resolved them commits, so a rolled back insert is never cached.
+    """
+    KEY_PREFIX = "visitor:ip:"
+
+    _local = OrderedDict()
+    _local_lock = threading.Lock()
+
+    def __init__(self, connection=None):
+        self.connection = connection or get_redis_connection('default')
+        self.local_size = getattr(settings, 'VISITOR_IDS_LOCAL_CACHE_SIZE', 10000)
+        self.timeout = getattr(settings, 'VISITOR_IDS_CACHE_TIMEOUT', 60 * 60 * 24 * 30)
+
+    @classmethod
+    def key(cls, ip):
+        return f"{cls.KEY_PREFIX}{ip}"
+
+    def get(self, ip):
+        """Return the id of ``ip``, creating its row if needed"""
+        return self.get_many([ip])[ip]
+
+    def get_many(self, ips):
+        """Return {ip: id} for every IP of ``ips``, creating the missing rows"""
+        ips = set(ips)
+        ids = self._local_get(ips)
+        missing = sorted(ips - ids.keys())
+        if not missing:
+            return ids
+
+        cached = self.connection.mget([self.key(ip) for ip in missing])
+        from_redis = {ip: int(value) for ip, value in zip(missing, cached) if value is not None}
+        self._local_set(from_redis)
+        ids.update(from_redis)
+
+        missing = [ip for ip in missing if ip not in from_redis]
+        if missing:
+            resolved = self._upsert(missing)
+            ids.update(resolved)
+            transaction.on_commit(lambda: self._remember(resolved))
+        return ids
+
+    @staticmethod
+    def _upsert(ips):
+        from .models import IpAddress
+        # Sorted so concurrent upserts lock the conflicting rows in the same order
+        rows = IpAddress.objects.bulk_create(
+            [IpAddress(ip=ip) for ip in ips],
+            update_conflicts=True,
+            unique_fields=['ip'],
+            update_fields=['ip'],
+        )
+        return {ip: row.id for ip, row in zip(ips, rows)}
+
+    def _remember(self, ids):
+        pipe = self.connection.pipeline(transaction=False)
+        for ip, ip_id in ids.items():
+            pipe.set(self.key(ip), ip_id, ex=self.timeout)
+        pipe.execute()
+        self._local_set(ids)
+
+    def _local_get(self, ips):
+        found = {}
+        with self._local_lock:
+            for ip in ips:
+                if ip in self._local:
+                    self._local.move_to_end(ip)
+                    found[ip] = self._local[ip]
+        return found
+
+    def _local_set(self, ids):
+        if not ids:
+            return
+        with self._local_lock:
+            for ip, ip_id in ids.items():
+                self._local[ip] = ip_id
+                self._local.move_to_end(ip)
+            while len(self._local) > self.local_size:
+                self._local.popitem(last=False)
+
+    @classmethod
+    def clear_local(cls):
+        with cls._local_lock:
+            cls._local.clear()
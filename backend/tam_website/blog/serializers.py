@@ -6,6 +6,8 @@ from .models import Article
 from .utils import get_time_ago
 from .models import Team, Player
 from .utils.blog_utils import persian_digits
+from .images import variant_urls
+from .media import MediaListSerializer, MediaSerializerMixin, image_names
 from django.contrib.auth import authenticate
 from django.utils.translation import gettext_lazy as _
 from accounts.models import User, Profile
@@ -26,7 +28,7 @@ class CategorySerializer(serializers.ModelSerializer):
         return obj.safe_translation_getter('name', language_code='en', default="")
 
 
-class ArticleSerializer(serializers.ModelSerializer):
+class ArticleSerializer(MediaSerializerMixin, serializers.ModelSerializer):
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
         self.lang = get_language()
@@ -40,14 +42,16 @@ class ArticleSerializer(serializers.ModelSerializer):
     likes = serializers.SerializerMethodField()
     time_ago = serializers.SerializerMethodField()
     images = serializers.SerializerMethodField()
+    image_variants = serializers.SerializerMethodField()
     # first_category = serializers.SerializerMethodField()
     # categories = serializers.SerializerMethodField()
     team = serializers.SerializerMethodField()
 
     class Meta:
         model = Article
-        fields = ['id', 'title', 'body', 'author_name', 'slug', 'view_count', 'time_ago', 'likes', 'images', 'type', 'video_url', 'team']
+        fields = ['id', 'title', 'body', 'author_name', 'slug', 'view_count', 'time_ago', 'likes', 'images', 'image_variants', 'type', 'video_url', 'team']
         read_only_fields = ['author']
+        list_serializer_class = MediaListSerializer
 
     def get_author_name(self, obj):
         """Get formatted author name from profile"""
@@ -86,18 +90,27 @@ class ArticleSerializer(serializers.ModelSerializer):
         return obj.get_body(language_code=self.lang)
 
     def get_view_count(self, obj):
-        return obj.hits.count()
+        return obj.view_count
 
     def get_likes(self, obj):
-        return obj.likes.count()
+        return obj.like_count
 
     def get_time_ago(self, obj):
         return get_time_ago(obj)
 
     def get_images(self, obj):
-        return [image.image.url for image in obj.article_images.all()]
+        return [self.media.url(image.image.name) for image in obj.get_images()]
+
+    def get_image_variants(self, obj):
+        # In the order of images, None for an image whose variants are not generated yet
+        return [variant_urls(image.image, image.variants, self.media) for image in obj.get_images()]
+
+    def media_names(self, instance):
+        return [name for image in instance.get_images() for name in image_names(image)]
 
     def get_team(self, obj):
+        if not obj.team:
+            return None
         return {
             'id': obj.team.id,
             'name': obj.team.name,
@@ -114,7 +127,9 @@ class ArticleSerializer(serializers.ModelSerializer):
             # Remove categories field for list view since we use first_category
             # del data['categories']
         else:
-            data['is_liked'] = instance.likes.filter(ip=self.client_ip).exists()
+            # A payload shared by every visitor gets is_liked from the view
+            if not self.context.get('shared_payload'):
+                data['is_liked'] = instance.likes.filter(ip=self.client_ip).exists()
             del data['slug']
             # Remove first_category field for detail view since we use categories
             # del data['first_category']
@@ -126,6 +141,70 @@ class ArticleSerializer(serializers.ModelSerializer):
         return data
 
 
+class ArticleListSerializer(MediaSerializerMixin, serializers.ModelSerializer):
+    """
+    Lightweight serializer for article lists (list pages, home page, related articles).
+    Reads only annotated and prefetched data, use it with ``Article.objects.for_list(language_code)``.
+    """
+    author_name = serializers.SerializerMethodField()
+    title = serializers.SerializerMethodField()
+    body = serializers.SerializerMethodField()
+    view_count = serializers.IntegerField(read_only=True)
+    likes = serializers.IntegerField(source='like_count', read_only=True)
+    time_ago = serializers.SerializerMethodField()
+    images = serializers.SerializerMethodField()
+    image_variants = serializers.SerializerMethodField()
+    team = serializers.SerializerMethodField()
+
+    class Meta:
+        model = Article
+        fields = ['id', 'title', 'body', 'author_name', 'slug', 'view_count', 'time_ago', 'likes', 'images', 'image_variants', 'type', 'video_url', 'team']
+        list_serializer_class = MediaListSerializer
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.lang = get_language()
+
+    def get_author_name(self, obj):
+        return str(obj.author) if obj.author else "Unknown"
+
+    def get_title(self, obj: Article):
+        return obj.list_title or ""
+
+    def get_body(self, obj: Article):
+        return obj.list_excerpt or ""
+
+    def get_time_ago(self, obj):
+        return get_time_ago(obj)
+
+    def get_images(self, obj):
+        return [self.media.url(image.image.name) for image in obj.get_images()]
+
+    def get_image_variants(self, obj):
+        # In the order of images, None for an image whose variants are not generated yet
+        return [variant_urls(image.image, image.variants, self.media) for image in obj.get_images()]
+
+    def media_names(self, instance):
+        return [name for image in instance.get_images() for name in image_names(image)]
+
+    def get_team(self, obj):
+        if not obj.team:
+            return None
+        return {
+            'id': obj.team.id,
+            'name': obj.team.safe_translation_getter('name', language_code=self.lang, default=""),
+        }
+
+    def to_representation(self, instance: Article):
+        data = super().to_representation(instance)
+
+        # Include status for preview
+        if self.context.get('preview_article'):
+            data['status'] = instance.status
+
+        return data
+
+
 class ArticleDetailSerializer(serializers.ModelSerializer):
     """Serializer for detailed article creation/editing"""
     def __init__(self, *args, **kwargs):
@@ -141,7 +220,8 @@ class ArticleDetailSerializer(serializers.ModelSerializer):
 
     def validate_title(self, value):
         """Ensure title is unique"""
-        if Article.objects.filter(translations__title=value).exists():
+        # Articles are created in Persian, see create()
+        if Article.conflicting_titles({'fa': value}):
             raise serializers.ValidationError("Article with this title already exists")
         return value
 
@@ -166,34 +246,49 @@ class ArticleDetailSerializer(serializers.ModelSerializer):
         instance.body = validated_data.get('body', instance.body) 
         instance.slug = validated_data.get('slug', instance.slug)  
 
-        instance.save()  
+        instance.save_dirty()
         return instance
 
 
-class TeamSerializer(serializers.ModelSerializer):
+class TeamSerializer(MediaSerializerMixin, serializers.ModelSerializer):
     name = serializers.SerializerMethodField()
+    image_variants = serializers.SerializerMethodField()
+
+    media_variants = True
 
     class Meta:
         model = Team
-        fields = ['id', 'name', 'image', 'slug']
+        fields = ['id', 'name', 'image', 'image_variants', 'slug']
+        list_serializer_class = MediaListSerializer
 
     def get_name(self, obj):
-        return obj.safe_translation_getter('name', language_code=self.context['request'].LANGUAGE_CODE)
+        # The active language, the home payload is also rendered without a request
+        return obj.safe_translation_getter('name', language_code=get_language())
 
+    def get_image_variants(self, obj):
+        return variant_urls(obj.image, obj.variants, self.media)
 
-class PlayerSerializer(serializers.ModelSerializer):
+
+class PlayerSerializer(MediaSerializerMixin, serializers.ModelSerializer):
     name = serializers.SerializerMethodField()
     position = serializers.SerializerMethodField()
     goals = serializers.SerializerMethodField()
     games = serializers.SerializerMethodField()
+    image_variants = serializers.SerializerMethodField()
+
+    media_variants = True
 
     class Meta:
         model = Player
-        fields = ['id', 'name', 'image', 'number', 'position', 'goals', 'games']
+        fields = ['id', 'name', 'image', 'image_variants', 'number', 'position', 'goals', 'games']
+        list_serializer_class = MediaListSerializer
 
     def get_name(self, obj: Player):
         return obj.get_name(language_code=get_language())
 
+    def get_image_variants(self, obj):
+        return variant_urls(obj.image, obj.variants, self.media)
+
     def get_position(self, obj):
         return obj.get_position_display()
 
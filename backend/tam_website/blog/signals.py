@@ -0,0 +1,33 @@
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete
+from .cache import bump_content_version
+from .images import queue_variants
+from .models import Article, Team, Player, Image
+
+
+# Translations are saved after their master object, so they invalidate the cache as well
+CONTENT_MODELS = (
+    Article, Article._parler_meta.root_model,
+    Team, Team._parler_meta.root_model,
+    Player, Player._parler_meta.root_model,
+    Image,
+)
+
+
+def invalidate_content_cache(sender, **kwargs):
+    """Bump the content version once the transaction that changed the content commits"""
+    transaction.on_commit(bump_content_version)
+
+
+for model in CONTENT_MODELS:
+    post_save.connect(invalidate_content_cache, sender=model, dispatch_uid=f"invalidate-save-{model.__name__}")
+    post_delete.connect(invalidate_content_cache, sender=model, dispatch_uid=f"invalidate-delete-{model.__name__}")
+
+
+def queue_image_variants(sender, instance, **kwargs):
+    """Generate the variants of a new or replaced image after the transaction commits"""
+    queue_variants([instance])
+
+
+for model in (Image, Team, Player):
+    post_save.connect(queue_image_variants, sender=model, dispatch_uid=f"image-variants-{model.__name__}")
@@ -0,0 +1,61 @@
+from django.contrib.postgres.search import TrigramWordSimilarity
+from django.db.models import Q
+from django.db.models.functions import Upper
+from .models import Article, Team, Player
+
+
+SUGGEST_MIN_LENGTH = 2
+SUGGEST_DEFAULT_LIMIT = 5
+SUGGEST_MAX_LIMIT = 20
+
+
+def _suggestions(model, field, query, language_code, limit, values, **filters):
+    """
+    Translations of ``model`` whose ``field`` contains the query or is similar to it.
+    Both conditions read the trigram index on the upper cased field, so typos still match.
+    """
+    query = query.upper()
+    return model._parler_meta.root_model.objects.filter(
+        language_code=language_code, **filters
+    ).annotate(
+        search_text=Upper(field),
+    ).filter(
+        Q(search_text__contains=query) | Q(search_text__trigram_word_similar=query)
+    ).annotate(
+        similarity=TrigramWordSimilarity(query, 'search_text'),
+    ).order_by('-similarity', field).values(*values)[:limit]
+
+
+def suggestion_querysets(query, language_code, limit=SUGGEST_DEFAULT_LIMIT):
+    return {
+        'articles': _suggestions(
+            Article, 'title', query, language_code, limit,
+            values=('master_id', 'title', 'master__slug'),
+            master__status=Article.Status.PUBLISHED,
+        ),
+        'teams': _suggestions(Team, 'name', query, language_code, limit, values=('master_id', 'name', 'master__slug')),
+        'players': _suggestions(Player, 'name', query, language_code, limit, values=('master_id', 'name')),
+    }
+
+
+def suggest(query, language_code, limit=SUGGEST_DEFAULT_LIMIT):
+    """Top ``limit`` articles, teams and players matching a partial or misspelled query"""
+    query = (query or '').strip()
+    if len(query) < SUGGEST_MIN_LENGTH:
+        return {'articles': [], 'teams': [], 'players': []}
+
+    querysets = suggestion_querysets(query, language_code, limit)
+    return {
+        'articles': [
+            {'id': row['master_id'], 'title': row['title'], 'slug': row['master__slug']}
+            for row in querysets['articles']
+        ],
+        'teams': [
+            {'id': row['master_id'], 'name': row['name'], 'slug': row['master__slug']}
+            for row in querysets['teams']
+        ],
+        'players': [
+            {'id': row['master_id'], 'name': row['name']}
+            for row in querysets['players']
+        ],
+    }
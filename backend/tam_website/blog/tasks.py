@@ -1,33 +1,205 @@
 from celery import shared_task
 from django.utils import timezone
-from django.db.models import Q
+from django.db.models import Q, Case, F, IntegerField, Value, When
 import logging
+from collections import Counter
 
 logger = logging.getLogger(__name__)
 
+@shared_task
+def publish_due_articles():
+    """
+    Periodic task that publishes the drafts whose ``scheduled_publish_at`` has passed,
+    see blog.publishing.
+    """
+    from .publishing import publish_due_articles as publish
+
+    published = publish()
+    return f"Published {len(published)} scheduled articles"
+
+
 @shared_task
 def publish_scheduled_article(article_id):
     """
-    Task to publish an article that was scheduled for publication.
-    This task is scheduled using apply_async with an eta parameter.
-    """
-    from .models.article import Article
-    
-    try:
-        # Get the article by ID
-        article = Article.objects.get(id=article_id)
-        
-        # Check if the article is still in draft status
-        if article.status == Article.Status.DRAFT:
-            # Update the status to published
-            article.status = Article.Status.PUBLISHED
-            article.save()
-            
-            return f"Published article: {article.get_title()}"
-        else:
-            return f"Article was already published: {article.get_title()}"
-            
-    except Article.DoesNotExist:
-        pass
-    except Exception as e:
-        pass
\ No newline at end of file
+    Publish one article if it is due. Scheduled articles are published by
+    ``publish_due_articles`` now, this task only runs the ETA tasks queued before.
+    """
+    from .publishing import publish_due_articles as publish
+
+    if publish(article_ids=[article_id]):
+        return f"Published article {article_id}"
+    return f"Article {article_id} is not due for publication"
+
+
+def _store_views(views):
+    """Insert the not yet stored ``views`` as MiddleArticleIpAddress rows in one transaction, returns their number"""
+    from django.db import connection, transaction
+    from django.utils.dateparse import parse_datetime
+    from .models.article import Article, MiddleArticleIpAddress
+    from .redis import VisitorIds
+
+    with transaction.atomic():
+        # The hit table is partitioned on created_at, no unique index on (article, ipaddress)
+        # rejects a pair stored by an overlapping flush: the flushes are serialized instead
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT pg_advisory_xact_lock(hashtext(%s))", ['blog.tasks.store_views'])
+
+        # Resolve the visitor rows, creating the missing ones in one statement
+        ip_ids = VisitorIds().get_many(view['ip'] for view in views)
+
+        # Views of articles deleted in the meantime are dropped
+        article_ids = set(Article.objects.filter(
+            id__in={view['article_id'] for view in views}
+        ).values_list('id', flat=True))
+
+        # Skip pairs that are already stored (e.g. a view re-queued after a failure)
+        existing = set(MiddleArticleIpAddress.objects.filter(
+            article_id__in=article_ids,
+            ipaddress_id__in=ip_ids.values(),
+        ).values_list('article_id', 'ipaddress_id'))
+
+        hits = []
+        for view in views:
+            pair = (view['article_id'], ip_ids[view['ip']])
+            if view['article_id'] not in article_ids or pair in existing:
+                continue
+            existing.add(pair)
+            hits.append(MiddleArticleIpAddress(
+                article_id=pair[0],
+                ipaddress_id=pair[1],
+                created_at=parse_datetime(view['viewed_at']),
+            ))
+        MiddleArticleIpAddress.objects.bulk_create(hits)
+
+        # Every stored hit is a unique viewer, counted in the same transaction
+        counts = Counter(hit.article_id for hit in hits)
+        if counts:
+            Article.objects.filter(id__in=counts).update(view_count=F('view_count') + Case(
+                *[When(id=article_id, then=Value(count)) for article_id, count in counts.items()],
+                default=Value(0),
+                output_field=IntegerField(),
+            ))
+    return len(hits)
+
+
+@shared_task
+def flush_article_views(batch_size=1000, max_batches=50):
+    """
+    Periodic task that bulk inserts the article views queued in Redis by
+    ``RedisService.add_article_view`` as MiddleArticleIpAddress rows.
+
+    Views the database rejects are dead-lettered instead of blocking the queue, a
+    batch is only requeued when the database itself fails (e.g. it is unreachable).
+    """
+    from django.db import DataError, IntegrityError
+    from .redis import PendingViewQueue
+
+    queue = PendingViewQueue()
+    inserted = 0
+
+    for _ in range(max_batches):
+        views = queue.pop(batch_size)
+        if not views:
+            break
+
+        rejected = [view for view in views if not queue.is_valid(view)]
+        if rejected:
+            queue.dead_letter(rejected)
+            logger.warning("Dead-lettered %s malformed queued article views", len(rejected))
+            views = [view for view in views if queue.is_valid(view)]
+        if not views:
+            continue
+
+        try:
+            inserted += _store_views(views)
+        except (DataError, IntegrityError):
+            # Some row is rejected, the views are stored one by one to set it aside
+            for index, view in enumerate(views):
+                try:
+                    inserted += _store_views([view])
+                except (DataError, IntegrityError):
+                    queue.dead_letter([view])
+                    logger.exception("Dead-lettered a queued article view the database rejects: %s", view)
+                except Exception:
+                    queue.requeue(views[index:])
+                    logger.exception("Failed to flush %s queued article views", len(views) - index)
+                    raise
+        except Exception:
+            queue.requeue(views)
+            logger.exception("Failed to flush %s queued article views", len(views))
+            raise
+
+    return f"Inserted {inserted} article views"
+
+
+@shared_task
+def maintain_hit_partitions(drop=False):
+    """
+    Periodic task that creates the upcoming monthly partitions of the article hit table
+    and, when ``ARTICLE_HITS_RETENTION_MONTHS`` is set, detaches the expired ones.
+    """
+    from django.conf import settings
+    from .partitions import add_months, create_partitions, detach_partitions, month_start
+
+    this_month = month_start(timezone.now())
+    created = create_partitions(this_month, add_months(this_month, settings.ARTICLE_HITS_PARTITIONS_AHEAD))
+
+    detached = []
+    retention = settings.ARTICLE_HITS_RETENTION_MONTHS
+    if retention:
+        detached = detach_partitions(add_months(this_month, -retention), drop=drop)
+
+    return f"Created {len(created)} and detached {len(detached)} article hit partitions"
+
+
+@shared_task
+def generate_image_variants(model_label, pk):
+    """
+    Task that stores the resized variants of the image of a ``model_label`` instance
+    (an article image, team or player), queued after the image is uploaded.
+    """
+    from django.apps import apps
+    from .cache import bump_content_version
+    from .images import create_variants, needs_variants, variant_names
+    from .uploads import delete_files
+
+    model = apps.get_model(model_label)
+    instance = model.objects.filter(pk=pk).only('image', 'variants').first()
+    if instance is None or not needs_variants(instance):
+        return f"No variants needed for {model_label} {pk}"
+
+    field = instance.image.field
+    variants = create_variants(instance.image)
+    # The image may have been replaced meanwhile, its own task makes its variants then
+    if not model.objects.filter(pk=pk, image=instance.image.name).update(variants=variants):
+        delete_files(field, variant_names(variants))
+        return f"Image of {model_label} {pk} changed, variants discarded"
+
+    delete_files(field, variant_names(instance.variants))
+    bump_content_version()
+    return f"Generated {len(variants) - 1} variants for {model_label} {pk}"
+
+
+@shared_task
+def collect_orphan_images(batch_size=1000, max_batches=50):
+    """
+    Periodic task that marks the article images linked to no article (e.g. the images of
+    deleted articles) and deletes, with their files, the ones marked more than
+    ``ORPHAN_IMAGES_GRACE_PERIOD`` seconds ago.
+    """
+    from datetime import timedelta
+    from django.conf import settings
+    from django.db import transaction
+    from .images import delete_orphan_images, mark_orphan_images
+
+    marked = mark_orphan_images()
+    before = timezone.now() - timedelta(seconds=settings.ORPHAN_IMAGES_GRACE_PERIOD)
+    deleted = 0
+    for _ in range(max_batches):
+        with transaction.atomic():
+            count = delete_orphan_images(before, batch_size)
+        deleted += count
+        if count < batch_size:
+            break
+
+    return f"Marked {marked} and deleted {deleted} orphan images"
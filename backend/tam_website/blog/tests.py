@@ -1,3 +1,818 @@
-from django.test import TestCase
+import json
+import threading
+from io import BytesIO
+from datetime import timedelta
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.core.files.storage import InMemoryStorage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.utils import timezone, translation
+from unittest import mock
+from django.db import DatabaseError, connection
+from django.test.utils import CaptureQueriesContext
+from django.test import RequestFactory, SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.urls import reverse
+from PIL import Image as PILImage
+from rest_framework.test import APIClient
+from .models import Article, Team, Image, IpAddress, MiddleArticleIpAddress
+from .images import variant_urls
+from .likes import like_article, unlike_article
+from .media import MediaUrls
+from .publishing import render_payloads
+from .redis import PendingViewQueue, RedisService, UniqueViewerCounter, VisitorIds
+from .serializers import TeamSerializer
+from .cache import article_cache_key, bump_content_version, get_content_version, get_or_build, home_stale_cache_key
+from .tasks import _store_views, collect_orphan_images, flush_article_views, generate_image_variants, publish_due_articles, publish_scheduled_article
+from .uploads import store_files
+from .utils.normalization import normalize_many, normalize_persian
 
-# Create your tests here.
+
+@override_settings(STORAGES={
+    'default': {'BACKEND': 'django.core.files.storage.InMemoryStorage'},
+    'staticfiles': {'BACKEND': 'django.contrib.staticfiles.storage.StaticFilesStorage'},
+})
+class ArticleListQueryCountTests(TestCase):
+    """
+    The article list must be serialized with a constant number of queries.
+    """
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.team = Team()
+        self.team.set_current_language('en')
+        self.team.name = 'Lions'
+        self.team.set_current_language('fa')
+        self.team.name = 'شیرها'
+        self.team.save()
+
+    def create_articles(self, count):
+        for index in range(Article.objects.count(), Article.objects.count() + count):
+            article = Article(team=self.team, status=Article.Status.PUBLISHED)
+            article.set_current_language('en')
+            article.title = f'Match report {index}'
+            article.body = '<p>The home side <strong>won</strong> the derby after a late goal in the second half.</p>'
+            article.set_current_language('fa')
+            article.title = f'گزارش بازی {index}'
+            article.body = 'تیم میزبان با یک گل دیرهنگام در نیمه دوم برنده دربی شد.'
+            article.save()
+            image = Image.objects.create(image=f'article-images/report-{index}.png')
+            image.article.add(article)
+
+    def assert_list_queries(self, expected_articles, num_queries=4, **params):
+        # count + articles (author/team joined, title/excerpt annotated) + team translations + images
+        with self.assertNumQueries(num_queries):
+            response = self.client.get(reverse('blog:article-list'), params, HTTP_ACCEPT_LANGUAGE='en')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data['articles']), expected_articles)
+        return response
+
+    def test_query_count_does_not_grow_with_page_size(self):
+        self.create_articles(2)
+        self.assert_list_queries(2)
+
+        self.create_articles(10)
+        response = self.assert_list_queries(12)
+
+        article = response.data['articles'][0]
+        self.assertEqual(article['title'], 'Match report 11')
+        self.assertEqual(article['team']['name'], 'Lions')
+        self.assertEqual(len(article['images']), 1)
+        self.assertEqual(article['body'], 'The home side won the derby after a late goal...')
+
+    def test_cursor_pagination_walks_all_articles_without_count(self):
+        self.create_articles(30)
+
+        # articles + team translations + images, no COUNT query
+        response = self.assert_list_queries(12, num_queries=3, **{'fetch-all': 'true'})
+        titles = [article['title'] for article in response.data['articles']]
+        while response.data['next']:
+            with self.assertNumQueries(3):
+                response = self.client.get(response.data['next'], HTTP_ACCEPT_LANGUAGE='en')
+            titles += [article['title'] for article in response.data['articles']]
+
+        self.assertEqual(titles, [f'Match report {index}' for index in range(29, -1, -1)])
+
+    def test_cursor_pagination_pages_articles_created_at_the_same_time_by_id(self):
+        self.create_articles(30)
+        Article.objects.update(created_date=timezone.now())
+
+        response = self.assert_list_queries(12, num_queries=3, **{'fetch-all': 'true'})
+        pages = [response.data]
+        while response.data['next']:
+            response = self.client.get(response.data['next'], HTTP_ACCEPT_LANGUAGE='en')
+            pages.append(response.data)
+        titles = [article['title'] for page in pages for article in page['articles']]
+        self.assertEqual(titles, [f'Match report {index}' for index in range(29, -1, -1)])
+
+        # The previous link of the last page leads back to the second one
+        response = self.client.get(pages[-1]['previous'], HTTP_ACCEPT_LANGUAGE='en')
+        self.assertEqual(response.data['articles'], pages[1]['articles'])
+
+
+class ArticleSearchTests(TestCase):
+    """
+    Search reads the stored search vector of the requested language.
+    """
+
+    def create_article(self, title_en, title_fa, body='<p>Match report</p>'):
+        # Published an hour ago, the persian time ago has no wording for "now"
+        article = Article(status=Article.Status.PUBLISHED, scheduled_publish_at=timezone.now() - timedelta(hours=1))
+        article.set_current_language('en')
+        article.title = title_en
+        article.body = body
+        article.set_current_language('fa')
+        article.title = title_fa
+        article.body = body
+        article.save()
+        return article
+
+    def search(self, value, language):
+        response = APIClient().get(reverse('blog:article-list'), {'search': value}, HTTP_ACCEPT_LANGUAGE=language)
+        return [article['id'] for article in response.data['articles']]
+
+    def test_search_matches_stemmed_english_and_normalized_persian(self):
+        derby = self.create_article('Winning the derby', 'پیروزی در دربی کرمان')
+        self.create_article('Transfer news', 'اخبار نقل و انتقالات')
+
+        self.assertEqual(self.search('derbies won', 'en'), [])
+        self.assertEqual(self.search('wins derby', 'en'), [derby.id])
+        # Arabic kaf and yeh in the query match the Persian letters of the title
+        self.assertEqual(self.search('كرمان', 'fa'), [derby.id])
+
+    def test_search_matches_half_spaced_words_in_any_form(self):
+        article = self.create_article('Goals', 'می\u200cخواهم گل بزنم')
+
+        for query in ('میخواهم', 'می خواهم', 'مي\u200cخواهم'):
+            self.assertEqual(self.search(query, 'fa'), [article.id])
+
+    def test_search_vector_follows_translation_updates(self):
+        article = self.create_article('Transfer news', 'اخبار نقل و انتقالات')
+        article.set_current_language('en')
+        article.title = 'Cup final preview'
+        article.save()
+
+        self.assertEqual(self.search('transfer', 'en'), [])
+        self.assertEqual(self.search('final', 'en'), [article.id])
+
+
+class NormalizationTests(SimpleTestCase):
+
+    def test_normalize_persian(self):
+        self.assertEqual(normalize_persian('علي  كريمي\u200cها ۱۴۰۳ ٢'), 'علی کریمی ها 1403 2')
+
+    def test_normalize_many_matches_single_normalization(self):
+        texts = ['علي ۱', '', None, 'كتاب\u200c\u200cها']
+        self.assertEqual(normalize_many(texts), [normalize_persian(text) for text in texts])
+
+
+class VisitorIdsTests(TestCase):
+
+    def setUp(self):
+        self.ips = ['192.0.2.1', '192.0.2.2']
+        self.visitors = VisitorIds()
+        self.visitors.connection.delete(*[VisitorIds.key(ip) for ip in self.ips])
+        VisitorIds.clear_local()
+        self.existing = IpAddress.objects.create(ip=self.ips[0])
+
+    def tearDown(self):
+        self.visitors.connection.delete(*[VisitorIds.key(ip) for ip in self.ips])
+        VisitorIds.clear_local()
+
+    def test_missing_ips_are_resolved_in_one_query_then_cached(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            with self.assertNumQueries(1):
+                ids = self.visitors.get_many(self.ips)
+        self.assertEqual(ids[self.ips[0]], self.existing.id)
+        self.assertEqual(IpAddress.objects.filter(ip__in=self.ips).count(), 2)
+
+        with self.assertNumQueries(0):
+            self.assertEqual(self.visitors.get_many(self.ips), ids)
+        VisitorIds.clear_local()
+        with self.assertNumQueries(0):
+            self.assertEqual(self.visitors.get(self.ips[1]), ids[self.ips[1]])
+
+
+def create_published_article(title):
+    article = Article(status=Article.Status.PUBLISHED)
+    article.set_current_language('en')
+    article.title = title
+    article.body = 'Body'
+    article.save()
+    return article
+
+
+class ArticleLikeViewTests(TestCase):
+
+    def setUp(self):
+        VisitorIds().connection.delete(VisitorIds.key('127.0.0.1'))
+        VisitorIds.clear_local()
+        self.article = create_published_article('Liked article')
+        self.url = reverse('blog:article-like', args=[self.article.slug])
+
+    def test_like_and_unlike_are_idempotent(self):
+        client = APIClient()
+        self.assertEqual(client.post(self.url).data, {'likes': 1, 'is_liked': True})
+        self.assertEqual(client.post(self.url).data['likes'], 1)
+        self.assertEqual(client.delete(self.url).data, {'likes': 0, 'is_liked': False})
+        self.assertEqual(client.delete(self.url).data['likes'], 0)
+        self.assertEqual(self.article.likes.count(), 0)
+
+    def test_unknown_or_draft_article_is_not_found(self):
+        Article.objects.filter(pk=self.article.pk).update(status=Article.Status.DRAFT)
+        self.assertEqual(APIClient().post(self.url).status_code, 404)
+        self.assertEqual(APIClient().post(reverse('blog:article-like', args=['missing'])).status_code, 404)
+
+
+class ArticleViewFlushTests(TestCase):
+    """
+    Queued views are bulk inserted as hits, views that can't be stored are dead-lettered.
+    """
+    IPS = ['198.51.100.1', '198.51.100.2']
+
+    def setUp(self):
+        self.queue = PendingViewQueue()
+        self.clear_redis()
+        self.addCleanup(self.clear_redis)
+        self.article = create_published_article('Viewed')
+
+    def clear_redis(self):
+        self.queue.connection.delete(
+            PendingViewQueue.KEY, PendingViewQueue.DEAD_LETTER_KEY, *[VisitorIds.key(ip) for ip in self.IPS],
+        )
+        VisitorIds.clear_local()
+
+    def view(self, ip, article_id=None):
+        return {'article_id': article_id or self.article.id, 'ip': ip, 'viewed_at': timezone.now().isoformat()}
+
+    def dead_letters(self):
+        return [json.loads(view) for view in self.queue.connection.lrange(PendingViewQueue.DEAD_LETTER_KEY, 0, -1)]
+
+    def test_views_are_inserted_once_and_malformed_ones_dead_lettered(self):
+        malformed = [self.view('unknown'), self.view('1.2.3.4:5678'), self.view(self.IPS[0], article_id='1')]
+        self.queue.requeue([self.view(self.IPS[0]), self.view(self.IPS[1]), self.view(self.IPS[0]), *malformed])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(flush_article_views(), 'Inserted 2 article views')
+
+        self.assertEqual(
+            sorted(MiddleArticleIpAddress.objects.values_list('article_id', 'ipaddress__ip')),
+            [(self.article.id, ip) for ip in self.IPS],
+        )
+        self.assertEqual(self.dead_letters(), malformed)
+        self.assertEqual(len(self.queue), 0)
+
+        # A view stored before (e.g. requeued) is not inserted again
+        self.queue.requeue([self.view(self.IPS[1])])
+        self.assertEqual(flush_article_views(), 'Inserted 0 article views')
+
+    def test_a_view_the_database_rejects_does_not_block_the_batch(self):
+        rejected = self.view('unknown')
+        self.queue.requeue([self.view(self.IPS[0]), rejected, self.view(self.IPS[1])])
+
+        with mock.patch.object(PendingViewQueue, 'is_valid', return_value=True):
+            self.assertEqual(flush_article_views(), 'Inserted 2 article views')
+
+        self.assertEqual(MiddleArticleIpAddress.objects.count(), 2)
+        self.assertEqual(self.dead_letters(), [rejected])
+
+    def test_client_ip_falls_back_to_the_remote_address(self):
+        def client_ip(forwarded):
+            request = RequestFactory().get('/', HTTP_X_FORWARDED_FOR=forwarded, REMOTE_ADDR='192.0.2.9')
+            return RedisService(request).get_client_ip()
+
+        self.assertEqual(client_ip('203.0.113.5, 10.0.0.1'), '203.0.113.5')
+        self.assertEqual(client_ip('2001:db8::1'), '2001:db8::1')
+        for forwarded in ('unknown', '', '1.2.3.4:5678'):
+            self.assertEqual(client_ip(forwarded), '192.0.2.9')
+
+
+class UniqueViewerCounterTests(TestCase):
+    """
+    Viewers are counted exactly up to ARTICLE_VIEWERS_EXACT_LIMIT, then with a HyperLogLog.
+    """
+    IPS = [f'198.51.100.{index}' for index in range(1, 6)]
+
+    def setUp(self):
+        self.counter = UniqueViewerCounter()
+        self.article = create_published_article('Counted')
+        self.clear_redis()
+        self.addCleanup(self.clear_redis)
+
+    def clear_redis(self):
+        exact_key = UniqueViewerCounter.exact_key(self.article.id)
+        self.counter.connection.delete(
+            exact_key, f"{exact_key}:promoting", UniqueViewerCounter.hll_key(self.article.id),
+            UniqueViewerCounter.daily_key(timezone.localdate(), self.article.id), PendingViewQueue.KEY,
+            *[VisitorIds.key(ip) for ip in self.IPS],
+        )
+        VisitorIds.clear_local()
+
+    def store_hits(self, ips):
+        ip_ids = VisitorIds().get_many(ips)
+        MiddleArticleIpAddress.objects.bulk_create([
+            MiddleArticleIpAddress(article=self.article, ipaddress_id=ip_ids[ip]) for ip in ips
+        ])
+
+    def counted_exactly(self):
+        return bool(self.counter.connection.exists(UniqueViewerCounter.exact_key(self.article.id)))
+
+    @override_settings(ARTICLE_VIEWERS_EXACT_LIMIT=2)
+    def test_exact_set_is_promoted_to_a_hyperloglog(self):
+        counter = UniqueViewerCounter()
+        self.assertTrue(counter.add(self.article.id, self.IPS[0]))
+        self.assertFalse(counter.add(self.article.id, self.IPS[0]))
+        self.assertTrue(counter.add(self.article.id, self.IPS[1]))
+        self.assertTrue(self.counted_exactly())
+        self.assertEqual(counter.count(self.article.id), 2)
+
+        self.assertTrue(counter.add(self.article.id, self.IPS[2]))
+        self.assertFalse(self.counted_exactly())
+        self.assertEqual(counter.count(self.article.id), 3)
+
+        # A HyperLogLog can't tell a new viewer, every view may be a first one
+        self.assertTrue(counter.add(self.article.id, self.IPS[0]))
+        self.assertTrue(counter.add(self.article.id, self.IPS[3]))
+        self.assertEqual(counter.count(self.article.id), 4)
+
+    @override_settings(ARTICLE_VIEWERS_EXACT_LIMIT=2)
+    def test_cold_counters_are_seeded_from_the_stored_hits(self):
+        counter = UniqueViewerCounter()
+        self.store_hits(self.IPS[:2])
+        self.assertEqual(counter.count(self.article.id), 2)
+        self.assertTrue(self.counted_exactly())
+        self.assertFalse(counter.add(self.article.id, self.IPS[1]))
+
+        # More stored viewers than the exact limit are seeded into a HyperLogLog
+        self.clear_redis()
+        self.store_hits(self.IPS[2:4])
+        self.assertEqual(counter.count(self.article.id), 4)
+        self.assertFalse(self.counted_exactly())
+
+    @override_settings(ARTICLE_VIEWERS_EXACT_LIMIT=0)
+    def test_views_counted_with_a_hyperloglog_are_deduplicated_by_the_flush(self):
+        request = RequestFactory().get('/', REMOTE_ADDR=self.IPS[0])
+        for _ in range(3):
+            self.assertTrue(RedisService(request).add_article_view(self.article.id))
+        RedisService(RequestFactory().get('/', REMOTE_ADDR=self.IPS[1])).add_article_view(self.article.id)
+
+        self.assertEqual(flush_article_views(), 'Inserted 2 article views')
+        self.assertEqual(Article.objects.get(pk=self.article.pk).view_count, 2)
+        self.assertEqual(MiddleArticleIpAddress.objects.filter(article=self.article).count(), 2)
+
+
+class ContentCacheTests(TestCase):
+    """
+    Cached payloads are rebuilt by one worker, behind a version the signals bump.
+    """
+    KEY = 'blog:test:payload'
+    STALE_KEY = 'blog:test:payload:stale'
+
+    def setUp(self):
+        cache.delete_many([self.KEY, self.STALE_KEY, f'{self.KEY}:lock'])
+        self.addCleanup(cache.delete_many, [self.KEY, self.STALE_KEY, f'{self.KEY}:lock'])
+        self.builds = 0
+
+    def build(self):
+        self.builds += 1
+        return f'payload {self.builds}'
+
+    def test_saved_content_bumps_the_version_on_commit(self):
+        version = get_content_version()
+        with self.captureOnCommitCallbacks(execute=True):
+            article = create_published_article('Bumped')
+            self.assertEqual(get_content_version(), version)
+        self.assertGreater(get_content_version(), version)
+
+        version = get_content_version()
+        with self.captureOnCommitCallbacks(execute=True):
+            article.delete()
+        self.assertGreater(get_content_version(), version)
+
+    def test_other_workers_serve_the_stale_copy_while_one_rebuilds(self):
+        self.assertEqual(get_or_build(self.KEY, self.build, stale_key=self.STALE_KEY), 'payload 1')
+        self.assertEqual(get_or_build(self.KEY, self.build, stale_key=self.STALE_KEY), 'payload 1')
+
+        cache.delete(self.KEY)
+        rebuilding = cache.lock(f'{self.KEY}:lock', timeout=5)
+        self.assertTrue(rebuilding.acquire(blocking=False))
+        try:
+            self.assertEqual(get_or_build(self.KEY, self.build, stale_key=self.STALE_KEY), 'payload 1')
+        finally:
+            rebuilding.release()
+        self.assertEqual(self.builds, 1)
+
+    @override_settings(BLOG_CACHE_LOCK_TIMEOUT=0.2)
+    def test_waiters_build_without_caching_when_the_rebuild_takes_too_long(self):
+        rebuilding = cache.lock(f'{self.KEY}:lock', timeout=5)
+        self.assertTrue(rebuilding.acquire(blocking=False))
+        try:
+            self.assertEqual(get_or_build(self.KEY, self.build), 'payload 1')
+        finally:
+            rebuilding.release()
+        self.assertIsNone(cache.get(self.KEY))
+
+    def test_cached_copies_expire_with_the_signed_media_urls(self):
+        with mock.patch.object(MediaUrls, 'validity', return_value=900):
+            get_or_build(self.KEY, self.build, stale_key=self.STALE_KEY, timeout=3600)
+        self.assertTrue(0 < cache.ttl(self.KEY) <= 900)
+        self.assertTrue(0 < cache.ttl(self.STALE_KEY) <= 900)
+
+        cache.delete_many([self.KEY, self.STALE_KEY])
+        with mock.patch.object(MediaUrls, 'validity', return_value=None):
+            get_or_build(self.KEY, self.build, stale_key=self.STALE_KEY, timeout=60)
+        self.assertTrue(0 < cache.ttl(self.KEY) <= 60)
+        # Unsigned URLs don't expire, neither does the stale copy
+        self.assertIsNone(cache.ttl(self.STALE_KEY))
+
+
+class ConcurrentTestCase(TransactionTestCase):
+    """Runs a target from many threads at once, each with its own database connection"""
+    THREADS = 8
+
+    def run_concurrently(self, target):
+        barrier = threading.Barrier(self.THREADS)
+        errors = []
+
+        def worker(index):
+            try:
+                barrier.wait()
+                target(index)
+            except Exception as error:
+                errors.append(error)
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=worker, args=(index,)) for index in range(self.THREADS)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(errors, [])
+
+
+class ConcurrentLikeTests(ConcurrentTestCase):
+    """
+    Toggles from many threads at once, the like counter must match the stored likes afterwards.
+    """
+    TOGGLES = 25
+
+    def test_no_lost_updates_under_concurrent_toggles(self):
+        article = create_published_article('Contended article')
+        ip_ids = [IpAddress.objects.create(ip=f'198.51.100.{index}').id for index in range(self.THREADS)]
+
+        def toggle(index):
+            # Every thread toggles its own like and the like of its neighbour
+            for turn in range(self.TOGGLES):
+                ip_id = ip_ids[(index + turn) % self.THREADS]
+                if turn % 2:
+                    unlike_article(article.slug, ip_id)
+                else:
+                    like_article(article.slug, ip_id)
+
+        self.run_concurrently(toggle)
+        article.refresh_from_db()
+        self.assertEqual(article.like_count, article.likes.count())
+
+        # Every visitor likes once more, concurrently: none of the increments is lost
+        self.run_concurrently(lambda index: like_article(article.slug, ip_ids[index]))
+        article.refresh_from_db()
+        self.assertEqual(article.like_count, self.THREADS)
+        self.assertEqual(article.likes.count(), self.THREADS)
+
+
+class ConcurrentViewFlushTests(ConcurrentTestCase):
+    """
+    Overlapping flushes store the views of a visitor once.
+    """
+    IP = '198.51.100.7'
+
+    def setUp(self):
+        self.addCleanup(VisitorIds.clear_local)
+        self.addCleanup(VisitorIds().connection.delete, VisitorIds.key(self.IP))
+
+    def test_overlapping_flushes_store_one_hit_per_visitor(self):
+        article = create_published_article('Viewed')
+        # A cached visitor id, the flushes don't lock its IpAddress row
+        VisitorIds().get_many([self.IP])
+
+        def store(index):
+            viewed_at = timezone.now() - timedelta(seconds=index)
+            _store_views([{'article_id': article.id, 'ip': self.IP, 'viewed_at': viewed_at.isoformat()}])
+
+        self.run_concurrently(store)
+        article.refresh_from_db()
+        self.assertEqual(MiddleArticleIpAddress.objects.filter(article=article).count(), 1)
+        self.assertEqual(article.view_count, 1)
+
+
+class ArticleDirtyTrackingTests(TestCase):
+
+    def setUp(self):
+        self.article = create_published_article('First title')
+
+    def test_saves_without_english_title_change_keep_the_slug_without_queries(self):
+        article = Article.objects.get(pk=self.article.pk)
+        article.status = Article.Status.DRAFT
+        self.assertEqual(article.get_dirty_fields(), {'status'})
+
+        # Neither the translation nor the slug is looked at
+        with self.assertNumQueries(1):
+            article.save(update_fields=['status'])
+        with self.assertNumQueries(0):
+            article.save_dirty()
+        self.assertEqual(article.slug, 'first-title')
+
+    def test_english_title_change_updates_the_slug(self):
+        article = Article.objects.get(pk=self.article.pk)
+        article.set_current_language('en')
+        article.title = 'Second title'
+        article.save_dirty()
+
+        self.assertEqual(Article.objects.get(pk=article.pk).slug, 'second-title')
+
+    def test_loaded_and_saved_titles_are_not_changed(self):
+        article = Article.objects.get(pk=self.article.pk)
+        article.set_current_language('en')
+        self.assertEqual(article.title, 'First title')
+        self.assertFalse(article.translated_field_changed('title', 'en'))
+
+        article.title = 'Second title'
+        self.assertTrue(article.translated_field_changed('title', 'en'))
+        article.save()
+        self.assertFalse(article.translated_field_changed('title', 'en'))
+        self.assertEqual(article.slug, 'second-title')
+
+
+class FlakyStorage(InMemoryStorage):
+    """In-memory storage whose saves of files named 'timeout*' or 'broken*' fail"""
+    timeouts = {}
+
+    def _save(self, name, content):
+        basename = name.rsplit('/', 1)[-1]
+        if basename.startswith('broken'):
+            raise ValueError('Unreadable file')
+        if basename.startswith('timeout') and self.timeouts.get(basename, 0) < 2:
+            self.timeouts[basename] = self.timeouts.get(basename, 0) + 1
+            raise ConnectionError('Connection reset')
+        return super()._save(name, content)
+
+
+@override_settings(
+    STORAGES={
+        'default': {'BACKEND': 'blog.tests.FlakyStorage'},
+        'staticfiles': {'BACKEND': 'django.contrib.staticfiles.storage.StaticFilesStorage'},
+    },
+    MEDIA_UPLOAD_RETRY_BACKOFF=0,
+)
+class UploadPipelineTests(TestCase):
+
+    def setUp(self):
+        FlakyStorage.timeouts = {}
+        self.field = Image._meta.get_field('image')
+
+    def upload(self, name):
+        return SimpleUploadedFile(name, name.encode(), content_type='image/jpeg')
+
+    def test_files_are_stored_in_order_and_transient_errors_retried(self):
+        names = store_files(self.field, [self.upload(f'photo{i}.jpg') for i in range(5)] + [self.upload('timeout.jpg')])
+
+        self.assertEqual(names, [f'article-images/photo{i}.jpg' for i in range(5)] + ['article-images/timeout.jpg'])
+        self.assertEqual(FlakyStorage.timeouts, {'timeout.jpg': 2})
+        with self.field.storage.open('article-images/timeout.jpg') as stored:
+            self.assertEqual(stored.read(), b'timeout.jpg')
+
+    def test_a_failed_file_deletes_the_stored_ones(self):
+        with self.assertRaises(ValueError):
+            store_files(self.field, [self.upload('first.jpg'), self.upload('broken.jpg'), self.upload('last.jpg')])
+
+        self.assertFalse(self.field.storage.exists('article-images/first.jpg'))
+        self.assertFalse(self.field.storage.exists('article-images/last.jpg'))
+
+
+@override_settings(
+    STORAGES={
+        'default': {'BACKEND': 'django.core.files.storage.InMemoryStorage'},
+        'staticfiles': {'BACKEND': 'django.contrib.staticfiles.storage.StaticFilesStorage'},
+    },
+    IMAGE_VARIANT_WIDTHS={'thumbnail': 320, 'hero': 1600},
+    IMAGE_VARIANT_FORMATS=('webp',),
+)
+class ImageVariantTests(TestCase):
+
+    def png(self, name, size):
+        output = BytesIO()
+        PILImage.new('RGBA', size, (200, 0, 0, 128)).save(output, 'PNG')
+        return ContentFile(output.getvalue(), name=name)
+
+    def test_variants_are_stored_beside_the_original_and_never_enlarged(self):
+        image = Image.objects.create(image=self.png('banner.png', (1000, 500)))
+
+        generate_image_variants('blog.Image', image.pk)
+
+        image.refresh_from_db()
+        self.assertEqual(image.variants, {
+            'source': 'article-images/banner.png',
+            'thumbnail': {'width': 320, 'height': 160, 'webp': 'article-images/banner-thumbnail.webp'},
+            'hero': {'width': 1000, 'height': 500, 'webp': 'article-images/banner-hero.webp'},
+        })
+        with image.image.storage.open('article-images/banner-thumbnail.webp') as variant:
+            self.assertEqual(PILImage.open(variant).format, 'WEBP')
+        url = image.image.storage.url
+        self.assertEqual(
+            variant_urls(image.image, image.variants)['srcset']['webp'],
+            f"{url('article-images/banner-thumbnail.webp')} 320w, {url('article-images/banner-hero.webp')} 1000w",
+        )
+
+        # The variants of a replaced image are not served, and replaced by the next run
+        image.image = self.png('other.png', (400, 400))
+        image.save()
+        self.assertIsNone(variant_urls(image.image, image.variants))
+        generate_image_variants('blog.Image', image.pk)
+        image.refresh_from_db()
+        self.assertEqual(image.variants['source'], 'article-images/other.png')
+        self.assertFalse(image.image.storage.exists('article-images/banner-hero.webp'))
+
+
+class CountingStorage(InMemoryStorage):
+    """In-memory storage counting its url() calls"""
+    url_calls = 0
+
+    def url(self, name):
+        CountingStorage.url_calls += 1
+        return super().url(name)
+
+
+@override_settings(
+    STORAGES={
+        'default': {'BACKEND': 'blog.tests.CountingStorage'},
+        'staticfiles': {'BACKEND': 'django.contrib.staticfiles.storage.StaticFilesStorage'},
+    },
+    MEDIA_CDN_URL='',
+)
+class MediaUrlsTests(TestCase):
+
+    def setUp(self):
+        CountingStorage.url_calls = 0
+        MediaUrls.clear_cache()
+        for index, name in enumerate(['One', 'Two', 'Three']):
+            team = Team(image=f'team_pictures/{index}.png', variants={
+                'source': f'team_pictures/{index}.png',
+                'card': {'width': 640, 'height': 640, 'webp': f'team_pictures/{index}-card.webp'},
+            })
+            team.set_current_language('en')
+            team.name = name
+            team.save()
+
+    def serialize_teams(self):
+        request = APIClient().get('/').wsgi_request
+        request.LANGUAGE_CODE = 'en'
+        return TeamSerializer(Team.objects.order_by('pk'), many=True, context={'request': request}).data
+
+    def test_page_urls_are_resolved_once_and_reused_across_requests(self):
+        data = self.serialize_teams()
+        self.assertEqual(data[0]['image'], 'http://testserver' + CountingStorage().url('team_pictures/0.png'))
+        self.assertEqual(data[0]['image_variants']['variants']['card']['webp'], CountingStorage().url('team_pictures/0-card.webp'))
+        CountingStorage.url_calls = 0
+
+        self.serialize_teams()
+        self.assertEqual(CountingStorage.url_calls, 0)
+
+    @override_settings(MEDIA_CDN_URL='https://cdn.example.com/media/')
+    def test_cdn_urls_are_built_without_the_storage(self):
+        data = self.serialize_teams()
+        self.assertEqual(data[1]['image'], 'https://cdn.example.com/media/team_pictures/1.png')
+        self.assertEqual(CountingStorage.url_calls, 0)
+
+
+@override_settings(
+    STORAGES={
+        'default': {'BACKEND': 'django.core.files.storage.InMemoryStorage'},
+        'staticfiles': {'BACKEND': 'django.contrib.staticfiles.storage.StaticFilesStorage'},
+    },
+    ORPHAN_IMAGES_GRACE_PERIOD=60 * 60,
+)
+class OrphanImageCollectionTests(TestCase):
+
+    def test_orphans_are_marked_then_deleted_with_their_files_after_the_grace_period(self):
+        article = create_published_article('Gallery')
+        kept = Image.objects.create(image=ContentFile(b'kept', name='kept.png'))
+        kept.article.add(article)
+        orphan = Image.objects.create(image=ContentFile(b'orphan', name='orphan.png'))
+        storage = orphan.image.storage
+        variant = storage.save('article-images/orphan-card.webp', ContentFile(b'variant'))
+        Image.objects.filter(pk=orphan.pk).update(variants={
+            'source': orphan.image.name, 'card': {'width': 1, 'height': 1, 'webp': variant},
+        })
+
+        collect_orphan_images()
+        self.assertEqual(list(Image.objects.filter(orphaned_at__isnull=False)), [orphan])
+
+        Image.objects.filter(pk=orphan.pk).update(orphaned_at=timezone.now() - timedelta(hours=2))
+        with self.captureOnCommitCallbacks(execute=True):
+            collect_orphan_images()
+
+        self.assertEqual(list(Image.objects.all()), [kept])
+        self.assertFalse(storage.exists(orphan.image.name))
+        self.assertFalse(storage.exists(variant))
+        self.assertTrue(storage.exists(kept.image.name))
+
+
+class ScheduledPublishingTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+
+    def create_draft(self, title, scheduled_publish_at, team=None):
+        article = Article(status=Article.Status.DRAFT, scheduled_publish_at=scheduled_publish_at, team=team)
+        article.set_current_language('en')
+        article.title = title
+        article.body = 'Body'
+        article.set_current_language('fa')
+        article.title = f'{title} fa'
+        article.body = 'Body'
+        article.save()
+        return article
+
+    def test_due_drafts_are_published_by_one_update(self):
+        now = timezone.now()
+        due = [self.create_draft(f'Due {index}', now - timedelta(minutes=index + 1)) for index in range(3)]
+        later = self.create_draft('Later', now + timedelta(hours=1))
+        version = get_content_version()
+
+        with self.captureOnCommitCallbacks(execute=True), CaptureQueriesContext(connection) as queries:
+            self.assertEqual(publish_due_articles(), 'Published 3 scheduled articles')
+
+        self.assertEqual(len([query for query in queries if query['sql'].lstrip().startswith('UPDATE')]), 1)
+        self.assertEqual(
+            set(Article.objects.filter(status=Article.Status.PUBLISHED).values_list('id', flat=True)),
+            {article.id for article in due},
+        )
+        self.assertEqual(Article.objects.get(pk=later.pk).status, Article.Status.DRAFT)
+        self.assertGreater(get_content_version(), version)
+        # Nothing is due anymore
+        self.assertEqual(publish_due_articles(), 'Published 0 scheduled articles')
+
+    def test_queued_eta_tasks_only_publish_due_articles(self):
+        rescheduled = self.create_draft('Rescheduled', timezone.now() + timedelta(hours=1))
+
+        publish_scheduled_article(rescheduled.id)
+
+        self.assertEqual(Article.objects.get(pk=rescheduled.pk).status, Article.Status.DRAFT)
+
+    def test_published_articles_are_served_from_the_warmed_caches(self):
+        team = Team()
+        team.set_current_language('en')
+        team.name = 'Lions'
+        team.set_current_language('fa')
+        team.name = 'شیرها'
+        team.save()
+        # Published an hour ago, the persian time ago has no wording for "now"
+        earlier = self.create_draft('Preview', timezone.now() - timedelta(hours=2), team)
+        report = self.create_draft('Match report', timezone.now() - timedelta(hours=1), team)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            publish_due_articles()
+
+        client = APIClient()
+        # The requests activate their language
+        self.addCleanup(translation.deactivate)
+        # The article row, the recorded viewers and is_liked, the payloads are cached
+        with self.assertNumQueries(3):
+            response = client.get(reverse('blog:article-detail', args=[report.slug]), HTTP_ACCEPT_LANGUAGE='fa')
+        self.assertEqual(response.data['title'], 'Match report fa')
+        self.assertFalse(response.data['is_liked'])
+        self.assertEqual([article['id'] for article in response.data['relatedArticles']], [earlier.id])
+
+        with self.assertNumQueries(0):
+            response = client.get(reverse('blog:home-datas'), HTTP_ACCEPT_LANGUAGE='en')
+        self.assertEqual([article['title'] for article in response.data['articles']], ['Match report', 'Preview'])
+        # The copy served while the home page is rebuilt is the new one too
+        self.assertEqual(cache.get(home_stale_cache_key('en')), response.data)
+
+    def test_payloads_rendered_before_a_content_change_are_dropped(self):
+        report = self.create_draft('Match report', timezone.now() - timedelta(hours=1))
+        version = get_content_version()
+
+        def render_during_a_change(article_ids):
+            entries = render_payloads(article_ids)
+            bump_content_version()
+            return entries
+
+        with mock.patch('blog.publishing.render_payloads', side_effect=render_during_a_change), \
+                self.captureOnCommitCallbacks(execute=True):
+            publish_due_articles()
+
+        self.assertEqual(get_content_version(), version + 2)
+        self.assertIsNone(cache.get(article_cache_key(report.id, 'en')))
+
+    def test_articles_are_published_when_their_payloads_cannot_be_rendered(self):
+        report = self.create_draft('Match report', timezone.now() - timedelta(hours=1))
+        version = get_content_version()
+
+        with mock.patch('blog.publishing.render_payloads', side_effect=DatabaseError), \
+                self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(publish_due_articles(), 'Published 1 scheduled articles')
+
+        self.assertEqual(Article.objects.get(pk=report.pk).status, Article.Status.PUBLISHED)
+        self.assertEqual(get_content_version(), version + 1)
@@ -0,0 +1,130 @@
+"""
+Media upload pipeline.
+
+Files are written to the storage of their model field outside of the request's database
+transaction: the files of one request are stored concurrently by a bounded thread pool,
+every file is retried with an exponential backoff on transient errors, and when one of
+them can't be stored the others are deleted again. With the S3 backend large files are
+sent as multipart uploads (see ``AWS_S3_TRANSFER_CONFIG``). Any Django storage works, the
+tests run against ``InMemoryStorage``.
+"""
+import logging
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from botocore.exceptions import BotoCoreError, ClientError
+from django.conf import settings
+from storages.backends.s3 import S3Storage
+from storages.utils import clean_name
+
+
+logger = logging.getLogger(__name__)
+
+# Keys per S3 DeleteObjects request, the maximum of the API
+S3_DELETE_BATCH_SIZE = 1000
+
+# S3 error codes worth another attempt, the other client errors (e.g. AccessDenied) are final
+RETRYABLE_S3_CODES = {'RequestTimeout', 'SlowDown', 'Throttling', 'ThrottlingException', 'InternalError', 'ServiceUnavailable'}
+
+
+def is_transient(error):
+    """True when storing the file again may succeed"""
+    if isinstance(error, ClientError):
+        response = error.response
+        return (
+            response.get('Error', {}).get('Code') in RETRYABLE_S3_CODES
+            or response.get('ResponseMetadata', {}).get('HTTPStatusCode', 0) >= 500
+        )
+    return isinstance(error, (BotoCoreError, ConnectionError, TimeoutError))
+
+
+def save_file(field, content, name=None, retries=None, backoff=None):
+    """
+    Store ``content`` with the storage and ``upload_to`` of the file ``field``, returns the
+    stored name. Transient errors are retried ``MEDIA_UPLOAD_RETRIES`` times, waiting
+    ``MEDIA_UPLOAD_RETRY_BACKOFF`` seconds and twice as long after every attempt.
+    """
+    retries = settings.MEDIA_UPLOAD_RETRIES if retries is None else retries
+    backoff = settings.MEDIA_UPLOAD_RETRY_BACKOFF if backoff is None else backoff
+    filename = field.generate_filename(None, os.path.basename(name or content.name))
+    for attempt in range(retries + 1):
+        try:
+            # A failed attempt may have read part of the file
+            content.seek(0)
+            return field.storage.save(filename, content, max_length=field.max_length)
+        except Exception as error:
+            if attempt == retries or not is_transient(error):
+                raise
+            delay = backoff * 2 ** attempt
+            logger.warning("Storing %s failed (%s), retrying in %.1fs", filename, error, delay)
+            time.sleep(delay)
+
+
+def delete_files(field, names):
+    """Delete stored files of the file ``field``, see :func:`delete_stored_files`"""
+    delete_stored_files(field.storage, names)
+
+
+def delete_stored_files(storage, names):
+    """
+    Delete the files ``names`` of ``storage``. S3 objects are deleted with one
+    DeleteObjects request per ``S3_DELETE_BATCH_SIZE`` keys, other storages file by file.
+    Failures are logged and don't stop the other deletions.
+    """
+    names = [name for name in names if name]
+    if not isinstance(storage, S3Storage):
+        for name in names:
+            try:
+                storage.delete(name)
+            except Exception:
+                logger.exception("Could not delete %s", name)
+        return
+
+    for start in range(0, len(names), S3_DELETE_BATCH_SIZE):
+        # The keys are normalized like S3Storage.delete() does
+        keys = [{'Key': storage._normalize_name(clean_name(name))} for name in names[start:start + S3_DELETE_BATCH_SIZE]]
+        try:
+            response = storage.bucket.delete_objects(Delete={'Objects': keys, 'Quiet': True})
+        except Exception:
+            logger.exception("Could not delete %s stored files", len(keys))
+            continue
+        for error in response.get('Errors', []):
+            logger.error("Could not delete %s: %s", error.get('Key'), error.get('Message'))
+
+
+def store_files(field, files, max_workers=None):
+    """
+    Store ``files`` concurrently with :func:`save_file`, returns their stored names in the
+    same order. When a file can't be stored the others are deleted and the error is raised.
+    """
+    files = list(files)
+    if not files:
+        return []
+    max_workers = min(max_workers or settings.MEDIA_UPLOAD_WORKERS, len(files))
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = [executor.submit(save_file, field, content) for content in files]
+    names, error = [], None
+    for future in futures:
+        try:
+            names.append(future.result())
+        except Exception as exc:
+            error = error or exc
+    if error:
+        delete_files(field, names)
+        raise error
+    return names
+
+
+@contextmanager
+def stored_files(field, files, max_workers=None):
+    """
+    :func:`store_files` for the body of the ``with`` block: the stored names are yielded
+    and the files are deleted again if the block raises (e.g. its transaction failed).
+    """
+    names = store_files(field, files, max_workers)
+    try:
+        yield names
+    except BaseException:
+        delete_files(field, names)
+        raise
@@ -2,6 +2,8 @@ from datetime import datetime
 from django.utils import timezone
 from humanize import naturaltime
 from django.utils.translation import get_language
+from django.utils.html import strip_tags
+from html import unescape
 
 
 def persian_digits(number: int) -> str:
@@ -50,6 +52,13 @@ def filter_vocabulary(text: str, length: int) -> str:
     filterd_text = text.split(' ')
     return ' '.join(filterd_text[:length]) + '...' if len(filterd_text) > length else text
 
+
+def make_excerpt(html: str, length: int = 10) -> str:
+    """Return the first ``length`` words of the html body as plain text"""
+    words = unescape(strip_tags(html or '')).split(maxsplit=length)
+    if len(words) > length:
+        return ' '.join(words[:length]) + '...'
+    return ' '.join(words)
     
 
 def get_time_ago(date_obj):
@@ -0,0 +1,80 @@
+"""
+Canonical forms of Persian text.
+Search documents, search queries and uniqueness checks are normalized the same way so
+text typed with Arabic letters, another digit set or another half-space style still matches.
+"""
+import re
+
+
+# Arabic code points commonly typed in place of their Persian counterparts
+PERSIAN_CHARACTERS = {
+    'ي': 'ی',
+    'ى': 'ی',
+    'ك': 'ک',
+    'ة': 'ه',
+    'ۀ': 'ه',
+}
+
+# Persian and Arabic-Indic digits are stored as ASCII digits
+DIGITS = {
+    **{persian: str(index) for index, persian in enumerate('۰۱۲۳۴۵۶۷۸۹')},
+    **{arabic: str(index) for index, arabic in enumerate('٠١٢٣٤٥٦٧٨٩')},
+}
+
+# The zero width non-joiner separates word parts, it is indexed as a space.
+# The other invisible characters and the diacritics are dropped.
+SPACES = {
+    '\u200c': ' ',
+}
+REMOVED_CHARACTERS = '\u200d\u200e\u200f\ufeff\u0640' + ''.join(chr(code) for code in range(0x064B, 0x0653))
+
+NORMALIZATION_TABLE = str.maketrans({
+    **PERSIAN_CHARACTERS,
+    **DIGITS,
+    **SPACES,
+    **dict.fromkeys(REMOVED_CHARACTERS),
+})
+
+WHITESPACE = re.compile(r'\s+')
+HALF_SPACED_WORD = re.compile(r'\S+(?:\u200c\S+)+')
+
+# Joins a batch into one string, it is not changed by the table and does not occur in text
+BATCH_SEPARATOR = '\x00'
+
+
+def normalize_persian(text: str) -> str:
+    """Canonicalize the letters, digits and spaces of the text"""
+    return WHITESPACE.sub(' ', (text or '').translate(NORMALIZATION_TABLE)).strip()
+
+
+def normalize_many(texts) -> list:
+    """
+    Normalize a batch of texts with a single ``str.translate`` and whitespace pass
+    instead of one per text, used when reindexing all translations.
+    """
+    texts = [(text or '').replace(BATCH_SEPARATOR, '') for text in texts]
+    if not texts:
+        return []
+    joined = BATCH_SEPARATOR.join(texts).translate(NORMALIZATION_TABLE)
+    joined = WHITESPACE.sub(' ', joined)
+    return [text.strip() for text in joined.split(BATCH_SEPARATOR)]
+
+
+def with_joined_forms(text: str) -> str:
+    """
+    Append the words written with a half space once more without it, so a document
+    with "می‌خواهم" also matches a query typed as "میخواهم".
+    """
+    words = HALF_SPACED_WORD.findall(text or '')
+    if not words:
+        return text or ''
+    joined = ' '.join(word.replace('\u200c', '') for word in words)
+    return f'{text} {joined}'
+
+
+def unique_key(text: str) -> str:
+    """
+    Spelling and case insensitive form of a title or name.
+    Stored next to translated titles and names, where the unique constraints compare it.
+    """
+    return normalize_persian(text).casefold()
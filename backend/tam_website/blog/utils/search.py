@@ -0,0 +1,50 @@
+from html import unescape
+from django.contrib.postgres.search import SearchQuery, SearchVector
+from django.db.models import Value
+from django.utils.html import strip_tags
+from .normalization import normalize_many, with_joined_forms
+
+
+# Postgres text search configuration per language, Persian has none and uses 'simple'
+SEARCH_CONFIGS = {
+    'en': 'english',
+}
+DEFAULT_SEARCH_CONFIG = 'simple'
+
+
+def get_search_config(language_code: str) -> str:
+    return SEARCH_CONFIGS.get(language_code, DEFAULT_SEARCH_CONFIG)
+
+
+def prepare_search_texts(texts, document=True) -> list:
+    """
+    Plain normalized text of documents or queries, as they are indexed.
+    Documents also index the half spaced words in their joined form.
+    """
+    texts = (unescape(strip_tags(text or '')) for text in texts)
+    if document:
+        texts = (with_joined_forms(text) for text in texts)
+    return normalize_many(texts)
+
+
+def prepare_search_text(text: str, document=True) -> str:
+    return prepare_search_texts([text], document=document)[0]
+
+
+def search_vector_expression(title: str, body: str, language_code: str):
+    """Weighted search vector of already prepared texts, the title ranks above the body"""
+    config = get_search_config(language_code)
+    return (
+        SearchVector(Value(title), weight='A', config=config)
+        + SearchVector(Value(body), weight='B', config=config)
+    )
+
+
+def build_search_vector(title: str, body: str, language_code: str):
+    """Weighted search vector of an article translation"""
+    title, body = prepare_search_texts([title, body])
+    return search_vector_expression(title, body, language_code)
+
+
+def build_search_query(value: str, language_code: str) -> SearchQuery:
+    return SearchQuery(prepare_search_text(value, document=False), config=get_search_config(language_code))
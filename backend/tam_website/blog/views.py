@@ -4,15 +4,21 @@ from rest_framework import status
 from rest_framework.views import APIView
 from django.shortcuts import get_object_or_404
 from django.utils.translation import get_language, activate as set_language
-from blog.serializers import ArticleSerializer, ArticleDetailSerializer, UserProfileBlogUpdateSerializer, UserPasswordBlogChangeSerializer
+from blog.serializers import ArticleSerializer, ArticleListSerializer, ArticleDetailSerializer, UserProfileBlogUpdateSerializer, UserPasswordBlogChangeSerializer
 from permissions import IsAuthor, IsSuperUser, IsAuthorAndSuperuser
 from blog.models import Article
 from accounts.mixins import LocalizationMixin, IpAddressMixin
-from .models import IpAddress
+from .redis import RedisService, VisitorIds
+from .likes import like_article, unlike_article
+from .cache import article_cache_key, get_content_version, get_or_build, home_cache_key, home_stale_cache_key, related_cache_key
+from .payloads import article_payload, home_payload, related_payload
+from .suggest import suggest, SUGGEST_DEFAULT_LIMIT, SUGGEST_MAX_LIMIT
 from django_filters import rest_framework as filters
 from django.db.models import Count, Q, Case, When, Value, F
-from django.contrib.postgres.search import SearchVector, SearchQuery, SearchRank
-from rest_framework.pagination import PageNumberPagination
+from rest_framework.pagination import PageNumberPagination, CursorPagination, Cursor
+from rest_framework.exceptions import NotFound
+import logging
+from datetime import datetime
 from .models import Team, Player
 from .serializers import TeamSerializer, PlayerSerializer
 from accounts.models import Profile
@@ -24,6 +30,9 @@ from django.db import transaction
 from django.utils.translation import gettext_lazy as _
 
 
+logger = logging.getLogger(__name__)
+
+
 class ArticlePagination(PageNumberPagination):
     page_size = 12
     page_query_param = 'page'
@@ -42,6 +51,78 @@ class ArticlePagination(PageNumberPagination):
         })
 
 
+class ArticleCursorPagination(CursorPagination):
+    """
+    Keyset pagination on (created_date, id) for infinite scroll.
+    Every page costs one query no matter how deep the client is, and no COUNT is run.
+
+    DRF's CursorPagination keys on the first ordering field only and steps over equal
+    values with an offset, so the cursor position here is the (created_date, id) pair
+    of the boundary article and a page is filtered on both.
+    """
+    page_size = 12
+    ordering = ('-created_date', '-id')
+    cursor_query_param = 'cursor'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.base_url = request.build_absolute_uri()
+        self.cursor = self.decode_cursor(request)
+        reverse = bool(self.cursor and self.cursor.reverse)
+
+        # Previous pages are read in the opposite order from their boundary
+        queryset = queryset.order_by(*(('created_date', 'id') if reverse else self.ordering))
+        if self.cursor and self.cursor.position:
+            created_date, pk = self.cursor.position
+            lookup = 'gt' if reverse else 'lt'
+            queryset = queryset.filter(
+                Q(**{f'created_date__{lookup}': created_date})
+                | Q(created_date=created_date, **{f'id__{lookup}': pk})
+            )
+
+        results = list(queryset[:self.page_size + 1])
+        self.page = results[:self.page_size]
+        has_more = len(results) > self.page_size
+        if reverse:
+            self.page.reverse()
+        self.has_next = has_more if not reverse else True
+        self.has_previous = has_more if reverse else self.cursor is not None
+        return self.page
+
+    def get_next_link(self):
+        if not self.has_next or not self.page:
+            return None
+        return self.encode_cursor(Cursor(offset=0, reverse=False, position=self.position(self.page[-1])))
+
+    def get_previous_link(self):
+        if not self.has_previous or not self.page:
+            return None
+        return self.encode_cursor(Cursor(offset=0, reverse=True, position=self.position(self.page[0])))
+
+    @staticmethod
+    def position(article):
+        # created_date is a jalali datetime, keep the cursor position in gregorian time
+        return f"{article.created_date.togregorian().isoformat()}|{article.id}"
+
+    def decode_cursor(self, request):
+        cursor = super().decode_cursor(request)
+        if cursor is None or cursor.position is None:
+            return cursor
+        try:
+            created_date, pk = cursor.position.rsplit('|', 1)
+            position = (datetime.fromisoformat(created_date), int(pk))
+        except ValueError:
+            raise NotFound(self.invalid_cursor_message)
+        return cursor._replace(position=position)
+
+    def get_paginated_response(self, data):
+        return Response({
+            'articles': data,
+            'next': self.get_next_link(),
+            'previous': self.get_previous_link(),
+        })
+
+
 class ArticleFilter(filters.FilterSet):
     type = filters.ChoiceFilter(choices=Article.Type.choices)
     status = filters.ChoiceFilter(choices=Article.Status.choices)
@@ -67,55 +148,18 @@ class ArticleFilter(filters.FilterSet):
 
     def filter_most_viewed(self, queryset, name, value):
         if value:
-            return queryset.annotate(
-                view_count=Count('hits')
-            ).order_by('-view_count')
+            return queryset.order_by('-view_count')
         return queryset
 
     def filter_most_popular(self, queryset, name, value):
         if value:
-            return queryset.annotate(
-                like_count=Count('likes')
-            ).order_by('-like_count')
+            return queryset.order_by('-like_count')
         return queryset
 
     def filter_search(self, queryset, name, value):
         if value:
-            try:
-                # Get the current language from the request
-                language = self.request.META.get('HTTP_ACCEPT_LANGUAGE', 'fa')
-                
-                # Use 'simple' configuration as a fallback if language-specific config doesn't exist
-                config = 'simple'
-                
-                # Create search vectors for title and body
-                title_vector = SearchVector('translations__title', weight='A', config=config)
-                body_vector = SearchVector('translations__body', weight='B', config=config)
-                
-                # Combine vectors
-                search_vector = title_vector + body_vector
-                
-                # Create search query with proper escaping
-                search_query = SearchQuery(value, config=config)
-                
-                # Perform the search with ranking
-                return queryset.filter(
-                    translations__language_code=language
-                ).annotate(
-                    rank=SearchRank(search_vector, search_query)
-                ).filter(
-                    rank__gt=0.3
-                ).order_by(
-                    '-rank',  # Sort by search rank first
-                    '-created_date'  # Then by creation date
-                ).distinct()
-            except Exception as e:
-                # If search fails, fall back to simple contains search
-                return queryset.filter(
-                    Q(translations__title__icontains=value) |
-                    Q(translations__body__icontains=value)
-                ).distinct()
-            
+            # Ranked lookup on the stored search vector of the current language
+            return queryset.search(value, get_language())
         return queryset
 
 
@@ -123,74 +167,52 @@ class ArticleListView(ListAPIView):
     """
     View for listing all published articles.
     Supports filtering by type, status, most viewed and most popular.
-    Supports pagination with page parameter.
+    Supports pagination with page parameter, and cursor pagination for infinite scroll.
     Supports search by title and body in the current language.
     """
-    serializer_class = ArticleSerializer
+    serializer_class = ArticleListSerializer
     queryset = Article.objects.filter(status=Article.Status.PUBLISHED)
     filter_backends = (filters.DjangoFilterBackend,)
     filterset_class = ArticleFilter
     pagination_class = ArticlePagination
 
     def get_queryset(self):
-        queryset = super().get_queryset()
-        # Optimize category prefetching for list view
-        return queryset.prefetch_related(
-            'team',
-            'team__translations',
-            'article_images',
-            'hits',
-            'likes'
-        )
+        return super().get_queryset().for_list(get_language())
 
-    def get_serializer_context(self):
-        context = super().get_serializer_context()
-        context['list'] = True
-        return context
+    def use_cursor_pagination(self, queryset):
+        """
+        Infinite scroll (``fetch-all=true`` or a ``cursor``) is cursor paginated, unless a
+        filter (most viewed, most popular, search) ordered the articles by something else.
+        """
+        params = self.request.query_params
+        infinite_scroll = params.get('fetch-all', 'false').lower() == 'true' or 'cursor' in params
+        return infinite_scroll and not queryset.query.order_by
 
     def list(self, request, *args, **kwargs):
         queryset = self.filter_queryset(self.get_queryset())
-        
-        if not queryset.exists():
-            return Response({
-                'detail': 'no articles found!',
-                'articles': [],
-                'next': None,
-                'total_pages': 0,
-                'current_page': 1
-            }, status=status.HTTP_200_OK)
-        
-        # Check if fetch-all parameter is present
-        fetch_all = request.query_params.get('fetch-all', 'false').lower() == 'true'
-        if fetch_all:
-            # Get the requested page number
-            page_number = int(request.query_params.get('page', 1))
-            # Calculate the number of items to return (page_size * page_number)
-            items_to_return = self.pagination_class.page_size * page_number
-            # Get articles up to the requested page
-            articles = queryset[:items_to_return]
-            serializer = self.get_serializer(articles, many=True)
-            
-            # Calculate next URL if there are more pages
-            next_url = None
-            if queryset.count() > items_to_return:
-                next_page = page_number + 1
-                next_url = request.build_absolute_uri(f"{request.path}?page={next_page}")
-            
-            return Response({
-                'articles': serializer.data,
-                'next': next_url,
-                'total_pages': page_number,
-                'current_page': page_number
-            })
-            
-        page = self.paginate_queryset(queryset)
-        if page is not None:
+
+        if self.use_cursor_pagination(queryset):
+            paginator = ArticleCursorPagination()
+            page = paginator.paginate_queryset(queryset, request, view=self)
+            if not page and paginator.cursor is None:
+                return self.empty_response()
             serializer = self.get_serializer(page, many=True)
-            return self.get_paginated_response(serializer.data)
+            return paginator.get_paginated_response(serializer.data)
 
-        serializer = self.get_serializer(queryset, many=True)
-        return Response(serializer.data)
+        page = self.paginate_queryset(queryset)
+        if not self.paginator.page.paginator.count:
+            return self.empty_response()
+        serializer = self.get_serializer(page, many=True)
+        return self.get_paginated_response(serializer.data)
+
+    def empty_response(self):
+        return Response({
+            'detail': 'no articles found!',
+            'articles': [],
+            'next': None,
+            'total_pages': 0,
+            'current_page': 1
+        }, status=status.HTTP_200_OK)
 
 
 class ArticleDetailView(IpAddressMixin, RetrieveAPIView):
@@ -206,31 +228,22 @@ class ArticleDetailView(IpAddressMixin, RetrieveAPIView):
     def retrieve(self, request, *args, **kwargs):
         article = self.get_object()
         ip = self.get_client_ip(request)
-        if not article.hits.filter(ip=ip).exists():
-            ipaddress_obj = IpAddress.objects.get_or_create(
-                ip=ip
-            )
-            article.hits.add(ipaddress_obj[0])
-            article.save()
-    
-        # Serialize main article (detail context)
-        main_data = self.get_serializer(article, context={ "client_ip": ip }).data
-
-        # Fetch up to 3 related articles by the same team (exclude current)
-        related_qs = Article.objects.filter(status=Article.Status.PUBLISHED)
-        if article.team_id:
-            related_qs = related_qs.filter(team_id=article.team_id)
-        else:
-            related_qs = related_qs.none()
-        related_qs = related_qs.exclude(id=article.id).order_by('-created_date')[:3]
+        # Deduplicated in Redis, persisted later by the flush_article_views task
+        RedisService(request).add_article_view(article.id)
 
-        # Serialize related articles in list context so list fields (like slug) are preserved
-        related_data = ArticleSerializer(related_qs, many=True, context={ 'request': request, 'list': True }).data
-
-        # Attach related articles to the response payload
-        main_data['relatedArticles'] = related_data
-
-        return Response(main_data)
+        # The payloads shared by every visitor are cached per language, keyed by the
+        # content version, the counters are read from the article row
+        language, version = get_language(), get_content_version()
+        main_data = get_or_build(article_cache_key(article.id, language, version), lambda: article_payload(article.id))
+        return Response({
+            **main_data,
+            'view_count': article.view_count,
+            'likes': article.like_count,
+            'is_liked': article.likes.filter(ip=ip).exists(),
+            'relatedArticles': get_or_build(
+                related_cache_key(article.id, language, version), lambda: related_payload(article, request),
+            ),
+        })
 
 
 class CreateArticleView(LocalizationMixin, CreateAPIView):
@@ -286,8 +299,8 @@ class ArticleListForAuthorsView(ArticleListView):
     
     def get_queryset(self):
         # Get the user's profile
-        profile = Profile.objects.get_or_create(user=self.request.user)
-        return Article.objects.filter(author=profile)
+        profile, _ = Profile.objects.get_or_create(user=self.request.user)
+        return Article.objects.filter(author=profile).for_list(get_language())
 
     def get_serializer_context(self):
         context = super().get_serializer_context()
@@ -305,7 +318,7 @@ class ArticleDetailForAuthorsView(ArticleDetailView):
     def get_queryset(self):
         # Get the user's profile
         profile = Profile.objects.get_or_create(user=self.request.user)
-        return Article.objects.filter(author=profile)
+        return Article.objects.filter(author=profile).with_images()
     
 
     def retrieve(self, request, *args, **kwargs):
@@ -319,53 +332,57 @@ class ArticleDetailForAuthorsView(ArticleDetailView):
 
 class ArticleLikeView(IpAddressMixin, APIView):
     """
-    View for liking an article.
+    POST likes an article, DELETE removes the like, for the requesting IP.
+    Both are idempotent and return the current like count of the article.
     """
-    def get(self, request, slug):
-        article = get_object_or_404(Article, slug=slug)
-        ip_obj = IpAddress.objects.get(ip=self.get_client_ip(request))
-        if not article.likes.filter(ip=ip_obj.ip).exists():
-            article.likes.add(ip_obj)
-            article.save()
-        else:
-            article.likes.remove(ip_obj)
-            article.save()
-        return Response(status=status.HTTP_200_OK)
+    def post(self, request, slug):
+        return self.respond(like_article(slug, VisitorIds().get(self.get_client_ip(request))), True)
+
+    def delete(self, request, slug):
+        return self.respond(unlike_article(slug, VisitorIds().get(self.get_client_ip(request))), False)
+
+    def respond(self, likes, is_liked):
+        if likes is None:
+            raise NotFound
+        return Response({'likes': likes, 'is_liked': is_liked}, status=status.HTTP_200_OK)
 
 
 class HomeDataView(LocalizationMixin, APIView):
+    """
+    Home page payload, cached per language and keyed by the blog content version.
+    The version is bumped by the signals in blog/signals.py whenever the content changes.
+    """
     def get(self, request):
         try:
-            # Get latest 5 articles
-            articles = Article.objects.filter(Q(status='PB') & Q(type="TX")).order_by('-created_date')[:5]
-            articles_data = ArticleSerializer(articles, many=True, context={'request': request, "list": True}).data
-
-            # Get latest videos
-            videos = Article.objects.filter(status='PB', type='VD').order_by('-created_date')[:5]
-            videos_data = ArticleSerializer(videos, many=True, context={'request': request, "list": True}).data
-
-            # Get all teams
-            teams = Team.objects.all()
-            teams_data = TeamSerializer(teams, many=True, context={'request': request}).data
-
-            # Get all players
-            players = Player.objects.all()
-            players_data = PlayerSerializer(players, many=True, context={'request': request}).data
-
-            return Response({
-                'articles': articles_data,
-                'videos': videos_data,
-                'tam_teams': teams_data,
-                'players': players_data
-            })
+            language = get_language()
+            payload = get_or_build(
+                home_cache_key(language),
+                lambda: home_payload(request),
+                stale_key=home_stale_cache_key(language),
+            )
+            return Response(payload)
         except Exception as e:
-            print(e)
+            logger.exception("Could not build the home payload")
             return Response(
                 {'error': str(e)},
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR
             )
 
 
+class SearchSuggestView(LocalizationMixin, APIView):
+    """
+    Autocomplete suggestions for the search box.
+    Returns the top articles, teams and players of the current language matching ``q``,
+    typos included. ``limit`` sets the number of suggestions of each kind.
+    """
+    def get(self, request):
+        try:
+            limit = min(int(request.query_params.get('limit', SUGGEST_DEFAULT_LIMIT)), SUGGEST_MAX_LIMIT)
+        except ValueError:
+            limit = SUGGEST_DEFAULT_LIMIT
+        return Response(suggest(request.query_params.get('q'), get_language(), max(limit, 1)))
+
+
 class ArticleFilterDataView(APIView):
     """
     View to return all article filter options.
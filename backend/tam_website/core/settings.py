@@ -4,6 +4,7 @@ import os
 import environ
 from django.utils.translation import gettext_lazy as _
 from corsheaders.defaults import default_headers
+from boto3.s3.transfer import TransferConfig
 
 
 env = environ.Env()
@@ -37,6 +38,7 @@ INSTALLED_APPS = [
     'django.contrib.messages',
     'django.contrib.staticfiles',
     'django_jalali',
+    'django.contrib.postgres',
 
     # local apps
     'accounts.apps.AccountsConfig',
@@ -225,9 +227,38 @@ PARLER_LANGUAGES = {
 PARLER_DEFAULT_LANGUAGE_CODE = 'en'
 
 # Redis Configuration
-REDIS_HOST = 'redis'
+REDIS_HOST = os.getenv('REDIS_HOST', 'redis')
 REDIS_PORT = 6379
 REDIS_DB = 0
+REDIS_CACHE_DB = 1
+
+# Cache Configuration
+CACHES = {
+    'default': {
+        'BACKEND': 'django_redis.cache.RedisCache',
+        'LOCATION': f'redis://{REDIS_HOST}:{REDIS_PORT}/{REDIS_CACHE_DB}',
+        'OPTIONS': {
+            'CLIENT_CLASS': 'django_redis.client.DefaultClient',
+        },
+    }
+}
+
+# Seconds a cached blog payload (e.g. the home page) is served before it is rebuilt
+BLOG_CACHE_TIMEOUT = 60 * 5
+# Seconds a worker may hold the rebuild lock of a cached payload
+BLOG_CACHE_LOCK_TIMEOUT = 10
+
+# Resized copies generated for every uploaded image: variant name -> maximum width in pixels
+IMAGE_VARIANT_WIDTHS = {'thumbnail': 320, 'card': 640, 'hero': 1600}
+# Formats the variants are encoded in, add 'avif' to store AVIF copies as well
+IMAGE_VARIANT_FORMATS = ('webp',)
+# Encoder quality of the variants
+IMAGE_VARIANT_QUALITY = 80
+
+# Maximum number of articles of one bulk import request
+ARTICLE_BULK_MAX_ROWS = 1000
+# Threads storing the images of a bulk import concurrently
+ARTICLE_BULK_UPLOAD_WORKERS = 8
 
 # Celery Configuration
 CELERY_BROKER_URL = f'redis://{REDIS_HOST}:{REDIS_PORT}/{REDIS_DB}'
@@ -238,6 +269,63 @@ CELERY_RESULT_SERIALIZER = 'json'
 CELERY_TIMEZONE = 'Asia/Tehran'
 CELERY_TASK_TRACK_STARTED = True
 CELERY_TASK_TIME_LIMIT = 30 * 60  # 30 minutes
+CELERY_BEAT_SCHEDULER = 'django_celery_beat.schedulers:DatabaseScheduler'
+
+# Seconds between two bulk inserts of the queued article views
+ARTICLE_VIEWS_FLUSH_INTERVAL = 30
+
+# Articles with up to this many viewers are counted exactly, bigger ones with a HyperLogLog (0 = always HyperLogLog)
+ARTICLE_VIEWERS_EXACT_LIMIT = 1000
+# Days the per-day unique viewer HyperLogLogs are kept
+ARTICLE_VIEWERS_DAILY_RETENTION_DAYS = 400
+
+# Visitor IP -> IpAddress id mappings kept in the memory of each process
+VISITOR_IDS_LOCAL_CACHE_SIZE = 10000
+# Seconds a visitor IP -> IpAddress id mapping is kept in Redis
+VISITOR_IDS_CACHE_TIMEOUT = 60 * 60 * 24 * 30
+
+# Seconds between two rebuilds of the admin dashboard rollups
+DASHBOARD_STATS_REFRESH_INTERVAL = 60
+# Seconds the dashboard snapshot may be served for before it is rebuilt inside the request
+DASHBOARD_STATS_MAX_AGE = 60 * 5
+
+# Seconds between two runs of the article hit partition maintenance
+ARTICLE_HITS_PARTITIONS_INTERVAL = 60 * 60 * 6
+# Monthly partitions of the article hit table created in advance
+ARTICLE_HITS_PARTITIONS_AHEAD = 2
+# Months of article hits kept attached, older partitions are detached (None = keep everything)
+ARTICLE_HITS_RETENTION_MONTHS = None
+
+# Seconds between two sweeps of the article images linked to no article
+ORPHAN_IMAGES_SWEEP_INTERVAL = 60 * 60
+# Seconds an orphan image is kept after it was found, before it is deleted with its files
+ORPHAN_IMAGES_GRACE_PERIOD = 60 * 60
+
+# Seconds between two runs of the scheduled article publisher, the delay of a scheduled publication at most
+SCHEDULED_ARTICLES_PUBLISH_INTERVAL = 30
+
+CELERY_BEAT_SCHEDULE = {
+    'publish-due-articles': {
+        'task': 'blog.tasks.publish_due_articles',
+        'schedule': SCHEDULED_ARTICLES_PUBLISH_INTERVAL,
+    },
+    'flush-article-views': {
+        'task': 'blog.tasks.flush_article_views',
+        'schedule': ARTICLE_VIEWS_FLUSH_INTERVAL,
+    },
+    'refresh-dashboard-stats': {
+        'task': 'adminpanel.tasks.refresh_dashboard_stats',
+        'schedule': DASHBOARD_STATS_REFRESH_INTERVAL,
+    },
+    'maintain-article-hit-partitions': {
+        'task': 'blog.tasks.maintain_hit_partitions',
+        'schedule': ARTICLE_HITS_PARTITIONS_INTERVAL,
+    },
+    'collect-orphan-images': {
+        'task': 'blog.tasks.collect_orphan_images',
+        'schedule': ORPHAN_IMAGES_SWEEP_INTERVAL,
+    },
+}
 
 # ARVAN CLOUD CONFIGURATIONS
 # ARVAN CLOUD STORAGE
@@ -258,6 +346,28 @@ AWS_STORAGE_BUCKET_NAME = env('AWS_STORAGE_BUCKET_NAME')
 AWS_SERVICE_NAME = 's3'
 AWS_S3_FILE_OVERWRITE = False
 AWS_LOCAL_STORAGE = f'{BASE_DIR}/aws/'
+# Files over 8MB are sent to S3 as multipart uploads of 8MB parts, 4 parts at a time
+AWS_S3_TRANSFER_CONFIG = TransferConfig(
+    multipart_threshold=8 * 1024 * 1024,
+    multipart_chunksize=8 * 1024 * 1024,
+    max_concurrency=4,
+)
+
+# Base URL media files are served from by a CDN, URLs are then built without the storage (no signing)
+MEDIA_CDN_URL = env('MEDIA_CDN_URL', default='')
+# Storage URLs kept in the memory of each process
+MEDIA_URL_CACHE_SIZE = 20000
+# Seconds an unsigned storage URL is reused
+MEDIA_URL_CACHE_TIMEOUT = 60 * 60
+# Seconds a reused signed URL is still valid for at least, longer than any cached payload containing it
+MEDIA_SIGNED_URL_MIN_VALIDITY = 60 * 15
+
+# Threads storing the uploaded files of one request concurrently
+MEDIA_UPLOAD_WORKERS = 4
+# Attempts after the first one to store a file failing with a transient error
+MEDIA_UPLOAD_RETRIES = 3
+# Seconds waited before the first retry of a failed upload, doubled after every attempt
+MEDIA_UPLOAD_RETRY_BACKOFF = 0.5
 
 EMAIL_BACKEND = 'django.core.mail.backends.smtp.EmailBackend'
 EMAIL_HOST = 'smtp.gmail.com'
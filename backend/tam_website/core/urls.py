@@ -2,6 +2,7 @@ from django.contrib import admin
 from django.urls import path, include
 from django.conf import settings
 from django.conf.urls.static import static
+from blog.views import SearchSuggestView
 
 urlpatterns = [
     path('admin/', admin.site.urls),
@@ -9,4 +10,5 @@ urlpatterns = [
     path('api/auth/', include('accounts.urls')),
     path('api/blog/', include('blog.urls')),
     path('api/admin/', include('adminpanel.urls')),
+    path('api/search/suggest/', SearchSuggestView.as_view(), name='search-suggest'),
 ]
@@ -60,9 +60,9 @@ export default function NewsDetail() {
       setLikeCount(newLikeCount)
       setIsLiked(!isLiked)
 
-      // Make API call to toggle like
-      const response = await fetch(`http://${domainUrl}:8000/api/blog/article-like/${slug}`, {
-        method: 'GET',
+      // POST likes the article, DELETE removes the like
+      const response = await fetch(`http://${domainUrl}:8000/api/blog/article-like/${slug}/`, {
+        method: isLiked ? 'DELETE' : 'POST',
       })
 
       if (!response.ok) {
@@ -71,6 +71,10 @@ export default function NewsDetail() {
         setIsLiked(isLiked)
         throw new Error('Failed to toggle like')
       }
+
+      // Sync with the server count, it includes the likes of other visitors
+      const data = await response.json()
+      setLikeCount(data.likes)
     } catch (error) {
       console.error('Error toggling like:', error)
     }
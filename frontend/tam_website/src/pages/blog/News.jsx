@@ -35,11 +35,6 @@ export default function News() {
       window.history.replaceState({}, '', `${window.location.pathname}?${params.toString()}`);
     }
 
-    // Always reset page to 1 on initial load unless explicitly navigating to a specific page
-    // If there are other filters present, ensure page is 1. If only 'page' is present, it's a load more scenario.
-    const currentPageParam = params.get('page');
-    params.delete('page'); // Always start fresh with page 1 if filters change
-
     const searchUrl = new URL(`http://${domainUrl}:8000/api/blog/articles`);
     if (searchParam) {
       searchUrl.searchParams.set('search', searchParam);
@@ -54,15 +49,8 @@ export default function News() {
       searchUrl.searchParams.set('team', teamParam);
     }
 
-    // Add page back if it was specifically for load more scenario (only 'page' param present)
-    if (currentPageParam && params.toString() === '') {
-      searchUrl.searchParams.set('page', currentPageParam);
-      searchUrl.searchParams.set('fetch-all', 'true');
-    } else {
-      // For new filters or refresh, always fetch page 1 initially
-      searchUrl.searchParams.set('page', '1');
-      searchUrl.searchParams.set('fetch-all', 'true'); // Always fetch all for now, as per pagination logic
-    }
+    // Infinite scroll, the api answers with a cursor to the next articles
+    searchUrl.searchParams.set('fetch-all', 'true');
 
     return searchUrl.toString();
   });
@@ -77,7 +65,6 @@ export default function News() {
   const activeFilter = new URLSearchParams(window.location.search).get("type");
   const searchParam = new URLSearchParams(window.location.search).get("search");
   const categoryParam = new URLSearchParams(window.location.search).get("category");
-  const currentPage = new URLSearchParams(window.location.search).get("page") || "1";
   const teamParam = new URLSearchParams(window.location.search).get("team");
 
   const {
@@ -116,7 +103,6 @@ export default function News() {
     const searchParam = params.get('search');
     const typeParam = params.get('type');
     const categoryParam = params.get('category');
-    const pageParam = params.get('page');
     const teamParam = params.get('team');
 
     // Reset list before fetching new results on any filter/nav change
@@ -137,13 +123,7 @@ export default function News() {
     if (teamParam) {
       newSearchUrl.searchParams.set('team', teamParam);
     }
-    if (pageParam) {
-      newSearchUrl.searchParams.set('page', pageParam);
-      newSearchUrl.searchParams.set('fetch-all', 'true');
-    } else { // If pageParam is not present, ensure it's page 1 for new filter sets
-      newSearchUrl.searchParams.set('page', '1');
-      newSearchUrl.searchParams.set('fetch-all', 'true');
-    }
+    newSearchUrl.searchParams.set('fetch-all', 'true');
     setRequestUrl(newSearchUrl.toString());
   }, [window.location.search]); // Depend on window.location.search
 
@@ -162,10 +142,6 @@ export default function News() {
 
   const handleLoadMore = () => {
     if (hasNext) {
-      const nextPage = parseInt(currentPage) + 1;
-      const params = new URLSearchParams(window.location.search);
-      params.set('page', nextPage.toString());
-      window.history.replaceState({}, '', `${window.location.pathname}?${params.toString()}`);
       setRequestUrl(response.next);
     }
   };
@@ -224,7 +200,7 @@ export default function News() {
           onClearAllFilters={handleClearAllFilters}
         />
         {
-          (((isLoading || allArticles.length == 0) && response?.detail !== 'no articles found!' && (!requestUrl.includes("page") || (requestUrl.includes("page") && requestUrl.includes("fetch-all"))))) ?  <SpinLoader /> :(
+          (((isLoading || allArticles.length == 0) && response?.detail !== 'no articles found!' && !requestUrl.includes("cursor="))) ?  <SpinLoader /> :(
             (response?.detail === 'no articles found!') ? (
               <div
                 className="flex flex-col items-center justify-center min-h-[60vh] w-full"